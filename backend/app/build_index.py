@@ -0,0 +1,243 @@
+# 🧱 Prebuilt match-index snapshots: build with `python -m app.build_index`, mmap at startup
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl  # POSIX only
+except Exception:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+from . import crud
+from . import models
+from .matching import SemanticIndex, VectorStore, prof_to_doc, semantic_model_name
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout or doc/tokenizer logic changes
+FORMAT_VERSION = 1
+INDEX_DIR = os.getenv(
+    "INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "index_snapshots"),
+)
+# Snapshots kept on disk; older ones are pruned after a build
+INDEX_KEEP_SNAPSHOTS = int(os.getenv("INDEX_KEEP_SNAPSHOTS", "3"))
+
+
+def catalog_fingerprint(db: Session, version: Optional[int] = None) -> str:
+    """Hash of everything the index is built from: format, catalog version, embedding model,
+    (id, updated_at, content_hash)."""
+    version = crud.current_catalog_version(db) if version is None else version
+    h = hashlib.sha256(f"format={FORMAT_VERSION};version={version};model={semantic_model_name()};".encode())
+    rows = db.execute(
+        select(models.Professor.id, models.Professor.updated_at, models.Professor.content_hash)
+        .order_by(models.Professor.id)
+        .execution_options(yield_per=10000)
+    )
+    for pid, updated_at, content_hash in rows:
+        h.update(f"{pid}:{updated_at}:{content_hash or ''};".encode())
+    return h.hexdigest()
+
+
+def professor_docs(db: Session) -> tuple[list[int], list[str]]:
+    """(ids, doc texts) for the whole catalog, ordered by id."""
+    ids, docs = [], []
+    for p in sorted(crud.list_professors(db), key=lambda p: p.id):
+        skills = [ps.skill.name for ps in p.professor_skills]
+        ids.append(p.id)
+        docs.append(prof_to_doc({"research_interests": p.research_interests or "", "skills": skills}))
+    return ids, docs
+
+
+class IndexSnapshot:
+    """A loaded snapshot: doc ids/texts plus the rebuilt stores (arrays are memory-mapped)."""
+
+    def __init__(self, path: str, manifest: dict, ids: list[int], docs: list[str], vecstore: VectorStore, embeddings):
+        self.path = path
+        self.manifest = manifest
+        self.ids = ids
+        self.docs = docs
+        self.vecstore = vecstore
+        self.embeddings = embeddings
+
+    @property
+    def fingerprint(self) -> str:
+        return self.manifest["fingerprint"]
+
+    def prefault(self) -> None:
+        """Read every mapped array once so requests never stall on page faults.
+
+        The pages live in the OS page cache, shared by every process mapping the
+        same files, so this costs one physical copy however many workers run.
+        """
+        store = self.vecstore
+        arrays = [self.embeddings]
+        if store._bm25 is not None:
+            b = store._bm25
+            arrays += [b.idf, b.tf_data, b.tf_indices, b.tf_indptr, b.norm]
+        if store.mat is not None:
+            arrays += [store.mat.data, store.mat.indices, store.mat.indptr]
+        step = mmap_page_size()
+        for arr in arrays:
+            if arr is not None and arr.size:
+                # one byte per page is enough to fault it in
+                int(np.asarray(arr).reshape(-1).view(np.uint8)[::step].sum())
+
+
+def write_snapshot(
+    index_dir: str,
+    fingerprint: str,
+    *,
+    catalog_version: int,
+    ids: list[int],
+    docs: list[str],
+    vecstore: VectorStore,
+    sem_index: Optional[SemanticIndex] = None,
+) -> str:
+    """Write a snapshot directory named after `fingerprint`; returns its path.
+
+    Files are written to a temp directory and renamed into place, so readers never
+    see a partial snapshot. Arrays are plain .npy (not .npz) so they can be mmap'd.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    final = os.path.join(index_dir, fingerprint)
+    if os.path.isfile(os.path.join(final, "manifest.json")):
+        return final
+    tmp = tempfile.mkdtemp(prefix=".build-", dir=index_dir)
+    try:
+        arrays, meta = vecstore.to_snapshot()
+        arrays["ids"] = np.asarray(ids, dtype=np.int64)
+        emb = getattr(sem_index, "_emb", None) if sem_index is not None and sem_index.enabled else None
+        if emb is not None:
+            arrays["embeddings"] = np.ascontiguousarray(emb, dtype=np.float32)
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(arr), allow_pickle=False)
+        with open(os.path.join(tmp, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump({"docs": docs, "store": meta}, f, ensure_ascii=False)
+        manifest = {
+            "format": FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "catalog_version": catalog_version,
+            "built_at": int(time.time()),
+            "count": len(ids),
+            "arrays": sorted(arrays),
+            "semantic_model": semantic_model_name() if emb is not None else None,
+        }
+        # manifest last: its presence marks the snapshot complete
+        with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            os.rename(tmp, final)
+        except OSError:
+            # another process published the same fingerprint first
+            if not os.path.isfile(os.path.join(final, "manifest.json")):
+                raise
+    finally:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+    return final
+
+
+def mmap_page_size() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+@contextlib.contextmanager
+def build_lock(index_dir: str):
+    """Exclusive cross-process lock so only one worker builds a missing snapshot."""
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, ".build.lock"), "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def find_snapshot(index_dir: str, fingerprint: str) -> Optional[str]:
+    path = os.path.join(index_dir, fingerprint)
+    return path if os.path.isfile(os.path.join(path, "manifest.json")) else None
+
+
+def load_snapshot(path: str, *, mmap: bool = True) -> IndexSnapshot:
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"snapshot format {manifest.get('format')} != {FORMAT_VERSION}")
+    if "embeddings" in manifest["arrays"] and manifest.get("semantic_model") != semantic_model_name():
+        # vectors from another model are not comparable with queries encoded by this one
+        raise ValueError(f"snapshot embeddings from {manifest.get('semantic_model')!r}, not {semantic_model_name()!r}")
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in manifest["arrays"]}
+    with open(os.path.join(path, "docs.json"), encoding="utf-8") as f:
+        payload = json.load(f)
+    return IndexSnapshot(
+        path,
+        manifest,
+        [int(i) for i in arrays.pop("ids")],
+        payload["docs"],
+        VectorStore.from_snapshot(arrays, payload["store"]),
+        arrays.get("embeddings"),
+    )
+
+
+def prune_snapshots(index_dir: str, keep: int = INDEX_KEEP_SNAPSHOTS) -> None:
+    """Delete all but the `keep` newest snapshots (workers still mapping them keep their files open)."""
+    if not os.path.isdir(index_dir):
+        return
+    snaps = [
+        os.path.join(index_dir, d)
+        for d in os.listdir(index_dir)
+        if os.path.isfile(os.path.join(index_dir, d, "manifest.json"))
+    ]
+    snaps.sort(key=os.path.getmtime, reverse=True)
+    for old in snaps[keep:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def build_snapshot(db: Session, index_dir: str = INDEX_DIR) -> str:
+    """Build the index from the database and write it as a snapshot; returns its path."""
+    version = crud.current_catalog_version(db)
+    fingerprint = catalog_fingerprint(db, version)
+    existing = find_snapshot(index_dir, fingerprint)
+    if existing:
+        return existing
+    ids, docs = professor_docs(db)
+    vecstore = VectorStore(docs)
+    sem_index = SemanticIndex(docs)
+    path = write_snapshot(
+        index_dir, fingerprint, catalog_version=version, ids=ids, docs=docs,
+        vecstore=vecstore, sem_index=sem_index,
+    )
+    prune_snapshots(index_dir)
+    return path
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Build a match-index snapshot for fast startup")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        path = build_snapshot(db, args.index_dir)
+    print(f"✅ Index snapshot at {path} ({time.perf_counter() - started:.1f}s)")
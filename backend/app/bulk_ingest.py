@@ -0,0 +1,462 @@
+# 📦 Streaming bulk loader for the professor catalog (JSON array or CSV rows)
+import csv
+import hashlib
+import json
+import logging
+import time
+from typing import IO, AsyncIterator, Iterable, Iterator, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import crud
+from . import models
+
+logger = logging.getLogger(__name__)
+
+PROFESSOR_COLUMNS = (
+    "id",
+    "name",
+    "department",
+    "email",
+    "research_interests",
+    "profile_link",
+    "personal_site",
+    "photo_url",
+    "updated_at",
+    "content_hash",
+)
+
+
+def iter_json_array(fp: IO[str], chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Yield the objects of a top-level JSON array without loading the whole file.
+
+    Only one chunk plus the object being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # skip whitespace, the opening bracket and separators
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buf):
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            break
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a number at the buffer edge may be cut short; read more first
+                if end < len(buf) or eof:
+                    yield obj
+                    pos = end
+                    continue
+        if eof:
+            if not started:
+                raise ValueError("Expected a JSON array")
+            return
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def iter_csv_records(fp: IO[str]) -> Iterator[dict]:
+    """Map the minimal CSV format (name, dept/department, email, interests) to records."""
+    for row in csv.DictReader(fp):
+        name = (row.get("name") or "").strip()
+        if not name:
+            continue
+        yield {
+            "name": name,
+            "department": (row.get("dept") or row.get("department") or "").strip() or None,
+            "email": (row.get("email") or "").strip() or None,
+            "research_interests": (row.get("interests") or "").strip() or None,
+            "profile_link": None,
+            "photo_url": "",
+        }
+
+
+def skill_keys(p: dict) -> list[str]:
+    seen: list[str] = []
+    for s in p.get("skills") or []:
+        key = (s or "").strip().lower()
+        if key and key not in seen:
+            seen.append(key)
+    return seen
+
+
+def record_hash(p: dict) -> str:
+    """Stable hash of the fields a seed record controls, skills included."""
+    canon = {
+        "name": p.get("name", ""),
+        "department": p.get("department"),
+        "email": p.get("email"),
+        "research_interests": p.get("research_interests"),
+        "profile_link": p.get("profile_link"),
+        "personal_site": p.get("personal_site"),
+        "photo_url": (p.get("photo_url") or ""),
+        "skills": sorted(skill_keys(p)),
+    }
+    raw = json.dumps(canon, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def professor_row(p: dict, pid: int, now: int) -> dict:
+    return {
+        "id": pid,
+        "name": p.get("name", ""),
+        "department": p.get("department"),
+        "email": p.get("email"),
+        "research_interests": p.get("research_interests"),
+        "profile_link": p.get("profile_link"),
+        "personal_site": p.get("personal_site"),
+        "photo_url": (p.get("photo_url") or ""),
+        "updated_at": now,
+        "content_hash": record_hash(p),
+    }
+
+
+class BulkLoader:
+    """Buffers professor records and writes them in large multi-row batches.
+
+    Skills are resolved per batch with one bulk upsert plus one SELECT; professors
+    and professor_skills go out as executemany inserts, or COPY on Postgres.
+    The caller owns the transaction.
+    """
+
+    def __init__(self, db: Session, *, batch_size: int = 5000, use_copy: bool = True):
+        self.db = db
+        self.batch_size = batch_size
+        dialect = db.get_bind().dialect
+        self.dialect = dialect.name
+        self.use_copy = use_copy and dialect.name == "postgresql" and dialect.driver == "psycopg"
+        self.skill_ids: dict[str, int] = {}
+        self._next_id = int(db.scalar(select(func.max(models.Professor.id))) or 0) + 1
+        self._pending: list[tuple[dict, list[str], bool]] = []
+        self.stats = {"professors": 0, "skills": 0, "links": 0, "batches": 0}
+        self._started = time.perf_counter()
+
+    def assign_id(self, p: dict) -> int:
+        if p.get("id") is not None:
+            pid = int(p["id"])
+            self._next_id = max(self._next_id, pid + 1)
+            return pid
+        pid = self._next_id
+        self._next_id += 1
+        return pid
+
+    def add(self, p: dict, pid: Optional[int] = None, *, replace: bool = False) -> int:
+        """Queue a record; `replace=True` overwrites an existing row and its skill links."""
+        pid = self.assign_id(p) if pid is None else pid
+        self._pending.append((professor_row(p, pid, int(time.time())), skill_keys(p), replace))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return pid
+
+    def resolve_skills(self, names: Iterable[str]) -> None:
+        missing = sorted({n for n in names if n not in self.skill_ids})
+        if not missing:
+            return
+        rows = [{"name": n} for n in missing]
+        if self.dialect in {"sqlite", "postgresql"}:
+            if self.dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            self.db.execute(
+                dialect_insert(models.Skill).on_conflict_do_nothing(index_elements=["name"]),
+                rows,
+            )
+        else:
+            existing = set(self.db.scalars(select(models.Skill.name).where(models.Skill.name.in_(missing))))
+            new_rows = [r for r in rows if r["name"] not in existing]
+            if new_rows:
+                self.db.execute(insert(models.Skill), new_rows)
+        self.stats["skills"] += len(missing)
+        # Chunk the IN list to stay under driver parameter limits
+        for i in range(0, len(missing), 500):
+            part = missing[i:i + 500]
+            for sid, name in self.db.execute(
+                select(models.Skill.id, models.Skill.name).where(models.Skill.name.in_(part))
+            ):
+                self.skill_ids[name] = sid
+
+    def _copy(self, table: str, columns: tuple, rows: list[tuple]) -> None:
+        raw = self.db.connection().connection.dbapi_connection
+        with raw.cursor() as cur:
+            with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as cp:
+                for row in rows:
+                    cp.write_row(row)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self.resolve_skills(k for _, keys, _ in batch for k in keys)
+        prof_rows = [row for row, _, replace in batch if not replace]
+        update_rows = [row for row, _, replace in batch if replace]
+        link_rows = [
+            {"professor_id": row["id"], "skill_id": self.skill_ids[k], "updated_at": row["updated_at"]}
+            for row, keys, _ in batch
+            for k in keys
+        ]
+        if update_rows:
+            ids = [r["id"] for r in update_rows]
+            for i in range(0, len(ids), 500):
+                self.db.execute(
+                    delete(models.ProfessorSkill).where(models.ProfessorSkill.professor_id.in_(ids[i:i + 500]))
+                )
+            # ORM bulk UPDATE by primary key: one executemany, no per-object flush
+            self.db.execute(update(models.Professor), update_rows)
+        if self.use_copy:
+            if prof_rows:
+                self._copy("professors", PROFESSOR_COLUMNS, [tuple(r[c] for c in PROFESSOR_COLUMNS) for r in prof_rows])
+            if link_rows:
+                cols = ("professor_id", "skill_id", "updated_at")
+                self._copy("professor_skills", cols, [tuple(r[c] for c in cols) for r in link_rows])
+        else:
+            if prof_rows:
+                self.db.execute(insert(models.Professor), prof_rows)
+            if link_rows:
+                self.db.execute(insert(models.ProfessorSkill), link_rows)
+        self.stats["professors"] += len(batch)
+        self.stats["links"] += len(link_rows)
+        self.stats["batches"] += 1
+
+    def finish(self) -> dict:
+        self.flush()
+        secs = max(time.perf_counter() - self._started, 1e-9)
+        self.stats["seconds"] = round(secs, 3)
+        self.stats["professors_per_second"] = round(self.stats["professors"] / secs, 1)
+        return dict(self.stats)
+
+
+def wipe_catalog(db: Session) -> None:
+    db.execute(delete(models.ProfessorSkill))
+    db.execute(delete(models.Skill))
+    db.execute(delete(models.Professor))
+
+
+def bulk_load(
+    db: Session,
+    records: Iterable[dict],
+    *,
+    wipe: bool = True,
+    batch_size: int = 5000,
+    use_copy: bool = True,
+) -> dict:
+    """Load `records` through BulkLoader inside the caller's transaction; returns throughput stats."""
+    if wipe:
+        wipe_catalog(db)
+    loader = BulkLoader(db, batch_size=batch_size, use_copy=use_copy)
+    for p in records:
+        loader.add(p)
+    stats = loader.finish()
+    # bulk statements bypass the change-feed hook; tell clients to refetch
+    if wipe or stats["professors"]:
+        crud.record_catalog_changes(db, reset=True)
+    logger.info(
+        f"📦 Loaded {stats['professors']} professors, {stats['links']} skill links "
+        f"in {stats['seconds']}s ({stats['professors_per_second']}/s)"
+    )
+    return stats
+
+
+def delete_professors(db: Session, ids: list[int]) -> None:
+    """Delete professors and their skill links by id, then drop skills nobody references."""
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        db.execute(delete(models.ProfessorSkill).where(models.ProfessorSkill.professor_id.in_(part)))
+        db.execute(delete(models.Professor).where(models.Professor.id.in_(part)))
+    if ids:
+        db.execute(
+            delete(models.Skill).where(~models.Skill.id.in_(select(models.ProfessorSkill.skill_id)))
+        )
+
+
+def _match_key(email: Optional[str], name: Optional[str]) -> Optional[str]:
+    key = (email or "").strip().lower() or (name or "").strip().lower()
+    return key or None
+
+
+def sync_catalog(
+    db: Session,
+    records: Iterable[dict],
+    *,
+    batch_size: int = 5000,
+    use_copy: bool = True,
+) -> dict:
+    """Reseed by diff: upsert records whose content hash changed, delete rows missing from the input.
+
+    Records are matched on `id`, or on email/name when they carry none. Unchanged rows
+    are not touched, and the change log gets one entry per changed id, so the match index
+    and caches only refresh those. Stats include the `upserted` and `deleted` id lists.
+    """
+    existing: dict[int, Optional[str]] = {}
+    by_key: dict[str, int] = {}
+    for pid, h, email, name in db.execute(
+        select(models.Professor.id, models.Professor.content_hash, models.Professor.email, models.Professor.name)
+    ):
+        existing[pid] = h
+        key = _match_key(email, name)
+        if key:
+            by_key.setdefault(key, pid)
+
+    loader = BulkLoader(db, batch_size=batch_size, use_copy=use_copy)
+    seen: set[int] = set()
+    upserted: list[int] = []
+    unchanged = 0
+    for p in records:
+        pid = p.get("id")
+        if pid is None:
+            pid = by_key.get(_match_key(p.get("email"), p.get("name")) or "")
+        pid = loader.assign_id({"id": pid})
+        if pid in seen:
+            continue
+        seen.add(pid)
+        if pid in existing:
+            if existing[pid] == record_hash(p):
+                unchanged += 1
+                continue
+            loader.add(p, pid, replace=True)
+        else:
+            loader.add(p, pid)
+        upserted.append(pid)
+    stats = loader.finish()
+
+    deleted = sorted(set(existing) - seen)
+    delete_professors(db, deleted)
+
+    # Core statements bypass the change-feed hook; log the diff explicitly.
+    # A first load into an empty catalog is a reset rather than one entry per row.
+    if existing:
+        crud.record_catalog_changes(db, upserted=upserted, deleted=deleted)
+    elif upserted:
+        crud.record_catalog_changes(db, reset=True)
+    stats.update(upserted=sorted(upserted), deleted=deleted, unchanged=unchanged)
+    logger.info(
+        f"📦 Catalog sync: {len(upserted)} upserted, {len(deleted)} deleted, "
+        f"{unchanged} unchanged in {stats['seconds']}s"
+    )
+    return stats
+
+
+async def aiter_ndjson(chunks: AsyncIterator[bytes], *, max_line_bytes: int = 1 << 20) -> AsyncIterator[tuple[int, object]]:
+    """Yield (line_number, parsed object or ValueError) from a byte stream of NDJSON.
+
+    Holds at most one line (capped at `max_line_bytes`) plus one chunk in memory;
+    blank lines are skipped and oversized lines are reported, not buffered.
+    """
+    buf = b""
+    lineno = 0
+    skipping = False
+
+    def parse(raw: bytes):
+        if len(raw) > max_line_bytes:
+            # a whole oversized line can arrive inside one chunk
+            return ValueError(f"line exceeds {max_line_bytes} bytes")
+        try:
+            return json.loads(raw)
+        except ValueError as e:
+            return ValueError(f"invalid JSON: {e}")
+
+    async for chunk in chunks:
+        buf += chunk
+        while True:
+            nl = buf.find(b"\n")
+            if nl < 0:
+                break
+            raw, buf = buf[:nl], buf[nl + 1:]
+            if skipping:
+                # tail of an oversized line already reported
+                skipping = False
+                continue
+            lineno += 1
+            if raw.strip():
+                yield lineno, parse(raw)
+        if len(buf) > max_line_bytes and not skipping:
+            lineno += 1
+            skipping = True
+            yield lineno, ValueError(f"line exceeds {max_line_bytes} bytes")
+        if skipping:
+            buf = b""
+    if buf.strip() and not skipping:
+        yield lineno + 1, parse(buf)
+
+
+def apply_ingest_batch(db: Session, items: list[tuple[int, dict]], *, use_copy: bool = True) -> dict:
+    """Apply one batch of NDJSON upserts/deletes inside the caller's transaction.
+
+    Each item is (line_number, record). A record carries "op" ("upsert" by default, or
+    "delete") and an "id"; upserts take the seed JSON fields. The last op per id wins,
+    and upserts whose content hash is unchanged are skipped. Changed ids go to the
+    catalog change log.
+    """
+    errors: list[dict] = []
+    ops: dict[int, tuple[str, dict]] = {}
+    for line, rec in items:
+        if not isinstance(rec, dict):
+            errors.append({"line": line, "error": "expected a JSON object"})
+            continue
+        op = rec.get("op") or "upsert"
+        try:
+            pid = int(rec["id"])
+        except (KeyError, TypeError, ValueError):
+            errors.append({"line": line, "error": "id is required"})
+            continue
+        if op not in {"upsert", "delete"}:
+            errors.append({"line": line, "error": f"unknown op {op!r}"})
+            continue
+        if op == "upsert" and not (rec.get("name") or "").strip():
+            errors.append({"line": line, "error": "name is required"})
+            continue
+        ops.pop(pid, None)  # re-insert so the dict keeps last-write order
+        ops[pid] = (op, rec)
+
+    existing: dict[int, Optional[str]] = {}
+    ids = list(ops)
+    for i in range(0, len(ids), 500):
+        for pid, h in db.execute(
+            select(models.Professor.id, models.Professor.content_hash).where(models.Professor.id.in_(ids[i:i + 500]))
+        ):
+            existing[pid] = h
+
+    loader = BulkLoader(db, batch_size=max(1, len(ops)), use_copy=use_copy)
+    upserted: list[int] = []
+    deleted: list[int] = []
+    unchanged = 0
+    for pid, (op, rec) in ops.items():
+        if op == "delete":
+            if pid in existing:
+                deleted.append(pid)
+            continue
+        if existing.get(pid) == record_hash(rec):
+            unchanged += 1
+            continue
+        loader.add(rec, pid, replace=pid in existing)
+        upserted.append(pid)
+    # deletes first so a re-inserted skill is never dropped as unreferenced in between
+    delete_professors(db, sorted(deleted))
+    loader.finish()
+    crud.record_catalog_changes(db, upserted=upserted, deleted=deleted)
+    return {
+        "upserted": len(upserted),
+        "deleted": len(deleted),
+        "unchanged": unchanged,
+        "errors": errors,
+    }
@@ -1,107 +1,937 @@
 # 🚀 Redis caching for similarity calculations and expensive operations
 try:
     import redis  # type: ignore
+    import redis.asyncio as aioredis  # type: ignore
 except Exception:  # pragma: no cover
     redis = None  # type: ignore
-import json
-import hashlib
-from typing import Any, Optional
+    aioredis = None  # type: ignore
+import asyncio
+import fnmatch
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional
 import os
 
+from .cache_codec import Codec, hash_key
+from .metrics import metrics
+
+# Redis connections per worker (per pool: one sync, one asyncio) and idle-connection health checks
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_HEALTH_CHECK_SECONDS = int(os.getenv("REDIS_HEALTH_CHECK_SECONDS", "30"))
+# Fail fast when Redis is slow or down: short socket timeouts, then a circuit breaker
+# that skips Redis after this many consecutive errors and probes it in the background
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))
+REDIS_BREAKER_FAILURES = int(os.getenv("REDIS_BREAKER_FAILURES", "3"))
+REDIS_PROBE_SECONDS = float(os.getenv("REDIS_PROBE_SECONDS", "5"))
+# In-process cache bounds (the whole cache without Redis, the L1 tier with it)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# With Redis, how long a worker may serve its in-process (L1) copy of a key
+CACHE_L1_TTL_SECONDS = float(os.getenv("CACHE_L1_TTL_SECONDS", "30"))
+# Single-flight: how long other workers wait on a refill before computing themselves
+CACHE_FILL_LOCK_SECONDS = float(os.getenv("CACHE_FILL_LOCK_SECONDS", "10"))
+CACHE_FILL_POLL_SECONDS = 0.05
+# XFetch early-refresh aggressiveness (0 disables early refresh)
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))
+# How long a worker trusts its copy of a namespace generation before re-reading Redis
+CACHE_GENERATION_SECONDS = float(os.getenv("CACHE_GENERATION_SECONDS", "1"))
+# SCAN page size for the background cleanup of invalidated namespaces
+CACHE_SWEEP_SCAN_COUNT = int(os.getenv("CACHE_SWEEP_SCAN_COUNT", "500"))
+
+# Key prefixes reported as their own `namespace` metric label; anything else is "other"
+CACHE_METRIC_NAMESPACES = frozenset({"similarity", "professors", "sessions", "embeddings"})
+# Cache calls take microseconds from L1 and around a millisecond from Redis
+CACHE_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def key_namespace(key: str) -> str:
+    prefix = key.partition(":")[0]
+    return prefix if prefix in CACHE_METRIC_NAMESPACES else "other"
+
+
+def record_lookup(namespace: str, result: str, count: int = 1) -> None:
+    """Count cache reads; `result` is l1_hit, redis_hit, miss or error (a failed Redis read)."""
+    if count:
+        metrics.inc("lablink_cache_requests_total", count, help="Cache reads by namespace and result",
+                    namespace=namespace, result=result)
+
+
+def _observe_op(op: str, namespace: str, started: float) -> None:
+    metrics.observe("lablink_cache_op_seconds", time.perf_counter() - started,
+                    help="Cache call latency, L1 plus any Redis round trip",
+                    buckets=CACHE_LATENCY_BUCKETS, namespace=namespace, op=op)
+
+
+def _write_error(namespace: str) -> None:
+    metrics.inc("lablink_cache_write_errors_total", help="Cache writes that did not reach Redis",
+                namespace=namespace)
+
+
+class MemoryBackend:
+    """Thread-safe in-process cache with LRU eviction and per-entry TTL.
+
+    Values are stored encoded (see cache_codec), like in Redis: callers get a fresh
+    copy on every read, and the encoded length is what counts against `max_bytes`.
+    Expired entries are dropped when read and otherwise age out through LRU eviction.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        codec: Optional[Codec] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.codec = codec or Codec.from_env()
+        self.bytes = 0
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple[Optional[float], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _drop(self, key: str) -> bool:
+        item = self._data.pop(key, None)
+        if item is None:
+            return False
+        self.bytes -= len(item[1])
+        return True
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, raw = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+        return self.codec.decode(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return self.set_raw(key, self.codec.encode(value), ttl)
+
+    def set_raw(self, key: str, raw: bytes, ttl: Optional[float] = None) -> bool:
+        """Store an already-encoded value (e.g. bytes just read from Redis)."""
+        if len(raw) > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else None
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (expires_at, raw)
+            self.bytes += len(raw)
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, old_raw) = self._data.popitem(last=False)
+                self.bytes -= len(old_raw)
+                self.evictions += 1
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._drop(key)
+
+    def clear_pattern(self, pattern: str) -> int:
+        """Delete keys matching a Redis-style glob (`prefix:*` is the common case)."""
+        prefix = pattern[:-1] if pattern.endswith("*") and not any(c in pattern[:-1] for c in "*?[") else None
+        with self._lock:
+            if prefix is not None:
+                keys = [k for k in self._data if k.startswith(prefix)]
+            else:
+                keys = [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+            for k in keys:
+                self._drop(k)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+
+class RedisBreaker:
+    """Circuit breaker in front of Redis.
+
+    `failure_threshold` consecutive errors open it: the cache then skips Redis and
+    serves from L1 without paying a timeout per request. A daemon thread pings Redis
+    every `probe_seconds` and closes the breaker (calling `on_recover`) once it answers.
+    """
+
+    def __init__(
+        self,
+        ping: Callable[[], Any],
+        *,
+        failure_threshold: int = REDIS_BREAKER_FAILURES,
+        probe_seconds: float = REDIS_PROBE_SECONDS,
+        on_recover: Optional[Callable[[], None]] = None,
+    ):
+        self.ping = ping
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_seconds = probe_seconds
+        self.on_recover = on_recover
+        self._failures = 0
+        self._open = False
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        return not self._open
+
+    def record_success(self) -> None:
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+
+    def record_failure(self, error: BaseException) -> None:
+        metrics.inc("lablink_cache_redis_errors_total", help="Failed Redis cache commands")
+        with self._lock:
+            self._failures += 1
+            if self._open or self._failures < self.failure_threshold:
+                return
+            self._open = True
+        metrics.inc("lablink_cache_redis_breaker_trips_total", help="Times the Redis circuit breaker opened")
+        print(f"⚠️  Redis unavailable ({error}); using the in-process cache until it recovers")
+        threading.Thread(target=self._probe, name="redis-probe", daemon=True).start()
+
+    def _probe(self) -> None:
+        while True:
+            time.sleep(self.probe_seconds)
+            try:
+                self.ping()
+            except Exception:
+                continue
+            with self._lock:
+                self._open = False
+                self._failures = 0
+            print("✅ Redis reachable again")
+            if self.on_recover is not None:
+                try:
+                    self.on_recover()
+                except Exception as e:
+                    print(f"⚠️  Redis recovery hook failed: {e}")
+            return
+
+
+class _Flight:
+    """One in-progress computation that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
 class CacheManager:
+    """Two-tier cache: a bounded in-process L1 (MemoryBackend) in front of Redis (L2).
+
+    With Redis, L1 copies live at most CACHE_L1_TTL_SECONDS, which bounds how long
+    one worker can serve a value another worker has replaced or deleted. Without
+    Redis, L1 is the only tier and keeps the full TTL.
+
+    Blocking methods use a pooled redis client shared by all threads; the `a*`
+    methods use a redis.asyncio client so async routes never block the event loop.
+    """
+
     def __init__(self):
-        # Try to connect to Redis, fallback to in-memory cache if unavailable
-        try:
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-            if redis is None:
-                raise RuntimeError("redis library not installed")
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
-            self.redis_client.ping()  # Test connection
-            self.redis_available = True
-            print("✅ Redis connected successfully")
+        self.codec = Codec.from_env()
+        self.memory_cache = MemoryBackend(codec=self.codec)
+        self._flights: dict[str, _Flight] = {}
+        self._aflights: dict[str, "asyncio.Future"] = {}
+        self._flights_lock = threading.Lock()
+        # namespace -> (generation, trusted until); see namespace_key()
+        self._generations: dict[str, tuple[int, float]] = {}
+        self._gen_lock = threading.Lock()
+        self._sweeps: dict[str, bool] = {}  # namespace -> rerun requested while sweeping
+        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        self._pool_options = {
+            "max_connections": REDIS_MAX_CONNECTIONS,
+            "health_check_interval": REDIS_HEALTH_CHECK_SECONDS,
+            "socket_timeout": REDIS_SOCKET_TIMEOUT,
+            "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        }
+        self._aredis = None
+        self._aredis_loop = None
+        # Namespaces invalidated while Redis was unreachable; replayed on recovery
+        self._pending_invalidations: set[str] = set()
+        self._reported_evictions = 0
+        self.breaker = RedisBreaker(self._ping, on_recover=self._replay_invalidations)
+        # No connection is made here: the pool connects on first use, so a slow or
+        # down Redis never delays startup, and the breaker handles it from then on.
+        self.redis_client = None
+        if redis is None:
+            print("⚠️  redis library not installed, using in-memory cache")
+        elif not self.redis_url:
+            print("ℹ️  REDIS_URL is empty, using in-memory cache")
+        else:
+            # values are binary (see cache_codec); text replies come back as bytes too
+            pool = redis.ConnectionPool.from_url(self.redis_url, **self._pool_options)
+            self.redis_client = redis.Redis(connection_pool=pool)
+        metrics.register_collector(self._collect_metrics)
+
+    @property
+    def redis_configured(self) -> bool:
+        return self.redis_client is not None
+
+    @property
+    def redis_available(self) -> bool:
+        """Redis is configured and the breaker is closed (it may still fail; that trips it)."""
+        return self.redis_client is not None and self.breaker.healthy
+
+    def _ping(self) -> None:
+        self.redis_client.ping()
+
+    def _collect_metrics(self) -> None:
+        l1 = self.memory_cache
+        metrics.set("lablink_cache_l1_entries", len(l1), help="Entries in the in-process cache")
+        metrics.set("lablink_cache_l1_bytes", l1.bytes, help="Encoded bytes held by the in-process cache")
+        metrics.set("lablink_cache_l1_max_bytes", l1.max_bytes, help="In-process cache byte budget (CACHE_MAX_BYTES)")
+        evictions = l1.evictions
+        metrics.inc("lablink_cache_l1_evictions_total", evictions - self._reported_evictions,
+                    help="Entries evicted from the in-process cache to stay within its bounds")
+        self._reported_evictions = evictions
+        if self.redis_configured:
+            metrics.set("lablink_cache_redis_healthy", 1 if self.breaker.healthy else 0,
+                        help="1 while the cache is using Redis, 0 while the breaker is open")
+
+    def _r(self, command: str, *args, **kwargs):
+        """Run one blocking Redis command through the breaker (errors still propagate)."""
+        try:
+            result = getattr(self.redis_client, command)(*args, **kwargs)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _ar(self, command: str, *args, **kwargs):
+        try:
+            result = await getattr(self._async_client(), command)(*args, **kwargs)
         except Exception as e:
-            print(f"⚠️  Redis not available, using in-memory cache: {e}")
-            self.redis_client = None
-            self.redis_available = False
-            self.memory_cache = {}
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+        return result
     
+    def _async_client(self):
+        """redis.asyncio client for the running loop (its pool cannot be shared across loops)."""
+        loop = asyncio.get_running_loop()
+        if self._aredis is None or self._aredis_loop is not loop:
+            pool = aioredis.ConnectionPool.from_url(self.redis_url, **self._pool_options)
+            self._aredis = aioredis.Redis(connection_pool=pool)
+            self._aredis_loop = loop
+        return self._aredis
+
+    async def aclose(self) -> None:
+        if self._aredis is not None:
+            await self._aredis.aclose()
+            self._aredis = None
+
     def _generate_key(self, prefix: str, data: Any) -> str:
         """Generate a cache key from data"""
-        data_str = json.dumps(data, sort_keys=True) if isinstance(data, dict) else str(data)
-        hash_obj = hashlib.md5(data_str.encode())
-        return f"{prefix}:{hash_obj.hexdigest()}"
+        return f"{prefix}:{hash_key(data)}"
+
+    def _l1_ttl(self, ttl: Optional[float]) -> Optional[float]:
+        # capped whenever Redis is configured, so L1 never outlives it after an outage
+        if not self.redis_configured:
+            return ttl
+        return min(ttl, CACHE_L1_TTL_SECONDS) if ttl and ttl > 0 else CACHE_L1_TTL_SECONDS
     
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
+    def _from_redis(self, key: str, raw: Optional[bytes], l1: bool = True) -> Optional[Any]:
+        """Decode a Redis reply and copy it into L1 (unless `l1` is False)."""
+        if not raw:
+            return None
         try:
-            if self.redis_available:
-                value = self.redis_client.get(key)
-                return json.loads(value) if value else None
-            else:
-                return self.memory_cache.get(key)
+            value = self.codec.decode(raw)
         except Exception:
             return None
-    
-    def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
-        """Set value in cache with TTL (seconds)"""
+        if l1:
+            self.memory_cache.set_raw(key, raw, self._l1_ttl(None))
+        return value
+
+    def _encode_into_l1(self, key: str, value: Any, ttl: int, l1: bool = True) -> Optional[bytes]:
         try:
-            if self.redis_available:
-                return self.redis_client.setex(key, ttl, json.dumps(value))
+            raw = self.codec.encode(value)
+        except Exception:
+            return None
+        if l1:
+            self.memory_cache.set_raw(key, raw, self._l1_ttl(ttl))
+        return raw
+
+    def _l1_many(self, keys: Iterable[str]) -> tuple[dict[str, Any], list[str]]:
+        found: dict[str, Any] = {}
+        missing: list[str] = []
+        for key in dict.fromkeys(keys):
+            value = self.memory_cache.get(key)
+            if value is not None:
+                found[key] = value
+                record_lookup(key_namespace(key), "l1_hit")
             else:
-                self.memory_cache[key] = value
+                missing.append(key)
+        if not self.redis_available:
+            for key in missing:
+                record_lookup(key_namespace(key), "miss")
+        return found, missing
+
+    def _absorb(self, found: dict[str, Any], keys: list[str], raws: Optional[list]) -> dict[str, Any]:
+        """Merge an MGET reply into `found` (`raws` is None when the MGET failed)."""
+        for i, key in enumerate(keys):
+            value = self._from_redis(key, raws[i]) if raws is not None else None
+            if value is not None:
+                found[key] = value
+            record_lookup(key_namespace(key), "error" if raws is None else "miss" if value is None else "redis_hit")
+        return found
+
+    def _l1_get(self, key: str, namespace: str) -> tuple[Optional[Any], bool]:
+        """(value, done): done when L1 answered or there is no Redis to ask."""
+        value = self.memory_cache.get(key)
+        if value is not None:
+            record_lookup(namespace, "l1_hit")
+            return value, True
+        if not self.redis_available:
+            record_lookup(namespace, "miss")
+            return None, True
+        return None, False
+
+    def _l2_result(self, key: str, namespace: str, raw: Optional[bytes], l1: bool = True) -> Optional[Any]:
+        value = self._from_redis(key, raw, l1)
+        record_lookup(namespace, "miss" if value is None else "redis_hit")
+        return value
+
+    def get(self, key: str, *, l1: bool = True) -> Optional[Any]:
+        """Get value from cache (L1, then Redis; Redis hits are copied into L1).
+
+        With `l1=False` only Redis is read (and nothing is copied into L1), for values
+        that must not outlive a delete made by another worker.
+        """
+        started, namespace = time.perf_counter(), key_namespace(key)
+        try:
+            if l1:
+                value, done = self._l1_get(key, namespace)
+                if done:
+                    return value
+            elif not self.redis_available:
+                record_lookup(namespace, "miss")
+                return None
+            try:
+                raw = self._r("get", key)
+            except Exception:
+                record_lookup(namespace, "error")
+                return None
+            return self._l2_result(key, namespace, raw, l1)
+        finally:
+            _observe_op("get", namespace, started)
+    
+    def set(self, key: str, value: Any, ttl: int = 3600, *, l1: bool = True) -> bool:
+        """Set value in cache with TTL (seconds); `l1=False` writes Redis only"""
+        started, namespace = time.perf_counter(), key_namespace(key)
+        try:
+            raw = self._encode_into_l1(key, value, ttl, l1)
+            if raw is None:
+                return False
+            if not self.redis_available:
                 return True
-        except Exception:
-            return False
+            try:
+                return bool(self._r("setex", key, ttl, raw))
+            except Exception:
+                _write_error(namespace)
+                return False
+        finally:
+            _observe_op("set", namespace, started)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """{key: value} for the keys that are cached: L1 first, then one MGET for the rest"""
+        keys = list(keys)
+        started, namespace = time.perf_counter(), key_namespace(keys[0]) if keys else "other"
+        try:
+            found, missing = self._l1_many(keys)
+            if not missing or not self.redis_available:
+                return found
+            try:
+                raws = self._r("mget", missing)
+            except Exception:
+                raws = None
+            return self._absorb(found, missing, raws)
+        finally:
+            _observe_op("get_many", namespace, started)
+
+    def set_many(self, values: dict[str, Any], ttl: int = 3600) -> bool:
+        """Set several values with one pipelined round trip"""
+        started, namespace = time.perf_counter(), key_namespace(next(iter(values), ""))
+        try:
+            encoded = {key: self._encode_into_l1(key, value, ttl) for key, value in values.items()}
+            if not self.redis_available:
+                return True
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, raw in encoded.items():
+                    if raw is not None:
+                        pipe.setex(key, ttl, raw)
+                pipe.execute()
+            except Exception as e:
+                self.breaker.record_failure(e)
+                _write_error(namespace)
+                return False
+            self.breaker.record_success()
+            return True
+        finally:
+            _observe_op("set_many", namespace, started)
+
+    # ---- asyncio variants (same semantics, non-blocking Redis) ----
+
+    async def aget(self, key: str) -> Optional[Any]:
+        started, namespace = time.perf_counter(), key_namespace(key)
+        try:
+            value, done = self._l1_get(key, namespace)
+            if done:
+                return value
+            try:
+                raw = await self._ar("get", key)
+            except Exception:
+                record_lookup(namespace, "error")
+                return None
+            return self._l2_result(key, namespace, raw)
+        finally:
+            _observe_op("get", namespace, started)
+
+    async def aset(self, key: str, value: Any, ttl: int = 3600) -> bool:
+        started, namespace = time.perf_counter(), key_namespace(key)
+        try:
+            raw = self._encode_into_l1(key, value, ttl)
+            if raw is None:
+                return False
+            if not self.redis_available:
+                return True
+            try:
+                return bool(await self._ar("setex", key, ttl, raw))
+            except Exception:
+                _write_error(namespace)
+                return False
+        finally:
+            _observe_op("set", namespace, started)
+
+    async def aget_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        keys = list(keys)
+        started, namespace = time.perf_counter(), key_namespace(keys[0]) if keys else "other"
+        try:
+            found, missing = self._l1_many(keys)
+            if not missing or not self.redis_available:
+                return found
+            try:
+                raws = await self._ar("mget", missing)
+            except Exception:
+                raws = None
+            return self._absorb(found, missing, raws)
+        finally:
+            _observe_op("get_many", namespace, started)
+
+    async def aset_many(self, values: dict[str, Any], ttl: int = 3600) -> bool:
+        started, namespace = time.perf_counter(), key_namespace(next(iter(values), ""))
+        try:
+            encoded = {key: self._encode_into_l1(key, value, ttl) for key, value in values.items()}
+            if not self.redis_available:
+                return True
+            try:
+                pipe = self._async_client().pipeline(transaction=False)
+                for key, raw in encoded.items():
+                    if raw is not None:
+                        pipe.setex(key, ttl, raw)
+                await pipe.execute()
+            except Exception as e:
+                self.breaker.record_failure(e)
+                _write_error(namespace)
+                return False
+            self.breaker.record_success()
+            return True
+        finally:
+            _observe_op("set_many", namespace, started)
     
     def delete(self, key: str) -> bool:
         """Delete key from cache"""
+        deleted = self.memory_cache.delete(key)
+        if not self.redis_available:
+            return deleted
         try:
-            if self.redis_available:
-                return bool(self.redis_client.delete(key))
-            else:
-                return self.memory_cache.pop(key, None) is not None
+            return bool(self._r("delete", key)) or deleted
         except Exception:
-            return False
+            return deleted
     
     def clear_pattern(self, pattern: str) -> int:
-        """Clear all keys matching pattern"""
+        """Clear all keys matching pattern.
+
+        Walks Redis with SCAN, so it never blocks the server, but it is still O(keyspace);
+        prefer invalidate_namespace() for anything on a request path.
+        """
+        cleared = self.memory_cache.clear_pattern(pattern)
+        if not self.redis_available:
+            return cleared
         try:
-            if self.redis_available:
-                keys = self.redis_client.keys(pattern)
-                return self.redis_client.delete(*keys) if keys else 0
-            else:
-                # For memory cache, we'd need to implement pattern matching
-                return 0
+            return self._unlink_matching(pattern, lambda key: True)
         except Exception:
             return 0
 
+    def _unlink_matching(self, pattern: str, should_delete: Callable[[str], bool]) -> int:
+        removed = 0
+        batch: list[str] = []
+        try:
+            for key in self.redis_client.scan_iter(match=pattern, count=CACHE_SWEEP_SCAN_COUNT):
+                if should_delete(key.decode()):
+                    batch.append(key)
+                if len(batch) >= CACHE_SWEEP_SCAN_COUNT:
+                    removed += self.redis_client.unlink(*batch)
+                    batch = []
+            if batch:
+                removed += self.redis_client.unlink(*batch)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        return removed
+
+    # ---- namespaces ----
+    # Keys are "<namespace>:<generation>:<suffix>". Invalidating a namespace bumps its
+    # generation (one INCR), so old keys are simply never read again; a background
+    # SCAN unlinks them, and their TTLs would expire them regardless.
+
+    def _known_generation(self, namespace: str) -> Optional[int]:
+        """This worker's copy of the generation if still trusted, else None (re-read Redis)."""
+        with self._gen_lock:
+            cached = self._generations.get(namespace)
+        if not self.redis_available:
+            return cached[0] if cached is not None else 0
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        return None
+
+    def _remember_generation(self, namespace: str, raw: Optional[bytes]) -> int:
+        gen = int(raw or 0)
+        with self._gen_lock:
+            self._generations[namespace] = (gen, time.monotonic() + CACHE_GENERATION_SECONDS)
+        return gen
+
+    def _last_generation(self, namespace: str) -> int:
+        with self._gen_lock:
+            cached = self._generations.get(namespace)
+        return cached[0] if cached is not None else 0
+
+    def generation(self, namespace: str) -> int:
+        gen = self._known_generation(namespace)
+        if gen is not None:
+            return gen
+        try:
+            return self._remember_generation(namespace, self._r("get", f"cachegen:{namespace}"))
+        except Exception:
+            return self._last_generation(namespace)
+
+    async def ageneration(self, namespace: str) -> int:
+        gen = self._known_generation(namespace)
+        if gen is not None:
+            return gen
+        try:
+            raw = await self._ar("get", f"cachegen:{namespace}")
+        except Exception:
+            return self._last_generation(namespace)
+        return self._remember_generation(namespace, raw)
+
+    def namespace_key(self, namespace: str, suffix: str) -> str:
+        """Key for `suffix` in the current generation of `namespace`."""
+        return f"{namespace}:{self.generation(namespace)}:{suffix}"
+
+    async def anamespace_key(self, namespace: str, suffix: str) -> str:
+        return f"{namespace}:{await self.ageneration(namespace)}:{suffix}"
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        """Retire every key in `namespace` in O(1); returns the new generation.
+
+        Other workers see the new generation within CACHE_GENERATION_SECONDS.
+        """
+        with self._gen_lock:
+            gen = self._generations.get(namespace, (0, 0.0))[0] + 1
+        bumped = False
+        if self.redis_available:
+            try:
+                gen = int(self._r("incr", f"cachegen:{namespace}"))
+                bumped = True
+            except Exception:
+                pass
+        if self.redis_configured and not bumped:
+            # the local bump hides this worker's stale entries; other workers learn
+            # about it when Redis is back and the bump is replayed
+            with self._gen_lock:
+                self._pending_invalidations.add(namespace)
+        with self._gen_lock:
+            self._generations[namespace] = (gen, time.monotonic() + CACHE_GENERATION_SECONDS)
+        # free this worker's stale L1 copies now rather than waiting for LRU
+        self.memory_cache.clear_pattern(f"{namespace}:*")
+        if self.redis_available:
+            self._start_sweep(namespace)
+        return gen
+
+    def _replay_invalidations(self) -> None:
+        with self._gen_lock:
+            pending, self._pending_invalidations = self._pending_invalidations, set()
+        for namespace in pending:
+            self.invalidate_namespace(namespace)
+
+    def _start_sweep(self, namespace: str) -> None:
+        with self._gen_lock:
+            if namespace in self._sweeps:
+                self._sweeps[namespace] = True
+                return
+            self._sweeps[namespace] = False
+        threading.Thread(
+            target=self._sweep, args=(namespace,), name=f"cache-sweep-{namespace}", daemon=True
+        ).start()
+
+    def _sweep(self, namespace: str) -> None:
+        """Unlink keys from older generations of `namespace`, one SCAN page at a time."""
+        while True:
+            try:
+                current = int(self._r("get", f"cachegen:{namespace}") or 0)
+
+                def stale(key: str) -> bool:
+                    gen = key.split(":", 2)[1]
+                    # keys from before namespacing have no generation; they are orphans too
+                    return not gen.isdigit() or int(gen) < current
+
+                removed = self._unlink_matching(f"{namespace}:*", stale)
+                if removed:
+                    print(f"🧹 Removed {removed} stale '{namespace}' cache keys")
+            except Exception as e:
+                print(f"⚠️  Cache sweep for '{namespace}' failed: {e}")
+            with self._gen_lock:
+                if not self._sweeps.get(namespace):
+                    self._sweeps.pop(namespace, None)
+                    return
+                self._sweeps[namespace] = False
+
+    # ---- single-flight compute ----
+    # Values written by get_or_compute are wrapped as {"v": value, "delta": compute
+    # seconds, "exp": expiry epoch}; read those keys back through get_or_compute.
+
+    @staticmethod
+    def _refresh_due(env: dict, now: float, beta: float) -> bool:
+        """XFetch: recompute early with a probability that rises as expiry nears.
+
+        Slow computations (large delta) start refreshing sooner, so the value is
+        usually replaced before it expires and no request sees a miss.
+        """
+        if beta <= 0:
+            return now >= env["exp"]
+        return now - env["delta"] * beta * math.log(1.0 - random.random()) >= env["exp"]
+
+    def _try_fill_lock(self, key: str) -> Optional[str]:
+        """Cross-worker lock on refilling `key`; returns the lock token, or None if held elsewhere."""
+        if not self.redis_available:
+            return ""
+        token = uuid.uuid4().hex
+        try:
+            ok = self._r("set", f"lock:{key}", token, nx=True, px=int(CACHE_FILL_LOCK_SECONDS * 1000))
+        except Exception:
+            return ""
+        return token if ok else None
+
+    def _release_fill_lock(self, key: str, token: Optional[str]) -> None:
+        if not token:
+            return
+        try:
+            if self._r("get", f"lock:{key}") == token.encode():
+                self._r("delete", f"lock:{key}")
+        except Exception:
+            pass
+
+    async def _atry_fill_lock(self, key: str) -> Optional[str]:
+        if not self.redis_available:
+            return ""
+        token = uuid.uuid4().hex
+        try:
+            ok = await self._ar("set", f"lock:{key}", token, nx=True, px=int(CACHE_FILL_LOCK_SECONDS * 1000))
+        except Exception:
+            return ""
+        return token if ok else None
+
+    async def _arelease_fill_lock(self, key: str, token: Optional[str]) -> None:
+        if not token:
+            return
+        try:
+            if await self._ar("get", f"lock:{key}") == token.encode():
+                await self._ar("delete", f"lock:{key}")
+        except Exception:
+            pass
+
+    @staticmethod
+    def computed_entry(value: Any, ttl: int, started: float) -> dict:
+        """Wrap `value` the way get_or_compute stores it (`started` is its time.monotonic() start)."""
+        return {"v": value, "delta": time.monotonic() - started, "exp": time.time() + ttl}
+
+    @staticmethod
+    def _observe_compute(key: str, env: dict, early: bool) -> None:
+        namespace = key_namespace(key)
+        metrics.observe("lablink_cache_compute_seconds", env["delta"],
+                        help="Time to recompute a cached value on a miss or early refresh",
+                        namespace=namespace)
+        if early:
+            metrics.inc("lablink_cache_early_refresh_total", help="XFetch refreshes before expiry",
+                        namespace=namespace)
+
+    def _store(self, key: str, value: Any, ttl: int, started: float, early: bool = False) -> None:
+        env = self.computed_entry(value, ttl, started)
+        self._observe_compute(key, env, early)
+        self.set(key, env, ttl)
+
+    def get_or_compute(
+        self, key: str, compute: Callable[[], Any], ttl: int = 3600, *, beta: float = CACHE_EARLY_REFRESH_BETA
+    ) -> Any:
+        """Return the cached value for `key`, computing it at most once across callers.
+
+        Concurrent misses in this process wait for a single `compute()`; with Redis, a
+        short lock keeps other workers from recomputing too (they wait for the value
+        to appear, up to CACHE_FILL_LOCK_SECONDS). During an early refresh everyone but
+        the refreshing caller keeps getting the current value.
+        """
+        env = self.get(key)
+        if env is not None and not self._refresh_due(env, time.time(), beta):
+            return env["v"]
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if env is not None:
+                return env["v"]
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._fill(key, compute, ttl, env)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _fill(self, key: str, compute: Callable[[], Any], ttl: int, stale: Optional[dict]) -> Any:
+        token = self._try_fill_lock(key)
+        if token is None:
+            if stale is not None:
+                return stale["v"]
+            deadline = time.monotonic() + CACHE_FILL_LOCK_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(CACHE_FILL_POLL_SECONDS)
+                env = self.get(key)
+                if env is not None:
+                    return env["v"]
+            # the lock holder is slow or gone; compute here
+        try:
+            started = time.monotonic()
+            value = compute()
+            self._store(key, value, ttl, started, early=stale is not None)
+            return value
+        finally:
+            self._release_fill_lock(key, token)
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 3600,
+        *,
+        beta: float = CACHE_EARLY_REFRESH_BETA,
+    ) -> Any:
+        """Async get_or_compute for event-loop callers; `compute` is a coroutine function."""
+        env = await self.aget(key)
+        if env is not None and not self._refresh_due(env, time.time(), beta):
+            return env["v"]
+        while (fut := self._aflights.get(key)) is not None:
+            if env is not None:
+                return env["v"]
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+                # the leader was cancelled (its client went away); take over
+        fut = self._aflights[key] = asyncio.get_running_loop().create_future()
+        try:
+            token = await self._atry_fill_lock(key)
+            if token is None:
+                if env is not None:
+                    value = env["v"]
+                else:
+                    value = await self._await_fill(key, compute, ttl)
+            else:
+                try:
+                    started = time.monotonic()
+                    value = await compute()
+                    entry = self.computed_entry(value, ttl, started)
+                    self._observe_compute(key, entry, early=env is not None)
+                    await self.aset(key, entry, ttl)
+                finally:
+                    await self._arelease_fill_lock(key, token)
+            fut.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            # waiters re-raise it; mark it retrieved so an unawaited future does not warn
+            fut.exception()
+            raise
+        finally:
+            self._aflights.pop(key, None)
+
+    async def _await_fill(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: int) -> Any:
+        deadline = time.monotonic() + CACHE_FILL_LOCK_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(CACHE_FILL_POLL_SECONDS)
+            env = await self.aget(key)
+            if env is not None:
+                return env["v"]
+        started = time.monotonic()
+        value = await compute()
+        entry = self.computed_entry(value, ttl, started)
+        self._observe_compute(key, entry, early=False)
+        await self.aset(key, entry, ttl)
+        return value
+
 # Global cache instance
 cache = CacheManager()
 
 def cache_similarity_results(query_hash: str, results: list, ttl: int = 1800) -> bool:
     """Cache similarity calculation results"""
-    key = f"similarity:{query_hash}"
+    key = cache.namespace_key("similarity", query_hash)
     return cache.set(key, results, ttl)
 
 def get_cached_similarity_results(query_hash: str) -> Optional[list]:
     """Get cached similarity calculation results"""
-    key = f"similarity:{query_hash}"
+    key = cache.namespace_key("similarity", query_hash)
     return cache.get(key)
 
 def cache_professor_list(department: str, professors: list, ttl: int = 3600) -> bool:
     """Cache professor list by department"""
-    key = f"professors:{department or 'all'}"
+    key = cache.namespace_key("professors", department or 'all')
     return cache.set(key, professors, ttl)
 
 def get_cached_professor_list(department: str) -> Optional[list]:
     """Get cached professor list by department"""
-    key = f"professors:{department or 'all'}"
+    key = cache.namespace_key("professors", department or 'all')
     return cache.get(key)
 
 def clear_professor_cache():
     """Clear all professor-related cache"""
-    return cache.clear_pattern("professors:*")
+    return cache.invalidate_namespace("professors")
 
 def clear_similarity_cache():
     """Clear all similarity-related cache"""
-    return cache.clear_pattern("similarity:*")
+    return cache.invalidate_namespace("similarity")
@@ -0,0 +1,165 @@
+# 🗜️ Cache value formats: pluggable serializers, size-gated compression, fast key hashing
+import hashlib
+import json
+import os
+import zlib
+from typing import Any, Callable, Optional
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+try:
+    import msgpack  # type: ignore
+except Exception:  # pragma: no cover
+    msgpack = None  # type: ignore
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+try:
+    import lz4.frame as lz4_frame  # type: ignore
+except Exception:  # pragma: no cover
+    lz4_frame = None  # type: ignore
+try:
+    import xxhash  # type: ignore
+except Exception:  # pragma: no cover
+    xxhash = None  # type: ignore
+
+# "auto" picks the first installed of orjson, msgpack, json
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "auto")
+# "auto" picks zstd, then lz4, else no compression; "zlib" and "none" are also accepted
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "auto")
+# Values smaller than this are stored uncompressed
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+
+
+class Serializer:
+    def __init__(self, name: str, code: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+        self.name = name
+        self.code = code
+        self.dumps = dumps
+        self.loads = loads
+
+
+class Compressor:
+    def __init__(self, name: str, code: int, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]):
+        self.name = name
+        self.code = code
+        self.compress = compress
+        self.decompress = decompress
+
+
+SERIALIZERS: dict[str, Serializer] = {
+    "json": Serializer(
+        "json", 1, lambda v: json.dumps(v, separators=(",", ":")).encode(), json.loads,
+    ),
+}
+if orjson is not None:
+    # non-str dict keys are stringified, as json.dumps does
+    SERIALIZERS["orjson"] = Serializer(
+        "orjson", 2, lambda v: orjson.dumps(v, option=orjson.OPT_NON_STR_KEYS), orjson.loads,
+    )
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = Serializer(
+        "msgpack", 3,
+        lambda v: msgpack.packb(v, use_bin_type=True),
+        lambda b: msgpack.unpackb(b, raw=False, strict_map_key=False),
+    )
+
+COMPRESSORS: dict[str, Compressor] = {
+    "zlib": Compressor("zlib", 1, lambda b: zlib.compress(b, 1), zlib.decompress),
+}
+if zstandard is not None:
+    # module-level helpers rather than shared (de)compressor objects, which are not thread-safe
+    COMPRESSORS["zstd"] = Compressor("zstd", 2, lambda b: zstandard.compress(b, 3), zstandard.decompress)
+if lz4_frame is not None:
+    COMPRESSORS["lz4"] = Compressor("lz4", 3, lz4_frame.compress, lz4_frame.decompress)
+
+_SERIALIZER_CODES = {s.code: s for s in SERIALIZERS.values()}
+_COMPRESSOR_CODES = {c.code: c for c in COMPRESSORS.values()}
+
+
+def get_serializer(name: str = CACHE_SERIALIZER) -> Serializer:
+    if name == "auto":
+        name = next(n for n in ("orjson", "msgpack", "json") if n in SERIALIZERS)
+    if name not in SERIALIZERS:
+        print(f"⚠️  Cache serializer '{name}' not installed, using json")
+        name = "json"
+    return SERIALIZERS[name]
+
+
+def get_compressor(name: str = CACHE_COMPRESSION) -> Optional[Compressor]:
+    if name == "auto":
+        name = next((n for n in ("zstd", "lz4") if n in COMPRESSORS), "none")
+    if name == "none":
+        return None
+    if name not in COMPRESSORS:
+        print(f"⚠️  Cache compression '{name}' not installed, storing uncompressed")
+        return None
+    return COMPRESSORS[name]
+
+
+class Codec:
+    """Encodes cache values as bytes: b"\\x00", one format byte, then the payload.
+
+    The format byte records the serializer (low nibble) and compressor (high nibble),
+    so values written with another configuration (or by an older deploy) still decode.
+    Anything without the NUL prefix is treated as the plain JSON text stored before
+    this format existed.
+    """
+
+    MAGIC = 0
+
+    def __init__(
+        self,
+        serializer: Optional[Serializer] = None,
+        compressor: Optional[Compressor] = None,
+        compress_min_bytes: int = CACHE_COMPRESS_MIN_BYTES,
+    ):
+        self.serializer = serializer or get_serializer()
+        self.compressor = compressor
+        self.compress_min_bytes = compress_min_bytes
+
+    @classmethod
+    def from_env(cls) -> "Codec":
+        return cls(get_serializer(), get_compressor())
+
+    def encode(self, value: Any, *, compress: bool = True) -> bytes:
+        payload = self.serializer.dumps(value)
+        comp = 0
+        if compress and self.compressor is not None and len(payload) >= self.compress_min_bytes:
+            packed = self.compressor.compress(payload)
+            if len(packed) < len(payload):
+                payload, comp = packed, self.compressor.code
+        return bytes((self.MAGIC, (comp << 4) | self.serializer.code)) + payload
+
+    def decode(self, raw: bytes) -> Any:
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if not raw or raw[0] != self.MAGIC:
+            return json.loads(raw)
+        fmt = raw[1]
+        payload = raw[2:]
+        comp = fmt >> 4
+        if comp:
+            compressor = _COMPRESSOR_CODES.get(comp)
+            if compressor is None:
+                raise ValueError(f"cache value compressed with unavailable codec {comp}")
+            payload = compressor.decompress(payload)
+        serializer = _SERIALIZER_CODES.get(fmt & 0x0F)
+        if serializer is None:
+            raise ValueError(f"cache value encoded with unavailable serializer {fmt & 0x0F}")
+        return serializer.loads(payload)
+
+
+def hash_key(data: Any) -> str:
+    """Stable 128-bit hex digest of `data` for cache keys (not for security)."""
+    if isinstance(data, dict):
+        raw = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS) if orjson is not None \
+            else json.dumps(data, sort_keys=True).encode()
+    else:
+        raw = str(data).encode()
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(raw)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
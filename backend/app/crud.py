@@ -1,6 +1,7 @@
 # 🛠️ Helper functions to Create, Read, Update, Delete (CRUD) data in DB.
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from sqlalchemy import func, insert
+from typing import Iterable, List, Optional
 import time
 from . import models
 import secrets, time
@@ -38,6 +39,20 @@ def get_professor(db: Session, professor_id: int) -> Optional[models.Professor]:
         .first()
     )
 
+def get_professors_by_ids(db: Session, ids: Iterable[int]) -> List[models.Professor]:
+    ids = list(ids)
+    if not ids:
+        return []
+    return (
+        db.query(models.Professor)
+        .options(
+            joinedload(models.Professor.professor_skills).joinedload(models.ProfessorSkill.skill)
+        )
+        .filter(models.Professor.id.in_(ids))
+        .order_by(models.Professor.id)
+        .all()
+    )
+
 def list_departments(db: Session) -> List[str]:
     rows = db.query(models.Professor.department).distinct().all()
     deps = sorted([r[0].strip() for r in rows if r and r[0]])
@@ -97,6 +112,21 @@ def delete_session(db: Session, token: str) -> None:
         db.delete(obj)
         db.commit()
 
+def extend_session(db: Session, token: str, *, ttl_seconds: int = 1800) -> Optional[int]:
+    """Slide a session's expiry by token in one UPDATE; returns the new expiry or None."""
+    expires_at = int(time.time()) + ttl_seconds
+    try:
+        n = (
+            db.query(models.SessionToken)
+            .filter(models.SessionToken.token == token)
+            .update({models.SessionToken.expires_at: expires_at}, synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return expires_at if n else None
+
 def touch_session(db: Session, sess: models.SessionToken, *, ttl_seconds: int = 1800) -> None:
     """Extend the session expiration (sliding session)."""
     try:
@@ -105,3 +135,78 @@ def touch_session(db: Session, sess: models.SessionToken, *, ttl_seconds: int =
         db.commit()
     except Exception:
         db.rollback()
+
+
+# ---- Catalog change feed ----
+
+def current_catalog_version(db: Session) -> int:
+    return int(db.query(func.max(models.CatalogChange.version)).scalar() or 0)
+
+def record_catalog_changes(
+    db: Session,
+    *,
+    upserted: Iterable[int] = (),
+    deleted: Iterable[int] = (),
+    reset: bool = False,
+) -> None:
+    """Log changes made through bulk statements that bypass the ORM flush hook."""
+    now = int(time.time())
+    rows = [{"professor_id": pid, "op": "upsert", "changed_at": now} for pid in upserted]
+    rows += [{"professor_id": pid, "op": "delete", "changed_at": now} for pid in deleted]
+    if reset:
+        rows.append({"professor_id": None, "op": "reset", "changed_at": now})
+    if rows:
+        version = models.next_catalog_version(db.connection())
+        db.execute(insert(models.CatalogChange), [{**row, "version": version} for row in rows])
+
+def list_catalog_changes(db: Session, since: int) -> dict:
+    """Collapse changes after version `since` into upserted/deleted professor ids.
+
+    `full_refetch` is set when the client never synced, when the log no longer
+    covers `since` (pruned), when a reset happened after it, or when `since` is
+    ahead of the server (database was rebuilt).
+    """
+    version = current_catalog_version(db)
+    out = {"version": version, "full_refetch": False, "upserted": [], "deleted": []}
+    if since <= 0 or since > version:
+        out["full_refetch"] = since != version
+        return out
+    oldest = int(db.query(func.min(models.CatalogChange.version)).scalar() or 0)
+    if since < oldest - 1:
+        out["full_refetch"] = True
+        return out
+    rows = (
+        db.query(models.CatalogChange.professor_id, models.CatalogChange.op)
+        .filter(models.CatalogChange.version > since, models.CatalogChange.version <= version)
+        .order_by(models.CatalogChange.version, models.CatalogChange.id)
+        .all()
+    )
+    return collapse_catalog_changes(out, rows)
+
+def collapse_catalog_changes(out: dict, rows) -> dict:
+    """Fold ordered (professor_id, op) rows into `out`; the last op per id wins."""
+    last_op: dict[int, str] = {}
+    for pid, op in rows:
+        if op == "reset":
+            out["full_refetch"] = True
+            return out
+        last_op[pid] = op
+    out["upserted"] = sorted(pid for pid, op in last_op.items() if op == "upsert")
+    out["deleted"] = sorted(pid for pid, op in last_op.items() if op == "delete")
+    return out
+
+def prune_catalog_changes(db: Session, *, older_than: int) -> int:
+    """Drop change log rows older than `older_than` (epoch seconds).
+
+    The newest row is always kept so the version never goes backwards.
+    """
+    newest = current_catalog_version(db)
+    if not newest:
+        return 0
+    n = (
+        db.query(models.CatalogChange)
+        .filter(models.CatalogChange.changed_at < older_than, models.CatalogChange.version < newest)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return int(n or 0)
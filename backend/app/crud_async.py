@@ -0,0 +1,147 @@
+# ⚡ Async counterparts of crud.py for request handlers (AsyncSession, no event-loop blocking)
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import Iterable, List, Optional
+import secrets, time
+from . import models
+from .crud import collapse_catalog_changes
+
+
+def _with_skills(stmt):
+    return stmt.options(
+        joinedload(models.Professor.professor_skills).joinedload(models.ProfessorSkill.skill)
+    )
+
+async def list_professors(db: AsyncSession, department_substr: Optional[str] = None, limit: Optional[int] = None, offset: Optional[int] = None) -> List[models.Professor]:
+    stmt = _with_skills(select(models.Professor))
+    if department_substr:
+        like = f"%{department_substr}%"
+        stmt = stmt.where(models.Professor.department.ilike(like))
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit:
+        stmt = stmt.limit(limit)
+    res = await db.execute(stmt)
+    return list(res.unique().scalars().all())
+
+async def count_professors(db: AsyncSession, department_substr: Optional[str] = None) -> int:
+    stmt = select(func.count()).select_from(models.Professor)
+    if department_substr:
+        stmt = stmt.where(models.Professor.department.ilike(f"%{department_substr}%"))
+    return int(await db.scalar(stmt) or 0)
+
+async def get_professor(db: AsyncSession, professor_id: int) -> Optional[models.Professor]:
+    res = await db.execute(_with_skills(select(models.Professor)).where(models.Professor.id == professor_id))
+    return res.unique().scalars().first()
+
+async def get_professors_by_ids(db: AsyncSession, ids: Iterable[int]) -> List[models.Professor]:
+    ids = list(ids)
+    if not ids:
+        return []
+    res = await db.execute(
+        _with_skills(select(models.Professor))
+        .where(models.Professor.id.in_(ids))
+        .order_by(models.Professor.id)
+    )
+    return list(res.unique().scalars().all())
+
+async def list_departments(db: AsyncSession) -> List[str]:
+    rows = (await db.execute(select(models.Professor.department).distinct())).all()
+    return sorted([r[0].strip() for r in rows if r and r[0]])
+
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    return await db.get(models.User, user_id)
+
+async def get_or_create_user_by_sub(db: AsyncSession, sub: str, *, email: str, name: Optional[str], picture: Optional[str]) -> models.User:
+    user = await db.scalar(select(models.User).where(models.User.sub == sub))
+    if user:
+        # update mutable fields
+        changed = False
+        if email and user.email != email:
+            user.email = email
+            changed = True
+        if (name or None) != user.name:
+            user.name = name or None
+            changed = True
+        if (picture or None) != user.picture:
+            user.picture = picture or None
+            changed = True
+        if changed:
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
+        return user
+    user = models.User(sub=sub, email=email, name=name or None, picture=picture or None)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def create_session(db: AsyncSession, user: models.User, *, ttl_seconds: int = 1800) -> models.SessionToken:
+    token = secrets.token_urlsafe(32)
+    expires_at = int(time.time()) + ttl_seconds
+    sess = models.SessionToken(user_id=user.id, token=token, expires_at=expires_at)
+    db.add(sess)
+    await db.commit()
+    await db.refresh(sess)
+    return sess
+
+async def get_session(db: AsyncSession, token: str) -> Optional[models.SessionToken]:
+    obj = await db.scalar(select(models.SessionToken).where(models.SessionToken.token == token))
+    # Treat expired sessions as missing
+    if obj and obj.expires_at and obj.expires_at <= int(time.time()):
+        try:
+            await db.delete(obj)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+        return None
+    return obj
+
+async def delete_session(db: AsyncSession, token: str) -> None:
+    await db.execute(delete(models.SessionToken).where(models.SessionToken.token == token))
+    await db.commit()
+
+async def extend_session(db: AsyncSession, token: str, *, ttl_seconds: int = 1800) -> Optional[int]:
+    """Slide a session's expiry by token in one UPDATE; returns the new expiry or None."""
+    expires_at = int(time.time()) + ttl_seconds
+    try:
+        res = await db.execute(
+            update(models.SessionToken)
+            .where(models.SessionToken.token == token)
+            .values(expires_at=expires_at)
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return expires_at if res.rowcount else None
+
+
+# ---- Catalog change feed ----
+
+async def current_catalog_version(db: AsyncSession) -> int:
+    return int(await db.scalar(select(func.max(models.CatalogChange.version))) or 0)
+
+async def list_catalog_changes(db: AsyncSession, since: int) -> dict:
+    """See crud.list_catalog_changes."""
+    version = await current_catalog_version(db)
+    out = {"version": version, "full_refetch": False, "upserted": [], "deleted": []}
+    if since <= 0 or since > version:
+        out["full_refetch"] = since != version
+        return out
+    oldest = int(await db.scalar(select(func.min(models.CatalogChange.version))) or 0)
+    if since < oldest - 1:
+        out["full_refetch"] = True
+        return out
+    rows = (
+        await db.execute(
+            select(models.CatalogChange.professor_id, models.CatalogChange.op)
+            .where(models.CatalogChange.version > since, models.CatalogChange.version <= version)
+            .order_by(models.CatalogChange.version, models.CatalogChange.id)
+        )
+    ).all()
+    return collapse_catalog_changes(out, rows)
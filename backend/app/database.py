@@ -1,26 +1,244 @@
 # ⚙️ Database connection setup (SQLite/Postgres) using SQLAlchemy.
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, exc, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import os
+import time
+from .metrics import metrics
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./professors.db")
-# Normalize driver for psycopg3 if user provides plain 'postgresql://' URL
-if DATABASE_URL.startswith("postgresql://"):
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
+def _normalize_url(url: str) -> str:
+    # Normalize driver for psycopg3 if user provides plain 'postgresql://' URL
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+DATABASE_URL = _normalize_url(os.getenv("DATABASE_URL", "sqlite:///./professors.db"))
+# Optional read replica for catalog reads (professors, departments, match loads)
+DATABASE_READ_URL = _normalize_url(os.getenv("DATABASE_READ_URL", "").strip())
 
 # SQLite needs check_same_thread=False for FastAPI dev
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
+# Pool sizing (per engine, per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))  # avoid stale SSL connections
+
+
+# SQLite tuning for single-node deploys (SQLITE_TUNING=0 keeps SQLite defaults)
+SQLITE_TUNING = str(os.getenv("SQLITE_TUNING", "1")).lower() in {"1", "true", "yes"}
+SQLITE_PRAGMAS = {
+    # WAL lets readers proceed during a write instead of "database is locked"
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    # NORMAL is durable across app crashes in WAL mode (fsync only at checkpoints)
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # negative = KiB, so -65536 is a 64 MiB page cache per connection
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+}
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return ":memory:" in url or url.rstrip("/").endswith(("sqlite:", "aiosqlite:"))
+
+
+def install_sqlite_pragmas(sync_engine) -> None:
+    """Apply SQLITE_PRAGMAS on every new connection of a file-backed SQLite engine."""
+    url = str(sync_engine.url)
+    if not (SQLITE_TUNING and url.startswith("sqlite") and not _is_memory_sqlite(url)):
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for name, value in SQLITE_PRAGMAS.items():
+                cur.execute(f"PRAGMA {name}={value}")
+        finally:
+            cur.close()
+
+
+class _InstrumentedPoolMixin:
+    """Times connection checkout (queue wait + connect/pre-ping) and counts pool timeouts."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.inc("lablink_db_pool_timeouts_total", help="Checkouts that hit the pool timeout", pool=self.logging_name)
+            raise
+        finally:
+            metrics.observe(
+                "lablink_db_pool_checkout_seconds",
+                time.perf_counter() - start,
+                help="Time to obtain a pooled connection",
+                pool=self.logging_name,
+            )
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_kwargs(url: str, name: str, *, is_async: bool) -> dict:
+    kw = {
+        "pool_pre_ping": True,   # proactively validates connections
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_logging_name": name,
+    }
+    # In-memory SQLite uses a per-thread singleton pool; sizing does not apply
+    if _is_memory_sqlite(url):
+        return kw
+    kw.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return kw
+
+
 engine = create_engine(
     DATABASE_URL,
     echo=False,
     future=True,
     connect_args=connect_args,
-    pool_pre_ping=True,   # proactively validates connections
-    pool_recycle=300,     # recycle connections every 5 minutes to avoid stale SSL
+    **_pool_kwargs(DATABASE_URL, "primary", is_async=False),
 )
+install_sqlite_pragmas(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+
+def _async_url(url: str) -> str:
+    # aiosqlite for local SQLite; psycopg 3 (postgresql+psycopg) is async-capable as is
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return url
+
+
+# Async engine for request handlers so DB I/O never blocks the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    **_pool_kwargs(ASYNC_DATABASE_URL, "primary_async", is_async=True),
+)
+install_sqlite_pragmas(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+# ---- Read replica routing ----
+read_engine = None
+async_read_engine = None
+ReadSessionLocal = None
+AsyncReadSessionLocal = None
+if DATABASE_READ_URL:
+    read_engine = create_engine(
+        DATABASE_READ_URL,
+        echo=False,
+        future=True,
+        connect_args={"check_same_thread": False} if DATABASE_READ_URL.startswith("sqlite") else {},
+        **_pool_kwargs(DATABASE_READ_URL, "replica", is_async=False),
+    )
+    install_sqlite_pragmas(read_engine)
+    ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False, future=True)
+    _async_read_url = _async_url(DATABASE_READ_URL)
+    async_read_engine = create_async_engine(
+        _async_read_url, echo=False, **_pool_kwargs(_async_read_url, "replica_async", is_async=True)
+    )
+    install_sqlite_pragmas(async_read_engine.sync_engine)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+
+class ReplicaRouter:
+    """Sends read-only sessions to the replica while it is healthy.
+
+    A failed connection checkout marks the replica unhealthy; reads then go to the
+    primary until `cooldown_seconds` pass, after which the replica is tried again.
+    """
+
+    def __init__(self, *, cooldown_seconds: float = 30.0):
+        self.cooldown_seconds = cooldown_seconds
+        self._unhealthy_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return ReadSessionLocal is not None
+
+    def healthy(self) -> bool:
+        return self.enabled and time.time() >= self._unhealthy_until
+
+    def mark_unhealthy(self) -> None:
+        self._unhealthy_until = time.time() + self.cooldown_seconds
+        metrics.inc("lablink_db_replica_failures_total", help="Replica checkouts that failed and fell back to the primary")
+
+    def read_session(self):
+        if self.healthy():
+            db = ReadSessionLocal()
+            try:
+                db.connection()  # check out now so a dead replica is caught here
+                return db
+            except Exception:
+                db.close()
+                self.mark_unhealthy()
+        return SessionLocal()
+
+    async def async_read_session(self) -> AsyncSession:
+        if self.healthy():
+            db = AsyncReadSessionLocal()
+            try:
+                await db.connection()
+                return db
+            except Exception:
+                await db.close()
+                self.mark_unhealthy()
+        return AsyncSessionLocal()
+
+
+replica_router = ReplicaRouter(cooldown_seconds=float(os.getenv("DB_REPLICA_COOLDOWN_SECONDS", "30")))
+
+
+def pool_stats() -> dict:
+    """Current size/checked-out/overflow per pool, for metrics and debugging."""
+    out = {}
+    pools = [engine.pool, async_engine.sync_engine.pool]
+    if read_engine is not None:
+        pools += [read_engine.pool, async_read_engine.sync_engine.pool]
+    for pool in pools:
+        if isinstance(pool, QueuePool):
+            out[pool.logging_name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # SQLAlchemy counts from -pool_size; only report real overflow
+                "overflow": max(0, pool.overflow()),
+            }
+    return out
+
+
+def _collect_pool_metrics() -> None:
+    for name, st in pool_stats().items():
+        for field, value in st.items():
+            metrics.set(f"lablink_db_pool_{field}", value, help=f"Connection pool {field.replace('_', ' ')}", pool=name)
+    if replica_router.enabled:
+        metrics.set("lablink_db_replica_healthy", 1 if replica_router.healthy() else 0, help="1 while reads are routed to the replica")
+
+
+metrics.register_collector(_collect_pool_metrics)
+
 class Base(DeclarativeBase):
     pass
 
@@ -30,3 +248,49 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Read-only dependencies: replica when configured and healthy, else the primary.
+# Never write through these sessions.
+def get_read_db():
+    db = replica_router.read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    db = await replica_router.async_read_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def ensure_schema(bind) -> None:
+    """Add columns and indexes that create_all() skips on pre-existing tables.
+
+    No Alembic for the MVP, so new nullable columns and plain indexes declared on
+    the models are patched into older databases here.
+    """
+    insp = inspect(bind)
+    existing_tables = set(insp.get_table_names())
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            cols = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in cols or not col.nullable:
+                    continue
+                ddl_type = col.type.compile(dialect=bind.dialect)
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN {col.name} {ddl_type}'
+                )
+            idx_names = {i["name"] for i in insp.get_indexes(table.name)}
+            for idx in table.indexes:
+                if idx.name not in idx_names:
+                    idx.create(bind=conn, checkfirst=True)
@@ -1,6 +1,9 @@
 from .matching import extract_skills
-import os, smtplib, mimetypes
+import os, smtplib, mimetypes, threading, time
 from email.message import EmailMessage
+from typing import Iterable, Optional
+
+from .metrics import metrics
 
 
 def build_email(student_name: str, student_skills: str | None, availability: str | None,
@@ -42,7 +45,16 @@ def build_email(student_name: str, student_skills: str | None, availability: str
    return {"subject": subject, "body": body}
 
 
-def send_email_with_attachment(
+# STARTTLS and login are skipped for relays that do not offer them (e.g. a local aiosmtpd)
+SMTP_STARTTLS = str(os.getenv("SMTP_STARTTLS", "1")).lower() in {"1", "true", "yes"}
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+# Pooled connections: idle ones kept per worker, and when they are retired instead of reused
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_MAX_IDLE_SECONDS = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "60"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+
+def build_message(
     *,
     to_email: str,
     subject: str,
@@ -50,22 +62,10 @@ def send_email_with_attachment(
     reply_to: str | None = None,
     attachment_bytes: bytes | None = None,
     attachment_filename: str | None = None,
-) -> dict:
-    """Send an email using SMTP (STARTTLS) with optional single attachment.
-
-    Required env vars:
-      SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_FROM
-    """
-    host = os.getenv("SMTP_HOST")
-    port = int(os.getenv("SMTP_PORT", "587"))
-    username = os.getenv("SMTP_USERNAME")
-    password = os.getenv("SMTP_PASSWORD")
-    sender = os.getenv("SMTP_FROM") or username
-    if not (host and username and password and sender):
-        raise RuntimeError("SMTP env not configured")
-
+    sender: str | None = None,
+) -> EmailMessage:
     msg = EmailMessage()
-    msg["From"] = sender
+    msg["From"] = sender or os.getenv("SMTP_FROM") or os.getenv("SMTP_USERNAME") or ""
     msg["To"] = to_email
     msg["Subject"] = subject
     if reply_to:
@@ -81,10 +81,237 @@ def send_email_with_attachment(
             subtype=subtype,
             filename=attachment_filename,
         )
+    return msg
+
+
+class _Connection:
+    __slots__ = ("smtp", "last_used", "sent")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+def _closing(error: Exception) -> bool:
+    """True for a 421 reply: the server is closing the session."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code == 421 for code, _ in error.recipients.values())
+    return getattr(error, "smtp_code", None) == 421
+
+
+class SMTPPool:
+    """Authenticated SMTP sessions reused across messages and threads.
+
+    Connecting, STARTTLS and AUTH cost several round trips and usually dominate the
+    time to send one message, so finished connections go back to the pool. A
+    connection is retired after `max_idle_seconds` unused (servers drop idle clients)
+    or after `max_messages`. At most `max_size` idle connections are kept; more may be
+    open while sends run concurrently. If a reused connection turns out to be closed by
+    the server (SMTPServerDisconnected), the message is retried once on a fresh one.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        *,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        timeout: float = SMTP_TIMEOUT_SECONDS,
+        max_size: int = SMTP_POOL_SIZE,
+        max_idle_seconds: float = SMTP_MAX_IDLE_SECONDS,
+        max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.max_messages = max_messages
+        self._idle: list[_Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> _Connection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            self._discard(smtp)
+            raise
+        metrics.inc("lablink_smtp_connections_total", help="SMTP sessions opened (connect, STARTTLS, AUTH)")
+        return _Connection(smtp)
+
+    @staticmethod
+    def _discard(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _acquire(self) -> tuple[_Connection, bool]:
+        """(connection, reused)"""
+        stale = []
+        conn = None
+        with self._lock:
+            now = time.monotonic()
+            while self._idle:
+                candidate = self._idle.pop()  # most recently used first
+                if now - candidate.last_used < self.max_idle_seconds:
+                    conn = candidate
+                    break
+                stale.append(candidate)
+        for c in stale:
+            self._discard(c.smtp)
+        if conn is not None:
+            return conn, True
+        return self._connect(), False
+
+    def _release(self, conn: _Connection) -> None:
+        conn.last_used = time.monotonic()
+        if conn.sent < self.max_messages:
+            with self._lock:
+                if len(self._idle) < self.max_size:
+                    self._idle.append(conn)
+                    return
+        self._discard(conn.smtp)
+
+    def _send_on(self, conn: _Connection, msg: EmailMessage) -> None:
+        conn.smtp.send_message(msg)
+        conn.sent += 1
 
-    with smtplib.SMTP(host, port) as smtp:
-        smtp.starttls()
-        smtp.login(username, password)
-        smtp.send_message(msg)
+    def send_message(self, msg: EmailMessage) -> None:
+        self.send_many([msg], raise_errors=True)
+
+    def send_many(self, messages: Iterable[EmailMessage], *, raise_errors: bool = False) -> list[Optional[Exception]]:
+        """Send `messages` over one session; returns one error (or None) per message.
+
+        A message the server rejects (SMTPResponseException, refused recipients) does
+        not end the session; the next message goes out on the same connection. A 421
+        reply means the server is closing the session, so that connection is dropped.
+        """
+        results: list[Optional[Exception]] = []
+        conn: Optional[_Connection] = None
+        reused = False
+        try:
+            for msg in messages:
+                if conn is not None and conn.sent >= self.max_messages:
+                    self._release(conn)
+                    conn = None
+                if conn is None:
+                    conn, reused = self._acquire()
+                try:
+                    try:
+                        self._send_on(conn, msg)
+                    except smtplib.SMTPServerDisconnected:
+                        if not reused:
+                            raise
+                        # the server closed a pooled session (idle timeout, restart): reconnect once
+                        metrics.inc("lablink_smtp_reconnects_total", help="Pooled SMTP sessions found closed and reopened")
+                        self._discard(conn.smtp)
+                        conn = None
+                        conn, reused = self._connect(), False
+                        self._send_on(conn, msg)
+                    results.append(None)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                    # smtplib has already sent RSET; the session is still usable unless
+                    # the server answered 421 (service closing the channel)
+                    if _closing(e):
+                        self._discard(conn.smtp)
+                        conn = None
+                    if raise_errors:
+                        raise
+                    results.append(e)
+                except Exception as e:
+                    if conn is not None:
+                        self._discard(conn.smtp)
+                        conn = None
+                    if raise_errors:
+                        raise
+                    results.append(e)
+        finally:
+            if conn is not None:
+                self._release(conn)
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn.smtp)
+
+
+_POOL: Optional[SMTPPool] = None
+_POOL_KEY: Optional[tuple] = None
+_POOL_LOCK = threading.Lock()
+
+
+def smtp_pool() -> SMTPPool:
+    """Shared pool for the SMTP_* settings; rebuilt if they change (e.g. in tests)."""
+    global _POOL, _POOL_KEY
+    host = os.getenv("SMTP_HOST")
+    if not host:
+        raise RuntimeError("SMTP env not configured")
+    key = (
+        host,
+        int(os.getenv("SMTP_PORT", "587")),
+        os.getenv("SMTP_USERNAME"),
+        os.getenv("SMTP_PASSWORD"),
+        SMTP_STARTTLS,
+    )
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_KEY != key:
+            old = _POOL
+            _POOL = SMTPPool(key[0], key[1], username=key[2], password=key[3], starttls=key[4])
+            _POOL_KEY = key
+            if old is not None:
+                old.close()
+        return _POOL
+
+
+def close_smtp_pool() -> None:
+    global _POOL, _POOL_KEY
+    with _POOL_LOCK:
+        pool, _POOL, _POOL_KEY = _POOL, None, None
+    if pool is not None:
+        pool.close()
+
+
+def send_email_with_attachment(
+    *,
+    to_email: str,
+    subject: str,
+    body: str,
+    reply_to: str | None = None,
+    attachment_bytes: bytes | None = None,
+    attachment_filename: str | None = None,
+) -> dict:
+    """Send an email over a pooled SMTP session with optional single attachment.
+
+    Required env vars: SMTP_HOST, SMTP_FROM (or SMTP_USERNAME).
+    Optional: SMTP_PORT (587), SMTP_USERNAME + SMTP_PASSWORD to log in,
+    SMTP_STARTTLS (1), SMTP_TIMEOUT_SECONDS (10), and the SMTP_POOL_SIZE /
+    SMTP_MAX_IDLE_SECONDS / SMTP_MAX_MESSAGES_PER_CONNECTION pool limits.
+    """
+    sender = os.getenv("SMTP_FROM") or os.getenv("SMTP_USERNAME")
+    if not (os.getenv("SMTP_HOST") and sender):
+        raise RuntimeError("SMTP env not configured")
 
-    return {"ok": True}
\ No newline at end of file
+    msg = build_message(
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        reply_to=reply_to,
+        attachment_bytes=attachment_bytes,
+        attachment_filename=attachment_filename,
+        sender=sender,
+    )
+    smtp_pool().send_message(msg)
+    return {"ok": True}
@@ -0,0 +1,118 @@
+# 🔐 Google ID token verification with cached signing certs and verified tokens
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import httpx
+
+GOOGLE_CERTS_URL = os.getenv(
+    "GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs"
+)
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+GOOGLE_ISSUERS = frozenset({"accounts.google.com", "https://accounts.google.com"})
+
+
+def fetch_certs(url: str = GOOGLE_CERTS_URL) -> tuple[dict, int]:
+    """Fetch Google's {kid: x509 cert} map and its Cache-Control max-age (seconds)."""
+    resp = httpx.get(url, timeout=5.0)
+    resp.raise_for_status()
+    m = _MAX_AGE.search(resp.headers.get("cache-control", ""))
+    return resp.json(), int(m.group(1)) if m else 0
+
+
+class CertCache:
+    """Signing certs kept until the max-age Google sends with them.
+
+    An unknown key id (key rotation) forces a refetch, at most once per
+    `min_refresh_seconds`.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], tuple[dict, int]] = fetch_certs,
+        *,
+        default_max_age: int = 3600,
+        min_refresh_seconds: int = 30,
+    ):
+        self._fetch = fetch
+        self.default_max_age = default_max_age
+        self.min_refresh_seconds = min_refresh_seconds
+        self._certs: dict = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, kid: Optional[str] = None) -> dict:
+        now = time.time()
+        stale = now >= self._expires_at
+        missing = kid is not None and kid not in self._certs
+        if stale or (missing and now - self._fetched_at >= self.min_refresh_seconds):
+            with self._lock:
+                # Another thread may have refreshed while we waited
+                now = time.time()
+                stale = now >= self._expires_at
+                missing = kid is not None and kid not in self._certs
+                if stale or (missing and now - self._fetched_at >= self.min_refresh_seconds):
+                    certs, max_age = self._fetch()
+                    self._certs = dict(certs)
+                    self._fetched_at = now
+                    self._expires_at = now + (max_age or self.default_max_age)
+        return self._certs
+
+
+class GoogleTokenVerifier:
+    """Verify Google ID tokens against cached certs, remembering verified tokens.
+
+    Signature, audience, expiry and issuer (`GOOGLE_ISSUERS`) are checked before a
+    token is cached. Verified tokens are keyed by SHA-256 and reused until their
+    `exp`; at most `max_tokens` are kept (LRU).
+    """
+
+    def __init__(
+        self,
+        audience: Optional[str],
+        certs: Optional[CertCache] = None,
+        *,
+        max_tokens: int = 10000,
+        clock_skew_seconds: int = 10,
+    ):
+        self.audience = audience
+        self.certs = certs or CertCache()
+        self.max_tokens = max_tokens
+        self.clock_skew_seconds = clock_skew_seconds
+        self._verified: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> dict:
+        from google.auth import jwt as google_jwt  # type: ignore
+
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+        with self._lock:
+            claims = self._verified.get(key)
+            if claims is not None:
+                if float(claims.get("exp", 0)) > now:
+                    self._verified.move_to_end(key)
+                    return dict(claims)
+                del self._verified[key]
+
+        kid = google_jwt.decode_header(token).get("kid")
+        claims = google_jwt.decode(
+            token,
+            certs=self.certs.get(kid),
+            audience=self.audience,
+            clock_skew_in_seconds=self.clock_skew_seconds,
+        )
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')!r}")
+        with self._lock:
+            self._verified[key] = claims
+            while len(self._verified) > self.max_tokens:
+                self._verified.popitem(last=False)
+        return dict(claims)
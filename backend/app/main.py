@@ -10,30 +10,65 @@ from fastapi import (
     Cookie,
 )
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
-import csv
 import re
 import json
 import time
 import logging
+import threading
 from functools import wraps
 from datetime import datetime
 
-from .database import Base, engine, get_db
+from .database import (
+    Base,
+    engine,
+    SessionLocal,
+    async_engine,
+    async_read_engine,
+    get_db,
+    get_async_db,
+    get_async_read_db,
+    ensure_schema,
+)
 from dotenv import load_dotenv
 from . import crud
+from . import crud_async as acrud
 from . import models
 from .seed_json import seed_from_json  # reuse JSON seeder when available
+from .bulk_ingest import aiter_ndjson, apply_ingest_batch, bulk_load, iter_csv_records
+from .session_store import SessionStore
+from .google_auth import GoogleTokenVerifier
+from .metrics import metrics
+from .ratelimit import RateLimiter
+from .cache import cache, clear_professor_cache, clear_similarity_cache
+from .build_index import (
+    INDEX_DIR,
+    build_lock,
+    build_snapshot,
+    catalog_fingerprint,
+    find_snapshot,
+    load_snapshot,
+    prune_snapshots,
+    write_snapshot,
+)
+from .reload_bus import ReloadBus
+from .sweeper import SessionSweeper
 from .schema import (
     ProfessorOut,
+    ProfessorChangesOut,
     StudentProfileIn,
     MatchResponse,
     MatchItem,
+    MatchBatchRequest,
+    MatchBatchResponse,
     EmailRequest,
     EmailDraft,
+    EmailStatusOut,
 )
 from .matching import (
     prof_to_doc,
@@ -46,13 +81,15 @@ from .matching import (
     SemanticIndex,
 )
 from .matching import CrossEncoderReranker
-from .email_utils import build_email, send_email_with_attachment
+from .email_utils import build_email, close_smtp_pool
+from .outbox import EmailOutbox, enqueue_email, get_outbox_email
 import httpx
 import base64
 from urllib.parse import urljoin
 from datetime import datetime, timedelta
 from typing import Optional, Any
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, PlainTextResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from urllib.parse import urlencode
 import secrets
 
@@ -132,23 +169,28 @@ COOKIE_DOMAIN = os.getenv("COOKIE_DOMAIN") or None
 COOKIE_SECURE = str(os.getenv("COOKIE_SECURE", "1")).lower() in {"1", "true", "yes"}
 COOKIE_SAMESITE = os.getenv("COOKIE_SAMESITE", "lax").lower()
 
-# in-memory rate limit buckets
-_EMAIL_SEND_EVENTS: dict[str, list[int]] = {}
+# Session lookups are cached in-process (and in Redis when SESSION_CACHE_REDIS=1);
+# the sliding-expiry DB write happens only after SESSION_TOUCH_FRACTION of the TTL.
+SESSION_STORE = SessionStore(
+    ttl_seconds=SESSION_TTL_SECONDS,
+    touch_fraction=float(os.getenv("SESSION_TOUCH_FRACTION", "0.5")),
+    cache_seconds=int(os.getenv("SESSION_CACHE_SECONDS", "60")),
+    use_redis=str(os.getenv("SESSION_CACHE_REDIS", "0")).lower() in {"1", "true", "yes"},
+)
+
+# Signing certs cached per Cache-Control max-age; verified tokens reused until exp
+GOOGLE_VERIFIER = GoogleTokenVerifier(
+    GOOGLE_CLIENT_ID,
+    max_tokens=int(os.getenv("GOOGLE_TOKEN_CACHE_SIZE", "10000")),
+)
 
 
 def verify_google_token(token: str) -> dict:
     try:
-        from google.oauth2 import id_token as google_id_token  # type: ignore
-        from google.auth.transport import requests as google_requests  # type: ignore
-
-        req = google_requests.Request()
-        claims = google_id_token.verify_oauth2_token(token, req, GOOGLE_CLIENT_ID)
+        claims = GOOGLE_VERIFIER.verify(token)
         # claims must have email_verified True ideally
         if not claims.get("email"):
             raise HTTPException(401, "Token missing email")
-        iss = str(claims.get("iss", ""))
-        if iss not in {"accounts.google.com", "https://accounts.google.com"}:
-            raise HTTPException(401, "Invalid token issuer")
         if claims.get("email_verified") is not True:
             raise HTTPException(401, "Unverified email")
         return claims
@@ -157,34 +199,27 @@ def verify_google_token(token: str) -> dict:
         raise HTTPException(401, f"Invalid Google token: {e}")
 
 
-def get_current_user(
+async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     session_token: Optional[str] = Cookie(default=None, alias=SESSION_COOKIE_NAME),
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
     response: Response = None,
 ) -> dict:
     # Prefer cookie-based session
     if session_token:
-        sess = crud.get_session(db, session_token)
+        # Sliding session: the store extends the TTL once enough of it has elapsed
+        sess = await SESSION_STORE.aresolve(db, session_token)
         if not sess:
             raise HTTPException(401, "Invalid or expired session")
-        # Sliding session: refresh TTL on access and refresh cookie expiry
         try:
-            crud.touch_session(db, sess, ttl_seconds=SESSION_TTL_SECONDS)
-        except Exception:
-            pass
-        user = db.query(models.User).filter(models.User.id == sess.user_id).first()
-        if not user:
-            raise HTTPException(401, "User not found")
-        try:
-            # Refresh cookie expiry so active users stay signed in
+            # Keep the cookie expiry in step with the server-side session
             if response is None:
                 response = Response()
-            expires = datetime.utcnow() + timedelta(seconds=SESSION_TTL_SECONDS)
+            expires = datetime.utcfromtimestamp(sess["expires_at"])
             response.set_cookie(
                 key=SESSION_COOKIE_NAME,
-                value=sess.token,
+                value=session_token,
                 httponly=True,
                 secure=COOKIE_SECURE,
                 samesite=(
@@ -199,21 +234,22 @@ def get_current_user(
         except Exception:
             pass
         return {
-            "sub": f"session:{user.id}",
-            "email": user.email,
-            "name": user.name,
-            "picture": user.picture,
+            "sub": f"session:{sess['user_id']}",
+            "email": sess["email"],
+            "name": sess["name"],
+            "picture": sess["picture"],
         }
 
     # Fallback legacy Bearer Google ID token
     if credentials is None or credentials.scheme.lower() != "bearer":
         raise HTTPException(401, "Missing authentication")
     token = credentials.credentials
-    return verify_google_token(token)
+    # Cert refreshes are blocking HTTP calls; keep them off the event loop
+    return await run_in_threadpool(verify_google_token, token)
 
 
-def require_ucdavis_user(
-    user: dict = Depends(get_current_user), db: Session = Depends(get_db)
+async def require_ucdavis_user(
+    user: dict = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ) -> dict:
     email = str(user.get("email") or "")
     domain = email.split("@", 1)[-1].lower() if "@" in email else None
@@ -223,25 +259,59 @@ def require_ucdavis_user(
         raise HTTPException(
             403, f"Email domain not allowed. Allowed: {', '.join(sorted(allowed))}"
         )
-    # Upsert user record by Google sub
+    # Upsert user record by Google sub, only when the claims changed.
+    # Cookie sessions resolve from the users table already; nothing to upsert.
     try:
-        sub = str(user.get("sub"))
+        sub = str(user.get("sub") or "")
         name = user.get("name")
         picture = user.get("picture")
-        if sub:
-            crud.get_or_create_user_by_sub(
+        claims = (email, name or None, picture or None)
+        if sub and not sub.startswith("session:") and SESSION_STORE.claims_changed(sub, claims):
+            await acrud.get_or_create_user_by_sub(
                 db, sub, email=email, name=name, picture=picture
             )
+            SESSION_STORE.remember_claims(sub, claims)
     except Exception:
         pass
     return user
 
 
+def user_rate_key(user: dict = Depends(require_ucdavis_user)) -> str:
+    return str(user.get("email") or user.get("sub") or "anon")
+
+
+# Per-user limits (hits per minute), shared by all workers when Redis is configured
+EMAIL_SEND_LIMIT = RateLimiter(
+    "email", int(os.getenv("EMAIL_SEND_PER_MINUTE", "3")), 60,
+    message="Too many emails. Try again in a minute.",
+)
+SCRAPE_PHOTO_LIMIT = RateLimiter("scrape", int(os.getenv("SCRAPE_PHOTO_PER_MINUTE", "5")), 60)
+
+
 # Removed legacy /api/auth/google since we verify tokens per request
 
 
 # ---- DB init (no Alembic for MVP) ----
 Base.metadata.create_all(bind=engine)
+ensure_schema(engine)
+
+# How long catalog change-feed entries are kept before clients must fully refetch
+CATALOG_CHANGES_RETENTION_SECONDS = int(
+    os.getenv("CATALOG_CHANGES_RETENTION_SECONDS", str(30 * 24 * 3600))
+)
+
+# Periodic batched delete of expired sessions (0 disables)
+SESSION_SWEEPER = SessionSweeper(
+    interval_seconds=int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "300")),
+    batch_size=int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "1000")),
+)
+
+# Background delivery of /api/email/send (0 disables the sender thread)
+EMAIL_OUTBOX = EmailOutbox(
+    poll_seconds=float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5")),
+    max_attempts=int(os.getenv("EMAIL_MAX_ATTEMPTS", "6")),
+    backoff_seconds=float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", "30")),
+)
 
 # ---- Vector stores (rebuilt on reload) ----
 VECSTORE: VectorStore | None = None
@@ -249,6 +319,16 @@ SEM_INDEX: SemanticIndex | None = None
 RERANKER: CrossEncoderReranker | None = None
 DOCS: list[str] = []
 PROF_IDS: list[int] = []
+# Professor id -> indexed doc text, and the catalog version the index reflects
+PROF_DOCS: dict[int, str] = {}
+INDEX_VERSION = 0
+_INDEX_LOCK = threading.RLock()
+# Load a prebuilt snapshot (python -m app.build_index) at startup when it matches the DB
+INDEX_SNAPSHOTS_ENABLED = str(os.getenv("INDEX_SNAPSHOTS", "1")).lower() in {"1", "true", "yes"}
+# Build the snapshot at startup when none matches, so every worker maps one copy
+INDEX_SNAPSHOT_AUTOBUILD = str(os.getenv("INDEX_SNAPSHOT_AUTOBUILD", "1")).lower() in {"1", "true", "yes"}
+# Touch mapped pages at load instead of on the first requests
+INDEX_PREFAULT = str(os.getenv("INDEX_PREFAULT", "1")).lower() in {"1", "true", "yes"}
 # Map professor id -> personal_site loaded from JSON (since not stored in DB)
 PERSONAL_SITE_MAP: dict[int, str] = {}
 
@@ -258,20 +338,29 @@ def extract_publications(p) -> list[dict]:
     return []
 
 
-def rebuild_vectorstore(db: Session):
-    global VECSTORE, SEM_INDEX, DOCS, PROF_IDS
-    profs = crud.list_professors(db)
-    PROF_IDS = [p.id for p in profs]
+def _prof_doc(p) -> str:
     # flatten professor record to dict expected by prof_to_doc
-    payloads = []
-    for p in profs:
-        skills = [ps.skill.name for ps in p.professor_skills]
-        payloads.append(
-            {"research_interests": p.research_interests or "", "skills": skills}
-        )
-    DOCS = [prof_to_doc(x) for x in payloads]
+    skills = [ps.skill.name for ps in p.professor_skills]
+    return prof_to_doc({"research_interests": p.research_interests or "", "skills": skills})
+
+
+def _build_indexes(previous: SemanticIndex | None = None) -> None:
+    global VECSTORE, SEM_INDEX, DOCS, PROF_IDS
+    PROF_IDS = sorted(PROF_DOCS)
+    DOCS = [PROF_DOCS[i] for i in PROF_IDS]
     VECSTORE = VectorStore(DOCS)
-    SEM_INDEX = SemanticIndex(DOCS)
+    SEM_INDEX = SemanticIndex(DOCS, previous=previous)
+
+
+def rebuild_vectorstore(db: Session):
+    global INDEX_VERSION
+    with _INDEX_LOCK:
+        # Read the version first so changes racing the load are re-applied, never skipped
+        INDEX_VERSION = crud.current_catalog_version(db)
+        PROF_DOCS.clear()
+        for p in crud.list_professors(db):
+            PROF_DOCS[p.id] = _prof_doc(p)
+        _build_indexes()
     global RERANKER
     try:
         RERANKER = CrossEncoderReranker()
@@ -279,6 +368,88 @@ def rebuild_vectorstore(db: Session):
         RERANKER = None
 
 
+def warm_start_vectorstore(db: Session) -> bool:
+    """Install the prebuilt snapshot matching the database (see app.build_index).
+
+    Returns False when there is none, so the caller builds in-process instead.
+    """
+    global VECSTORE, SEM_INDEX, DOCS, PROF_IDS, INDEX_VERSION, RERANKER
+    version = crud.current_catalog_version(db)
+    path = find_snapshot(INDEX_DIR, catalog_fingerprint(db, version))
+    if not path:
+        return False
+    try:
+        snap = load_snapshot(path)
+        if INDEX_PREFAULT:
+            snap.prefault()
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable index snapshot {path}: {e}")
+        return False
+    with _INDEX_LOCK:
+        PROF_DOCS.clear()
+        PROF_DOCS.update(zip(snap.ids, snap.docs))
+        PROF_IDS = list(snap.ids)
+        DOCS = list(snap.docs)
+        VECSTORE = snap.vecstore
+        SEM_INDEX = SemanticIndex(DOCS, embeddings=snap.embeddings)
+        INDEX_VERSION = version
+    try:
+        RERANKER = CrossEncoderReranker()
+    except Exception:
+        RERANKER = None
+    logger.info(f"⚡ Loaded index snapshot {os.path.basename(path)[:12]} ({len(PROF_IDS)} docs)")
+    return True
+
+
+def load_shared_vectorstore(db: Session) -> bool:
+    """Map the snapshot for the current catalog, building it first if it is missing.
+
+    Workers map the same files, so the index arrays exist once in the page cache
+    rather than once per worker. The first worker to start builds under a file lock
+    and the rest wait for it and map its output. Returns False if the snapshot
+    cannot be written (e.g. read-only INDEX_DIR).
+    """
+    if warm_start_vectorstore(db):
+        return True
+    if not INDEX_SNAPSHOT_AUTOBUILD:
+        return False
+    try:
+        with build_lock(INDEX_DIR):
+            if warm_start_vectorstore(db):
+                return True
+            build_snapshot(db, INDEX_DIR)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not build index snapshot in {INDEX_DIR}: {e}")
+        return False
+    return warm_start_vectorstore(db)
+
+
+def refresh_vectorstore(db: Session) -> dict:
+    """Apply catalog changes made since the index was built, touching only those docs.
+
+    Falls back to a full rebuild when the change log cannot cover the gap (pruned or reset).
+    """
+    global INDEX_VERSION
+    with _INDEX_LOCK:
+        delta = crud.list_catalog_changes(db, INDEX_VERSION)
+        if not delta["full_refetch"]:
+            if delta["upserted"] or delta["deleted"]:
+                for pid in delta["deleted"]:
+                    PROF_DOCS.pop(pid, None)
+                for p in crud.get_professors_by_ids(db, delta["upserted"]):
+                    PROF_DOCS[p.id] = _prof_doc(p)
+                _build_indexes(previous=SEM_INDEX)
+                # cached lists/similarities may include the changed rows
+                clear_professor_cache()
+                clear_similarity_cache()
+            INDEX_VERSION = delta["version"]
+            return {"full": False, "upserted": delta["upserted"], "deleted": delta["deleted"]}
+    rebuild_vectorstore(db)
+    clear_professor_cache()
+    clear_similarity_cache()
+    return {"full": True, "upserted": [], "deleted": []}
+
+
 def load_personal_sites_from_json():
     global PERSONAL_SITE_MAP
     try:
@@ -313,7 +484,8 @@ def load_personal_sites_from_json():
 
 @app.on_event("startup")
 def startup():
-    with next(get_db()) as db:  # type: ignore
+    # Own the session directly: a bare next(get_db()) never runs the generator's close
+    with SessionLocal() as db:
         # Auto-seed DB if empty from JSON (preferred) or CSV fallback
         try:
             has_prof = db.query(models.Professor).first() is not None
@@ -333,44 +505,231 @@ def startup():
                     csv_path = os.path.join(here, "professors.csv")
                     if os.path.isfile(csv_path) and os.path.getsize(csv_path) > 0:
                         try:
-                            # Minimal CSV seeding
+                            # Minimal CSV seeding, same batched path as the JSON seed
                             with open(csv_path, newline="", encoding="utf-8") as f:
-                                reader = csv.DictReader(f)
-                                for i, row in enumerate(reader, start=1):
-                                    name = (row.get("name") or "").strip()
-                                    if not name:
-                                        continue
-                                    dept = (
-                                        row.get("dept") or row.get("department") or ""
-                                    ).strip()
-                                    email = (row.get("email") or "").strip()
-                                    interests = (row.get("interests") or "").strip()
-                                    db.add(
-                                        models.Professor(
-                                            name=name,
-                                            department=dept or None,
-                                            email=email or None,
-                                            research_interests=interests or None,
-                                            profile_link=None,
-                                            photo_url="",
-                                        )
-                                    )
-                                db.commit()
+                                bulk_load(db, iter_csv_records(f), wipe=False)
+                            db.commit()
                         except Exception:
                             db.rollback()
-            # After potential seeding, rebuild vector store
-            rebuild_vectorstore(db)
+            # After potential seeding, load the prebuilt index or rebuild it
+            if not (INDEX_SNAPSHOTS_ENABLED and load_shared_vectorstore(db)):
+                rebuild_vectorstore(db)
         except Exception:
             # Ensure we don't block startup on seeding issues
             rebuild_vectorstore(db)
         # Load personal_site map from JSON for API responses
         load_personal_sites_from_json()
+        try:
+            crud.prune_catalog_changes(
+                db, older_than=int(time.time()) - CATALOG_CHANGES_RETENTION_SECONDS
+            )
+        except Exception:
+            db.rollback()
+    SESSION_SWEEPER.start()
+    RELOAD_BUS.start()
+    EMAIL_OUTBOX.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await run_in_threadpool(SESSION_SWEEPER.stop)
+    await run_in_threadpool(RELOAD_BUS.stop)
+    await run_in_threadpool(EMAIL_OUTBOX.stop)
+    await run_in_threadpool(close_smtp_pool)
+    await cache.aclose()
+    # aiosqlite connections run on their own threads; close them or exit hangs
+    await async_engine.dispose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
+
+
+def sync_vectorstore(db: Session) -> bool:
+    """Bring this worker's index to the current catalog version; False if it already was.
+
+    Maps the shared snapshot when one matches, else applies the change-log delta.
+    """
+    with _INDEX_LOCK:
+        if crud.current_catalog_version(db) == INDEX_VERSION:
+            return False
+        if not (INDEX_SNAPSHOTS_ENABLED and warm_start_vectorstore(db)):
+            refresh_vectorstore(db)
+    return True
+
+
+def announce_index(db: Session, fingerprint: Optional[str]) -> None:
+    """Share this worker's refreshed index: publish it as a snapshot, then notify the other workers.
+
+    `fingerprint` must be taken before the refresh, so the snapshot never claims
+    a newer catalog than it holds.
+    """
+    if fingerprint and INDEX_SNAPSHOTS_ENABLED:
+        try:
+            with _INDEX_LOCK:
+                write_snapshot(
+                    INDEX_DIR,
+                    fingerprint,
+                    catalog_version=INDEX_VERSION,
+                    ids=PROF_IDS,
+                    docs=DOCS,
+                    vecstore=VECSTORE,
+                    sem_index=SEM_INDEX,
+                )
+            prune_snapshots(INDEX_DIR)
+            # swap this worker's private arrays for the shared mapping
+            warm_start_vectorstore(db)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not publish index snapshot: {e}")
+    RELOAD_BUS.publish({"version": INDEX_VERSION})
+
+
+def _on_index_event(event: dict) -> None:
+    # Reads the primary: an event may arrive before the replica has the change
+    with SessionLocal() as db:
+        if sync_vectorstore(db):
+            logger.info(f"🔄 Index synced to version {INDEX_VERSION} ({event.get('source')})")
+
+
+# Other workers learn about reloads through Redis pub/sub, or by polling the catalog version
+RELOAD_BUS = ReloadBus(
+    _on_index_event,
+    poll_seconds=float(os.getenv("INDEX_RELOAD_POLL_SECONDS", "5")),
+)
 
 
 @app.get("/api/reload_docs")
-def reload_docs(db: Session = Depends(get_db)):
-    rebuild_vectorstore(db)
-    return {"ok": True, "count": len(PROF_IDS)}
+def reload_docs(full: bool = Query(False), db: Session = Depends(get_db)):
+    """Bring the match index up to date in every worker; only changed professors are re-indexed unless `full`.
+
+    Reads the primary: a lagging replica would index (and fingerprint) a stale catalog.
+    """
+    fingerprint = catalog_fingerprint(db) if INDEX_SNAPSHOTS_ENABLED else None
+    if full:
+        rebuild_vectorstore(db)
+        clear_professor_cache()
+        clear_similarity_cache()
+        res = {"full": True, "upserted": [], "deleted": []}
+    else:
+        res = refresh_vectorstore(db)
+    if res["full"] or res["upserted"] or res["deleted"]:
+        announce_index(db, fingerprint)
+    return {
+        "ok": True,
+        "count": len(PROF_IDS),
+        "version": INDEX_VERSION,
+        "full": res["full"],
+        "upserted": len(res["upserted"]),
+        "deleted": len(res["deleted"]),
+    }
+
+
+# ---- Admin ingest (integration pipeline write path) ----
+# Bearer token for /api/admin/*; the endpoints are disabled when unset
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN") or None
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(1 << 20)))
+# Refitting TF-IDF/BM25 is O(catalog); refresh at most this often mid-stream
+INGEST_INDEX_REFRESH_SECONDS = float(os.getenv("INGEST_INDEX_REFRESH_SECONDS", "5"))
+
+
+def require_admin_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+) -> None:
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(503, "Admin API disabled")
+    if (
+        credentials is None
+        or credentials.scheme.lower() != "bearer"
+        or not secrets.compare_digest(credentials.credentials.encode(), ADMIN_API_TOKEN.encode())
+    ):
+        raise HTTPException(401, "Invalid admin token")
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body generator is still reading the request body.
+
+    The stock class polls receive() for a disconnect while streaming, which would
+    swallow request chunks; here the generator sees the disconnect itself.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _apply_ingest(items: list) -> dict:
+    with SessionLocal.begin() as db:
+        return apply_ingest_batch(db, items)
+
+
+def _refresh_index_from_primary() -> None:
+    # The replica may lag the batch that was just committed
+    with SessionLocal() as db:
+        fingerprint = catalog_fingerprint(db) if INDEX_SNAPSHOTS_ENABLED else None
+        res = refresh_vectorstore(db)
+        if res["full"] or res["upserted"] or res["deleted"]:
+            announce_index(db, fingerprint)
+
+
+@app.post("/api/admin/professors:ingest")
+async def ingest_professors(request: Request, _: None = Depends(require_admin_token)):
+    """Apply a streamed NDJSON body of professor upserts/deletes in batched transactions.
+
+    One JSON result line is streamed back per batch, then a summary line. A failed
+    batch is rolled back and reported; later batches still run.
+    """
+
+    async def results():
+        totals = {"upserted": 0, "deleted": 0, "unchanged": 0, "errors": 0, "failed_batches": 0}
+        state = {"batch": 0, "dirty": False, "refreshed": time.monotonic()}
+
+        async def run(items: list, errors: list) -> str:
+            state["batch"] += 1
+            out = {"batch": state["batch"], "lines": len(items) + len(errors)}
+            try:
+                res = await run_in_threadpool(_apply_ingest, items) if items else {
+                    "upserted": 0, "deleted": 0, "unchanged": 0, "errors": []
+                }
+            except Exception as e:
+                logger.error(f"❌ Ingest batch {state['batch']} failed: {e}")
+                totals["failed_batches"] += 1
+                out.update(error=str(e), errors=errors)
+                totals["errors"] += len(errors)
+                return json.dumps(out) + "\n"
+            res["errors"] = errors + res["errors"]
+            for k in ("upserted", "deleted", "unchanged"):
+                totals[k] += res[k]
+                metrics.inc("lablink_ingest_rows_total", res[k], help="Rows handled by the admin ingest endpoint", result=k)
+            totals["errors"] += len(res["errors"])
+            out.update(res)
+            if res["upserted"] or res["deleted"]:
+                state["dirty"] = True
+            if state["dirty"] and time.monotonic() - state["refreshed"] >= INGEST_INDEX_REFRESH_SECONDS:
+                await run_in_threadpool(_refresh_index_from_primary)
+                state["dirty"] = False
+                state["refreshed"] = time.monotonic()
+            return json.dumps(out) + "\n"
+
+        items: list = []
+        errors: list = []
+        try:
+            async for line, rec in aiter_ndjson(request.stream(), max_line_bytes=INGEST_MAX_LINE_BYTES):
+                if isinstance(rec, ValueError):
+                    errors.append({"line": line, "error": str(rec)})
+                else:
+                    items.append((line, rec))
+                if len(items) + len(errors) >= INGEST_BATCH_SIZE:
+                    yield await run(items, errors)
+                    items, errors = [], []
+            if items or errors:
+                yield await run(items, errors)
+        except ClientDisconnect:
+            logger.warning("⚠️ Ingest client disconnected; committed batches are kept")
+        if state["dirty"]:
+            await run_in_threadpool(_refresh_index_from_primary)
+        yield json.dumps({"done": True, "batches": state["batch"], **totals, "index_version": INDEX_VERSION}) + "\n"
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
 
 
 # ---- Helper to build OAuth redirect_uri respecting proxy headers ----
@@ -502,7 +861,7 @@ async def oauth_callback(
     code: Optional[str] = None,
     state: Optional[str] = None,
     error: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if error:
         raise HTTPException(400, f"OAuth error: {error}")
@@ -536,7 +895,7 @@ async def oauth_callback(
         id_token = payload.get("id_token")
         if not id_token:
             raise HTTPException(400, "Missing id_token in token response")
-        claims = verify_google_token(id_token)
+        claims = await run_in_threadpool(verify_google_token, id_token)
         email = str(claims.get("email") or "")
         sub = str(claims.get("sub") or "")
         name = claims.get("name")
@@ -548,10 +907,10 @@ async def oauth_callback(
         allowed = set(ALLOWED_EMAIL_DOMAINS)
         if (domain not in allowed) and (hd not in allowed):
             raise HTTPException(403, "Email domain not allowed")
-        user = crud.get_or_create_user_by_sub(
+        user = await acrud.get_or_create_user_by_sub(
             db, sub, email=email, name=name, picture=picture
         )
-        sess = crud.create_session(db, user, ttl_seconds=SESSION_TTL_SECONDS)
+        sess = await acrud.create_session(db, user, ttl_seconds=SESSION_TTL_SECONDS)
     except HTTPException:
         raise
     except Exception as e:
@@ -592,6 +951,7 @@ def to_prof_out(p) -> ProfessorOut:
         personal_site=_personal_site,
         photo_url=getattr(p, "photo_url", ""),
         skills=skills,
+        updated_at=getattr(p, "updated_at", None),
     )
 
 
@@ -607,11 +967,20 @@ def api_health():
     return {"ok": True}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # ---- Security headers ----
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
     resp = await call_next(request)
     try:
+        # Which catalog version this worker's match index was serving
+        resp.headers["X-Index-Version"] = str(INDEX_VERSION)
         resp.headers.setdefault("X-Content-Type-Options", "nosniff")
         resp.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
         resp.headers.setdefault(
@@ -636,14 +1005,14 @@ async def add_security_headers(request: Request, call_next):
 
 # ---- Cookie-based auth endpoints ----
 @app.post("/api/auth/login")
-def auth_login(
+async def auth_login(
     id_token: str = Body(..., embed=True),
     response: Response = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if not GOOGLE_CLIENT_ID:
         raise HTTPException(500, "Server misconfigured")
-    claims = verify_google_token(id_token)
+    claims = await run_in_threadpool(verify_google_token, id_token)
     email = str(claims.get("email") or "")
     sub = str(claims.get("sub") or "")
     name = claims.get("name")
@@ -655,10 +1024,10 @@ def auth_login(
     allowed = set(ALLOWED_EMAIL_DOMAINS)
     if (domain not in allowed) and (hd not in allowed):
         raise HTTPException(403, "Email domain not allowed")
-    user = crud.get_or_create_user_by_sub(
+    user = await acrud.get_or_create_user_by_sub(
         db, sub, email=email, name=name, picture=picture
     )
-    sess = crud.create_session(db, user, ttl_seconds=SESSION_TTL_SECONDS)
+    sess = await acrud.create_session(db, user, ttl_seconds=SESSION_TTL_SECONDS)
     if response is None:
         response = Response()
     expires = datetime.utcnow() + timedelta(seconds=SESSION_TTL_SECONDS)
@@ -683,9 +1052,9 @@ def auth_login(
 
 
 @app.post("/api/auth/logout")
-def auth_logout(
+async def auth_logout(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     session_token: Optional[str] = Cookie(default=None, alias=SESSION_COOKIE_NAME),
 ):
     if not session_token:
@@ -703,8 +1072,9 @@ def auth_logout(
             path="/",
         )
         return {"ok": True}
+    await run_in_threadpool(SESSION_STORE.invalidate, session_token)
     try:
-        crud.delete_session(db, session_token)
+        await acrud.delete_session(db, session_token)
     except Exception:
         pass
     response.delete_cookie(
@@ -723,29 +1093,25 @@ def auth_logout(
 
 
 @app.post("/api/auth/refresh")
-def auth_refresh(
+async def auth_refresh(
     response: Response,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     session_token: Optional[str] = Cookie(default=None, alias=SESSION_COOKIE_NAME),
 ):
     if not session_token:
         raise HTTPException(401, "Missing session")
-    sess = crud.get_session(db, session_token)
+    # explicit refresh always extends (bypasses the touch-fraction throttle)
+    sess = await SESSION_STORE.aextend(db, session_token)
     if not sess:
         raise HTTPException(401, "Invalid or expired session")
-    # extend and reissue cookie
-    try:
-        crud.touch_session(db, sess, ttl_seconds=SESSION_TTL_SECONDS)
-    except Exception:
-        pass
     # respond with refreshed cookie
     r = Response(content=json.dumps({"ok": True}), media_type="application/json")
-    set_session_cookie(r, sess.token)
+    set_session_cookie(r, session_token)
     return r
 
 
 @app.get("/api/auth/me")
-def auth_me(user: dict = Depends(get_current_user)):
+async def auth_me(user: dict = Depends(get_current_user)):
     # Accept either cookie session or Bearer token (handled in get_current_user)
     return {
         "email": user.get("email"),
@@ -755,39 +1121,118 @@ def auth_me(user: dict = Depends(get_current_user)):
 
 
 @app.get("/api/professors", response_model=list[ProfessorOut])
-def list_professors(
-    department: str | None = Query(None), db: Session = Depends(get_db)
+async def list_professors(
+    response: Response,
+    department: str | None = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    profs = crud.list_professors(db, department)
+    # Read the version first so a concurrent write is re-sent, never skipped
+    response.headers["X-Catalog-Version"] = str(await acrud.current_catalog_version(db))
+    profs = await acrud.list_professors(db, department)
     return [to_prof_out(p) for p in profs]
 
 
+# Declared before /api/professors/{professor_id} so "changes" is not parsed as an id
+@app.get("/api/professors/changes", response_model=ProfessorChangesOut)
+async def professor_changes(
+    since: int = Query(0, ge=0), db: AsyncSession = Depends(get_async_read_db)
+):
+    """Delta feed for client-side sync: pass the last seen version as `since`."""
+    delta = await acrud.list_catalog_changes(db, since)
+    upserted = []
+    if not delta["full_refetch"]:
+        profs = await acrud.get_professors_by_ids(db, delta["upserted"])
+        upserted = [to_prof_out(p) for p in profs]
+    return ProfessorChangesOut(
+        version=delta["version"],
+        full_refetch=delta["full_refetch"],
+        upserted=upserted,
+        deleted=delta["deleted"],
+    )
+
+
 @app.get("/api/professors/{professor_id}", response_model=ProfessorOut)
-def get_professor(professor_id: int, db: Session = Depends(get_db)):
-    p = crud.get_professor(db, professor_id)
+async def get_professor(professor_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    p = await acrud.get_professor(db, professor_id)
     if not p:
         raise HTTPException(404, "Professor not found")
     return to_prof_out(p)
 
 
 @app.get("/api/departments", response_model=list[str])
-def list_departments(db: Session = Depends(get_db)):
-    deps = crud.list_departments(db)
+async def list_departments(db: AsyncSession = Depends(get_async_read_db)):
+    deps = await acrud.list_departments(db)
     return deps
 
 
 # ---- Matching endpoints ----
+# Identical match queries are served from cache (computed once, refreshed before expiry)
+MATCH_CACHE_TTL_SECONDS = int(os.getenv("MATCH_CACHE_TTL_SECONDS", "1800"))
+
+
 @app.post("/api/match", response_model=MatchResponse)
-def match_professors(
+async def match_professors(
     profile: StudentProfileIn,
     department: Optional[str] = Query(None),
     user: dict = Depends(require_ucdavis_user),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    query_text = norm_text((profile.interests or ""))
+    key = await _match_cache_key(profile, department)
+
+    async def compute() -> dict:
+        profs = await acrud.list_professors(db, department_substr=department or None)
+        # Scoring is CPU-bound; run it in the threadpool, not on the event loop
+        result = await run_in_threadpool(rank_matches, profile, department, profs)
+        return result.model_dump(mode="json")
+
+    return await cache.aget_or_compute(key, compute, ttl=MATCH_CACHE_TTL_SECONDS)
 
-    profs = crud.list_professors(
-        db=next(get_db()), department_substr=department or None
-    )
+
+@app.post("/api/match/batch", response_model=MatchBatchResponse)
+async def match_professors_batch(
+    req: MatchBatchRequest,
+    department: Optional[str] = Query(None),
+    user: dict = Depends(require_ucdavis_user),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Match several profiles at once: one cache read and one cache write for the batch."""
+    keys = [await _match_cache_key(p, department) for p in req.profiles]
+    cached = await cache.aget_many(keys)
+    results = {key: entry["v"] for key, entry in cached.items()}
+    missing = {key: p for key, p in zip(keys, req.profiles) if key not in results}
+    if missing:
+        profs = await acrud.list_professors(db, department_substr=department or None)
+
+        def rank_all() -> dict:
+            # stored like /api/match entries, so either endpoint hits the other's results
+            entries = {}
+            for key, p in missing.items():
+                started = time.monotonic()
+                result = rank_matches(p, department, profs).model_dump(mode="json")
+                entries[key] = cache.computed_entry(result, MATCH_CACHE_TTL_SECONDS, started)
+            return entries
+
+        entries = await run_in_threadpool(rank_all)
+        results.update({key: entry["v"] for key, entry in entries.items()})
+        await cache.aset_many(entries, ttl=MATCH_CACHE_TTL_SECONDS)
+    return {"results": [results[key] for key in keys]}
+
+
+async def _match_cache_key(profile: StudentProfileIn, department: Optional[str]) -> str:
+    # Results depend only on the query and the catalog, so identical queries share
+    # one cached result; the catalog version in the key retires it on changes.
+    return await cache.anamespace_key("similarity", cache._generate_key("match", {
+        "interests": profile.interests or "",
+        "skills": profile.skills or "",
+        "department": department or "",
+        "version": INDEX_VERSION,
+    }))
+
+
+def rank_matches(
+    profile: StudentProfileIn, department: Optional[str], profs: list
+) -> MatchResponse:
+    query_text = norm_text((profile.interests or ""))
 
     # fixed weights (request does not carry weights)
     w_interests = 0.6
@@ -940,7 +1385,7 @@ def email_generate(req: EmailRequest, user: dict = Depends(require_ucdavis_user)
     return EmailDraft(**draft)
 
 
-@app.post("/api/email/send")
+@app.post("/api/email/send", status_code=202, dependencies=[Depends(EMAIL_SEND_LIMIT.dependency(user_rate_key))])
 def email_send(
     to: str = Body(..., embed=True),
     subject: str = Body(..., embed=True),
@@ -948,60 +1393,68 @@ def email_send(
     filename: str | None = Body(None, embed=True),
     file_b64: str | None = Body(None, embed=True),
     user: dict = Depends(require_ucdavis_user),
+    db: Session = Depends(get_db),
 ):
-    # simple rate limit per user/email for send: 3/min
-    key = f"email:{str(user.get('email') or user.get('sub') or 'anon')}"
-    now = int(datetime.utcnow().timestamp())
-    window = 60
-    bucket = _EMAIL_SEND_EVENTS.get(key, [])
-    bucket = [t for t in bucket if (now - t) <= window]
-    if len(bucket) >= 3:
-        raise HTTPException(429, "Too many emails. Try again in a minute.")
-    bucket.append(now)
-    _EMAIL_SEND_EVENTS[key] = bucket
-
+    """Queue the email and return 202; the outbox sender delivers it (see /api/email/status)."""
     # Validate basic fields
-    if not to or not re.match(r"^[^\s@]+@[^\s@]+\.[^\s@]+$", to):
+    # Lengths match the email_outbox columns, so an oversized value is a 422, not a DB error
+    if not to or len(to) > 255 or not re.match(r"^[^\s@]+@[^\s@]+\.[^\s@]+$", to):
         raise HTTPException(422, "Invalid recipient email")
     if not subject or len(subject) > 200:
         raise HTTPException(422, "Invalid subject")
     if not body or len(body) > 20000:
         raise HTTPException(422, "Invalid body content")
+    if filename and len(filename) > 255:
+        raise HTTPException(422, "Attachment filename too long")
 
     # Attachment limit 5MB
     MAX_ATTACH = 5 * 1024 * 1024
+    attachment_data = None
     if filename and file_b64:
         try:
-            data = base64.b64decode(file_b64)
-            if len(data) > MAX_ATTACH:
-                raise HTTPException(413, "Attachment too large (max 5MB)")
+            attachment_data = base64.b64decode(file_b64)
         except Exception:
             raise HTTPException(400, "Invalid attachment encoding")
+        if len(attachment_data) > MAX_ATTACH:
+            raise HTTPException(413, "Attachment too large (max 5MB)")
+
+    row = enqueue_email(
+        db,
+        requested_by=user_rate_key(user),
+        to_email=to,
+        subject=subject,
+        body=body,
+        attachment_filename=filename,
+        attachment=attachment_data,
+    )
+    EMAIL_OUTBOX.wake()
+    logger.info(f"📮 Email {row.message_id} to {to} queued")
+    return {"ok": True, "message_id": row.message_id, "status": row.status}
 
-    # Send (mock or real)
-    try:
-        # Decode base64 string to bytes for attachment
-        attachment_data = None
-        if file_b64:
-            attachment_data = base64.b64decode(file_b64)
-
-        send_email_with_attachment(
-            to_email=to,
-            subject=subject,
-            body=body,
-            attachment_filename=filename,
-            attachment_bytes=attachment_data,
-        )
-        logger.info(f"Email sent successfully to {to}")
-    except Exception as e:
-        logger.error(f"Failed to send email to {to}: {e}")
-        raise HTTPException(500, f"Failed to send email: {e}")
 
-    return {"ok": True}
+@app.get("/api/email/status/{message_id}", response_model=EmailStatusOut)
+def email_status(
+    message_id: str,
+    user: dict = Depends(require_ucdavis_user),
+    db: Session = Depends(get_db),
+):
+    row = get_outbox_email(db, message_id)
+    # Only the sender may see a message's state
+    if row is None or row.requested_by != user_rate_key(user):
+        raise HTTPException(404, "Message not found")
+    return EmailStatusOut(
+        message_id=row.message_id,
+        status=row.status,
+        attempts=row.attempts,
+        last_error=row.last_error,
+        created_at=row.created_at,
+        sent_at=row.sent_at,
+        next_attempt_at=row.next_attempt_at if row.status == "queued" else None,
+    )
 
 
 # ---- Photo scraping (best-effort, lightweight) ----
-@app.get("/api/scrape_photo")
+@app.get("/api/scrape_photo", dependencies=[Depends(SCRAPE_PHOTO_LIMIT.dependency(user_rate_key))])
 def scrape_photo(url: str, user: dict = Depends(require_ucdavis_user)):
     try:
         # Allow only http(s) and restrict to a safe allowlist of domains
@@ -1017,17 +1470,6 @@ def scrape_photo(url: str, user: dict = Depends(require_ucdavis_user)):
         ):
             return {"photo_url": ""}
 
-        # lightweight rate limit per user/email for this endpoint (5/min)
-        key = f"scrape:{str(user.get('email') or user.get('sub') or 'anon')}"
-        now = int(datetime.utcnow().timestamp())
-        window = 60
-        bucket = _EMAIL_SEND_EVENTS.get(key, [])
-        bucket = [t for t in bucket if (now - t) <= window]
-        if len(bucket) >= 5:
-            raise HTTPException(429, "Rate limit exceeded. Try later.")
-        bucket.append(now)
-        _EMAIL_SEND_EVENTS[key] = bucket
-
         resp = httpx.get(
             url,
             timeout=8.0,
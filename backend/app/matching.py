@@ -2,6 +2,7 @@ import re
 from typing import List, Dict, Any, Tuple
 from datetime import datetime
 from rank_bm25 import BM25Okapi
+import numpy as np
 import os
 
 try:
@@ -128,14 +129,71 @@ def expand_query_text(interests: str, skills: str | None) -> str:
     full = " ".join([p for p in base_parts if p] + expansions)
     return norm_text(full)
 
+class BM25Index:
+    """BM25Okapi scores over flat arrays (CSC term -> docs), so it can be saved and mmap'd.
+
+    Scores match rank_bm25.BM25Okapi.get_scores, which this is built from.
+    """
+
+    def __init__(self, vocab: Dict[str, int], idf, tf_data, tf_indices, tf_indptr, norm, k1: float, n_docs: int):
+        self.vocab = vocab
+        self.idf = idf
+        self.tf_data = tf_data
+        self.tf_indices = tf_indices
+        self.tf_indptr = tf_indptr
+        # k1 * (1 - b + b * doc_len / avgdl), per doc
+        self.norm = norm
+        self.k1 = k1
+        self.n_docs = n_docs
+
+    @classmethod
+    def from_tokens(cls, corpus: List[List[str]]) -> "BM25Index":
+        okapi = BM25Okapi(corpus)
+        vocab = {t: i for i, t in enumerate(okapi.idf)}
+        terms, docs, tfs = [], [], []
+        for d, freqs in enumerate(okapi.doc_freqs):
+            for t, f in freqs.items():
+                terms.append(vocab[t])
+                docs.append(d)
+                tfs.append(f)
+        terms_a = np.asarray(terms, dtype=np.int64)
+        order = np.argsort(terms_a, kind="stable")
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms_a, minlength=len(vocab)), out=indptr[1:])
+        doc_len = np.asarray(okapi.doc_len, dtype=np.float64)
+        avgdl = okapi.avgdl or 1.0
+        return cls(
+            vocab,
+            np.asarray([okapi.idf[t] for t in vocab], dtype=np.float64),
+            np.asarray(tfs, dtype=np.float64)[order],
+            np.asarray(docs, dtype=np.int64)[order],
+            indptr,
+            okapi.k1 * (1 - okapi.b + okapi.b * doc_len / avgdl),
+            okapi.k1,
+            okapi.corpus_size,
+        )
+
+    def get_scores(self, query: List[str]):
+        score = np.zeros(self.n_docs)
+        for q in query:
+            j = self.vocab.get(q)
+            if j is None:
+                continue
+            lo, hi = self.tf_indptr[j], self.tf_indptr[j + 1]
+            rows = self.tf_indices[lo:hi]
+            tf = self.tf_data[lo:hi]
+            score[rows] += self.idf[j] * (tf * (self.k1 + 1) / (tf + self.norm[rows]))
+        return score
+
+
 class VectorStore:
     def __init__(self, prof_docs: List[str]):
         # Normalize and drop empty documents to avoid sklearn empty vocabulary errors
         cleaned_docs = [norm_text(d) for d in (prof_docs or []) if (d or "").strip()]
         self.docs = cleaned_docs
         # tokenized corpus for BM25
-        self._bm25_tokens: List[List[str]] = [tokenize(d) for d in self.docs]
-        self._bm25 = BM25Okapi(self._bm25_tokens) if self._bm25_tokens else None
+        bm25_tokens: List[List[str]] = [tokenize(d) for d in self.docs]
+        self._bm25 = BM25Index.from_tokens(bm25_tokens) if bm25_tokens else None
         if SKLEARN_OK and self.docs:
             try:
                 self.vect = TfidfVectorizer(stop_words="english")
@@ -146,6 +204,51 @@ class VectorStore:
         else:
             self.vect, self.mat = None, None
 
+    def to_snapshot(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """(arrays, meta): numpy arrays to save as .npy and JSON-able metadata."""
+        arrays: Dict[str, Any] = {}
+        meta: Dict[str, Any] = {"docs": self.docs, "bm25": None, "tfidf": None}
+        if self._bm25 is not None:
+            b = self._bm25
+            arrays.update(bm25_idf=b.idf, bm25_tf_data=b.tf_data, bm25_tf_indices=b.tf_indices,
+                          bm25_tf_indptr=b.tf_indptr, bm25_norm=b.norm)
+            meta["bm25"] = {"vocab": b.vocab, "k1": b.k1, "n_docs": b.n_docs}
+        if self.vect is not None and self.mat is not None:
+            mat = self.mat.tocsr()
+            arrays.update(tfidf_idf=self.vect.idf_, tfidf_data=mat.data, tfidf_indices=mat.indices,
+                          tfidf_indptr=mat.indptr)
+            meta["tfidf"] = {
+                "vocab": {t: int(i) for t, i in self.vect.vocabulary_.items()},
+                "shape": list(mat.shape),
+            }
+        return arrays, meta
+
+    @classmethod
+    def from_snapshot(cls, arrays: Dict[str, Any], meta: Dict[str, Any]) -> "VectorStore":
+        """Rebuild from to_snapshot() output without refitting; arrays may be memory-mapped."""
+        self = cls.__new__(cls)
+        self.docs = list(meta["docs"])
+        self._bm25 = None
+        if meta.get("bm25"):
+            b = meta["bm25"]
+            self._bm25 = BM25Index(
+                b["vocab"], arrays["bm25_idf"], arrays["bm25_tf_data"], arrays["bm25_tf_indices"],
+                arrays["bm25_tf_indptr"], arrays["bm25_norm"], b["k1"], b["n_docs"],
+            )
+        self.vect, self.mat = None, None
+        if SKLEARN_OK and meta.get("tfidf"):
+            from scipy.sparse import csr_matrix
+            t = meta["tfidf"]
+            self.vect = TfidfVectorizer(stop_words="english")
+            self.vect.vocabulary_ = t["vocab"]
+            self.vect.idf_ = np.asarray(arrays["tfidf_idf"])
+            self.mat = csr_matrix(
+                (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+                shape=tuple(t["shape"]),
+                copy=False,
+            )
+        return self
+
     def sims(self, q: str) -> List[float]:
         qn = norm_text(q)
         # TF-IDF cosine (if available)
@@ -185,12 +288,19 @@ class VectorStore:
         return cov_scores or []
 
 
+def semantic_model_name() -> str:
+    """Embedding model for SemanticIndex (SEMANTIC_MODEL); the default has a small footprint."""
+    return os.getenv("SEMANTIC_MODEL") or "sentence-transformers/paraphrase-MiniLM-L3-v2"
+
+
 class SemanticIndex:
     """Lightweight wrapper around sentence-transformers for semantic similarity.
 
     If dependencies are not available, this degrades to a no-op returning zeros.
     """
-    def __init__(self, prof_docs: List[str]):
+    def __init__(self, prof_docs: List[str], previous: "SemanticIndex | None" = None, embeddings=None):
+        """`previous` lets a refresh reuse its loaded model and the embeddings of unchanged docs;
+        `embeddings` (one row per non-empty doc, e.g. mmap'd from a snapshot) skips encoding."""
         # Only enable if explicitly enabled via env; import heavy deps lazily
         env_enabled = str(os.getenv("SEMANTIC_ENABLED", "0")).lower() in {"1", "true", "yes"}
         if not (env_enabled and prof_docs):
@@ -206,24 +316,40 @@ class SemanticIndex:
         self._emb = None
         if self.enabled:
             try:
-                # Allow overriding model; default to a small footprint
-                model_name = os.getenv("SEMANTIC_MODEL", "sentence-transformers/paraphrase-MiniLM-L3-v2")
-                self._model = SentenceTransformer(model_name)  # type: ignore
-                emb = self._model.encode(self.docs, normalize_embeddings=True, convert_to_numpy=True)  # type: ignore
-                # Ensure float32, finite values, and re-normalize to avoid numeric issues
-                emb32 = emb.astype("float32")  # type: ignore
-                emb32 = _np.nan_to_num(emb32, nan=0.0, posinf=0.0, neginf=0.0)  # type: ignore
-                norms = _np.linalg.norm(emb32, axis=1, keepdims=True)  # type: ignore
-                safe_norms = _np.where(_np.isfinite(norms) & (norms > 1e-12), norms, 1.0)  # type: ignore
-                emb32 = emb32 / safe_norms  # type: ignore
+                reuse = previous if (previous is not None and previous._model is not None and previous._emb is not None) else None
+                if reuse is not None:
+                    self._model = reuse._model
+                else:
+                    self._model = SentenceTransformer(semantic_model_name())  # type: ignore
+                if embeddings is not None and len(embeddings) == len(self.docs):
+                    # Use as-is so a memory-mapped array stays shared, not copied
+                    self._emb = embeddings
+                    return
+                known = {d: i for i, d in enumerate(reuse.docs)} if reuse is not None else {}
+                # Only encode docs the previous index has not seen
+                fresh = [d for d in dict.fromkeys(self.docs) if d not in known]
+                fresh_rows = {}
+                if fresh:
+                    emb = self._clean(self._model.encode(fresh, normalize_embeddings=True, convert_to_numpy=True))  # type: ignore
+                    fresh_rows = {d: emb[i] for i, d in enumerate(fresh)}
+                rows = [fresh_rows[d] if d in fresh_rows else reuse._emb[known[d]] for d in self.docs]  # type: ignore
                 # Ensure contiguous
-                self._emb = _np.ascontiguousarray(emb32)  # type: ignore
+                self._emb = _np.ascontiguousarray(_np.vstack(rows))  # type: ignore
             except Exception:
                 # Disable on any runtime error
                 self.enabled = False
                 self._model = None
                 self._emb = None
 
+    @staticmethod
+    def _clean(emb):
+        # Ensure float32, finite values, and re-normalize to avoid numeric issues
+        emb32 = emb.astype("float32")  # type: ignore
+        emb32 = _np.nan_to_num(emb32, nan=0.0, posinf=0.0, neginf=0.0)  # type: ignore
+        norms = _np.linalg.norm(emb32, axis=1, keepdims=True)  # type: ignore
+        safe_norms = _np.where(_np.isfinite(norms) & (norms > 1e-12), norms, 1.0)  # type: ignore
+        return emb32 / safe_norms  # type: ignore
+
     def sims(self, q: str) -> List[float]:
         if not self.enabled or self._model is None or self._emb is None:
             return [0.0 for _ in self.docs]
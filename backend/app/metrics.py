@@ -0,0 +1,107 @@
+# 📈 In-process metrics registry rendered in Prometheus text format (GET /metrics)
+import threading
+from typing import Callable
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in items)
+    return "{" + inner + "}"
+
+
+class Metrics:
+    """Counters, gauges and histograms keyed by name + labels.
+
+    Values are per process; with several workers each one reports its own.
+    Collectors registered with `register_collector` run right before rendering,
+    for gauges that are cheaper to read on demand (pool stats, cache sizes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types: dict[str, tuple[str, str]] = {}
+        self._values: dict[str, dict[tuple, float]] = {}
+        self._hists: dict[str, dict[tuple, list]] = {}
+        self._buckets: dict[str, tuple] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def _declare(self, name: str, kind: str, help_text: str) -> None:
+        if name not in self._types:
+            self._types[name] = (kind, help_text or name)
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._declare(name, "counter", help)
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, help: str = "", **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._declare(name, "gauge", help)
+            self._values.setdefault(name, {})[key] = float(value)
+
+    def observe(self, name: str, value: float, help: str = "", buckets: tuple = DEFAULT_BUCKETS, **labels) -> None:
+        key = _labels_key(labels)
+        with self._lock:
+            self._declare(name, "histogram", help)
+            bks = self._buckets.setdefault(name, buckets)
+            series = self._hists.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                # per-bucket counts (non-cumulative), sum, count
+                h = series[key] = [[0] * len(bks), 0.0, 0]
+            for i, b in enumerate(bks):
+                if value <= b:
+                    h[0][i] += 1
+                    break
+            h[1] += value
+            h[2] += 1
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._values.get(name, {}).get(_labels_key(labels), 0.0)
+
+    def register_collector(self, fn: Callable[[], None]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception:
+                pass
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._types):
+                kind, help_text = self._types[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    bks = self._buckets[name]
+                    for key, (counts, total, count) in self._hists.get(name, {}).items():
+                        cum = 0
+                        for b, c in zip(bks, counts):
+                            cum += c
+                            lines.append(f"{name}_bucket{_fmt_labels(key, (('le', str(b)),))} {cum}")
+                        lines.append(f"{name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {count}")
+                        lines.append(f"{name}_sum{_fmt_labels(key)} {total}")
+                        lines.append(f"{name}_count{_fmt_labels(key)} {count}")
+                else:
+                    for key, v in self._values.get(name, {}).items():
+                        lines.append(f"{name}{_fmt_labels(key)} {v}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry
+metrics = Metrics()
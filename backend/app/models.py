@@ -1,8 +1,14 @@
 # 🗄️ Database schema definitions (Professor, Student, Match tables).
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Text, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship, Session
+from sqlalchemy import Integer, String, Text, LargeBinary, ForeignKey, Index, UniqueConstraint, event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+import time
 from .database import Base
 
+
+def _now() -> int:
+    return int(time.time())
+
 class Professor(Base):
     __tablename__ = "professors"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -13,6 +19,10 @@ class Professor(Base):
     profile_link: Mapped[str | None] = mapped_column(String(512))
     photo_url: Mapped[str | None] = mapped_column(String(512), default="")
     personal_site: Mapped[str | None] = mapped_column(String(512))
+    # unix epoch seconds; bumped on any change to the row or its skills
+    updated_at: Mapped[int | None] = mapped_column(Integer, default=_now, onupdate=_now, index=True)
+    # sha256 of the seed record (fields + skills); lets a reseed skip unchanged rows
+    content_hash: Mapped[str | None] = mapped_column(String(64))
     # recent_publications removed
     professor_skills: Mapped[list["ProfessorSkill"]] = relationship(
         back_populates="professor", cascade="all, delete-orphan"
@@ -30,6 +40,7 @@ class ProfessorSkill(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     professor_id: Mapped[int] = mapped_column(ForeignKey("professors.id", ondelete="CASCADE"), index=True)
     skill_id: Mapped[int] = mapped_column(ForeignKey("skills.id", ondelete="CASCADE"), index=True)
+    updated_at: Mapped[int | None] = mapped_column(Integer, default=_now, onupdate=_now)
 
     professor: Mapped["Professor"] = relationship(back_populates="professor_skills")
     skill: Mapped["Skill"] = relationship()
@@ -52,6 +63,126 @@ class SessionToken(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     token: Mapped[str] = mapped_column(String(255), unique=True, index=True)
-    expires_at: Mapped[int] = mapped_column(Integer)  # unix epoch seconds
+    expires_at: Mapped[int] = mapped_column(Integer, index=True)  # unix epoch seconds (indexed for the sweeper)
 
     user: Mapped["User"] = relationship()
+
+
+class CatalogChange(Base):
+    """Append-only log of professor catalog changes; `version` is the catalog version.
+
+    Row ids are not used as versions: concurrent transactions can commit sequence
+    values out of order, so a reader past id N could miss a lower id committed later.
+    """
+    __tablename__ = "catalog_changes"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # from next_catalog_version(); all rows written by one flush share it
+    version: Mapped[int | None] = mapped_column(Integer, index=True)
+    # NULL for "reset" entries (bulk wipe/reseed), which force clients to refetch
+    professor_id: Mapped[int | None] = mapped_column(Integer, index=True)
+    op: Mapped[str] = mapped_column(String(16))  # "upsert" | "delete" | "reset"
+    changed_at: Mapped[int] = mapped_column(Integer, default=_now, index=True)
+
+
+class CatalogVersion(Base):
+    """Single-row counter that hands out catalog versions in commit order."""
+    __tablename__ = "catalog_version"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+def next_catalog_version(conn) -> int:
+    """Allocate the version for catalog changes written in the current transaction.
+
+    The UPDATE keeps the counter row locked until commit, so a writer that gets a
+    higher version commits after every writer with a lower one; a reader that sees
+    version V has therefore seen every change <= V.
+    """
+    counter = CatalogVersion.__table__
+    for _ in range(2):
+        bumped = conn.execute(
+            update(counter).where(counter.c.id == 1).values(version=counter.c.version + 1)
+        ).rowcount
+        if bumped:
+            return conn.execute(select(counter.c.version).where(counter.c.id == 1)).scalar_one()
+        _seed_catalog_version(conn)
+    raise RuntimeError("catalog version counter could not be created")
+
+
+def _seed_catalog_version(conn) -> None:
+    # First versioned change on this database: older log rows keep their id as version
+    log, counter = CatalogChange.__table__, CatalogVersion.__table__
+    try:
+        with conn.begin_nested():
+            conn.execute(update(log).where(log.c.version.is_(None)).values(version=log.c.id))
+            start = conn.execute(select(func.max(log.c.version))).scalar() or 0
+            conn.execute(insert(counter).values(id=1, version=start))
+    except IntegrityError:
+        pass  # another writer created it first
+
+
+class OutboxEmail(Base):
+    """Email accepted by /api/email/send and delivered by the background sender (see outbox.py)."""
+    __tablename__ = "email_outbox"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # random public id returned to the client; row ids are not exposed
+    message_id: Mapped[str] = mapped_column(String(32), unique=True, index=True)
+    requested_by: Mapped[str] = mapped_column(String(255), index=True)
+    to_email: Mapped[str] = mapped_column(String(255))
+    subject: Mapped[str] = mapped_column(String(255))
+    body: Mapped[str] = mapped_column(Text)
+    attachment_filename: Mapped[str | None] = mapped_column(String(255))
+    # cleared once the message is sent or given up on
+    attachment: Mapped[bytes | None] = mapped_column(LargeBinary)
+    status: Mapped[str] = mapped_column(String(16), default="queued")  # queued | sending | sent | failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # when the sender may (re)try it; while "sending", when its claim expires
+    next_attempt_at: Mapped[int] = mapped_column(Integer, default=_now)
+    last_error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[int] = mapped_column(Integer, default=_now)
+    sent_at: Mapped[int | None] = mapped_column(Integer)
+
+    __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_changes(session, flush_context):
+    """Record Professor/ProfessorSkill writes in the catalog change log.
+
+    Bulk Core statements (query.delete(), insert()) bypass this hook; callers doing
+    those must log changes themselves (see crud.record_catalog_changes).
+    """
+    upserted: set[int] = set()
+    deleted: set[int] = set()
+    for obj in session.new:
+        if isinstance(obj, Professor):
+            upserted.add(obj.id)
+        elif isinstance(obj, ProfessorSkill):
+            upserted.add(obj.professor_id)
+    for obj in session.dirty:
+        if isinstance(obj, Professor) and session.is_modified(obj):
+            upserted.add(obj.id)
+        elif isinstance(obj, ProfessorSkill) and session.is_modified(obj):
+            upserted.add(obj.professor_id)
+    for obj in session.deleted:
+        if isinstance(obj, Professor):
+            deleted.add(obj.id)
+        elif isinstance(obj, ProfessorSkill):
+            upserted.add(obj.professor_id)
+    upserted.discard(None)
+    upserted -= deleted
+    if not (upserted or deleted):
+        return
+    now = _now()
+    conn = session.connection()
+    version = next_catalog_version(conn)
+    if upserted:
+        # Skill link changes do not touch the professor row; bump it explicitly
+        conn.execute(
+            update(Professor.__table__)
+            .where(Professor.__table__.c.id.in_(upserted))
+            .values(updated_at=now)
+        )
+    rows = [{"professor_id": pid, "op": "upsert", "changed_at": now, "version": version} for pid in sorted(upserted)]
+    rows += [{"professor_id": pid, "op": "delete", "changed_at": now, "version": version} for pid in sorted(deleted)]
+    conn.execute(insert(CatalogChange.__table__), rows)
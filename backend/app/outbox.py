@@ -0,0 +1,208 @@
+# 📮 Email outbox: /api/email/send queues a row, a background sender delivers it with retries
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .email_utils import send_email_with_attachment
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rows in these states are picked up once next_attempt_at has passed ("sending" rows
+# only when the worker that claimed them died before recording the outcome)
+_DUE = ("queued", "sending")
+
+
+def enqueue_email(
+    db: Session,
+    *,
+    requested_by: str,
+    to_email: str,
+    subject: str,
+    body: str,
+    attachment_filename: Optional[str] = None,
+    attachment: Optional[bytes] = None,
+) -> models.OutboxEmail:
+    row = models.OutboxEmail(
+        message_id=uuid.uuid4().hex,
+        requested_by=requested_by,
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        attachment_filename=attachment_filename if attachment else None,
+        attachment=attachment,
+        status="queued",
+        attempts=0,
+        next_attempt_at=int(time.time()),
+    )
+    db.add(row)
+    db.commit()
+    metrics.inc("lablink_email_queued_total", help="Emails accepted into the outbox")
+    return row
+
+
+def get_outbox_email(db: Session, message_id: str) -> Optional[models.OutboxEmail]:
+    return db.scalars(
+        select(models.OutboxEmail).where(models.OutboxEmail.message_id == message_id)
+    ).first()
+
+
+def is_permanent(error: BaseException) -> bool:
+    """SMTP rejections that retrying cannot fix (5xx on every recipient or on the message).
+
+    4xx replies (greylisting, mailbox full, 421) are temporary and go through backoff.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False  # credentials may be fixed before the next attempt
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+class EmailOutbox:
+    """Daemon thread that delivers due outbox rows, one short transaction per step.
+
+    A row is claimed with a conditional UPDATE (status -> "sending", next_attempt_at ->
+    now + `claim_seconds`), so several workers can run a sender against the same table
+    without sending a message twice; a claim left by a crashed worker expires and the
+    row is retried. Failures back off exponentially (`backoff_seconds` * 2^(attempt-1),
+    capped, with jitter) until `max_attempts`, then the row is marked "failed".
+    No DB transaction is open while SMTP is talking.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        poll_seconds: float = 5.0,
+        batch_size: int = 20,
+        max_attempts: int = 6,
+        backoff_seconds: float = 30.0,
+        max_backoff_seconds: float = 3600.0,
+        claim_seconds: int = 120,
+        send: Callable[..., object] = send_email_with_attachment,
+    ):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.claim_seconds = claim_seconds
+        self.send = send
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None or self.poll_seconds <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wake(self) -> None:
+        """Deliver now instead of at the next poll (called after enqueueing)."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.deliver_due()
+            except Exception as e:
+                metrics.inc("lablink_email_outbox_errors_total", help="Failed outbox sender runs")
+                logger.error(f"❌ Email outbox run failed: {e}")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def deliver_due(self, now: Optional[int] = None) -> int:
+        """Try every due row once; returns how many were sent."""
+        now = int(time.time()) if now is None else now
+        with self.session_factory() as db:
+            ids = db.scalars(
+                select(models.OutboxEmail.id)
+                .where(models.OutboxEmail.status.in_(_DUE), models.OutboxEmail.next_attempt_at <= now)
+                .order_by(models.OutboxEmail.next_attempt_at)
+                .limit(self.batch_size)
+            ).all()
+        sent = 0
+        for row_id in ids:
+            if self._stop.is_set():
+                break
+            sent += self._deliver(row_id, now)
+        return sent
+
+    def _claim(self, row_id: int, now: int) -> Optional[dict]:
+        table = models.OutboxEmail
+        with self.session_factory() as db:
+            claimed = db.execute(
+                update(table)
+                .where(table.id == row_id, table.status.in_(_DUE), table.next_attempt_at <= now)
+                .values(status="sending", attempts=table.attempts + 1, next_attempt_at=now + self.claim_seconds)
+            ).rowcount
+            if not claimed:
+                db.rollback()
+                return None
+            row = db.get(table, row_id)
+            job = {
+                "attempts": row.attempts,
+                "to_email": row.to_email,
+                "subject": row.subject,
+                "body": row.body,
+                "attachment_filename": row.attachment_filename,
+                "attachment_bytes": row.attachment,
+            }
+            db.commit()
+        return job
+
+    def _record(self, row_id: int, **values) -> None:
+        with self.session_factory() as db:
+            db.execute(update(models.OutboxEmail).where(models.OutboxEmail.id == row_id).values(**values))
+            db.commit()
+
+    def _deliver(self, row_id: int, now: int) -> bool:
+        job = self._claim(row_id, now)
+        if job is None:
+            return False  # another worker got it first
+        attempts = job.pop("attempts")
+        started = time.perf_counter()
+        try:
+            self.send(**job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:1000]
+            if attempts >= self.max_attempts or is_permanent(e):
+                self._record(row_id, status="failed", last_error=error, attachment=None)
+                metrics.inc("lablink_email_failed_total", help="Emails given up on")
+                logger.error(f"❌ Email {row_id} failed after {attempts} attempt(s): {error}")
+            else:
+                retry_at = int(time.time() + self.backoff(attempts))
+                self._record(row_id, status="queued", last_error=error, next_attempt_at=retry_at)
+                metrics.inc("lablink_email_retries_total", help="Email delivery attempts that will be retried")
+                logger.warning(f"⚠️ Email {row_id} attempt {attempts} failed, retrying: {error}")
+            return False
+        finally:
+            metrics.observe("lablink_email_send_seconds", time.perf_counter() - started,
+                            help="SMTP delivery time per attempt")
+        self._record(row_id, status="sent", sent_at=int(time.time()), last_error=None, attachment=None)
+        metrics.inc("lablink_email_sent_total", help="Emails delivered by the outbox")
+        return True
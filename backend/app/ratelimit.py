@@ -0,0 +1,275 @@
+# 🚦 Rate limiting: token bucket / sliding window counters, in memory or shared through Redis
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from fastapi import Depends, HTTPException
+
+from .cache import cache
+from .metrics import metrics
+
+# "auto" shares limits through Redis when REDIS_URL is set; "memory" keeps them per worker
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "auto")
+# Upper bound on keys tracked in memory per worker (idle keys are dropped well before this)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class Decision:
+    """Outcome of one hit: whether it is allowed, what is left, and when to retry (seconds)."""
+
+    __slots__ = ("allowed", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, remaining: float, retry_after: float):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """`limit` tokens refilled continuously over `period` seconds; allows bursts of `limit`.
+
+    State: [tokens, updated_at].
+    """
+
+    name = "token_bucket"
+    LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, retry = 0, 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry)}
+"""
+
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.period = period
+        self.rate = limit / period
+
+    @property
+    def idle_seconds(self) -> float:
+        # an untouched bucket is full again after one period, same as a new one
+        return self.period
+
+    def lua_args(self, cost: int) -> list:
+        return [self.limit, self.rate, cost]
+
+    def apply(self, state: Optional[list], now: float, cost: int) -> tuple[list, Decision]:
+        tokens, updated = state if state is not None else (self.limit, now)
+        tokens = min(self.limit, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= cost:
+            return [tokens - cost, now], Decision(True, tokens - cost, 0.0)
+        return [tokens, now], Decision(False, tokens, (cost - tokens) / self.rate)
+
+
+class SlidingWindow:
+    """Sliding window counter: at most `limit` hits in any `period`-second window.
+
+    Keeps only this window's and the previous window's counts and weights the previous
+    one by how much of it still overlaps the sliding window. State: [window, current, previous].
+    """
+
+    name = "sliding_window"
+    LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local idx = math.floor(now / window)
+local elapsed = now - idx * window
+local state = redis.call('HMGET', KEYS[1], 'win', 'cur', 'prev')
+local win = tonumber(state[1])
+local cur = tonumber(state[2]) or 0
+local prev = tonumber(state[3]) or 0
+if win == idx - 1 then
+  prev, cur = cur, 0
+elseif win ~= idx then
+  prev, cur = 0, 0
+end
+local used = prev * (window - elapsed) / window + cur
+local allowed, retry = 0, 0
+if used + cost <= limit then
+  cur = cur + cost
+  used = used + cost
+  allowed = 1
+elseif cur + cost <= limit then
+  retry = window * (1 - (limit - cur - cost) / prev) - elapsed
+else
+  retry = window - elapsed + window * (1 - (limit - cost) / math.max(cur, 1))
+end
+redis.call('HSET', KEYS[1], 'win', idx, 'cur', cur, 'prev', prev)
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 2000))
+return {allowed, tostring(limit - used), tostring(retry)}
+"""
+
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.period = period
+
+    @property
+    def idle_seconds(self) -> float:
+        return 2 * self.period
+
+    def lua_args(self, cost: int) -> list:
+        return [self.limit, self.period, cost]
+
+    def apply(self, state: Optional[list], now: float, cost: int) -> tuple[list, Decision]:
+        idx = math.floor(now / self.period)
+        elapsed = now - idx * self.period
+        win, cur, prev = state if state is not None else (idx, 0, 0)
+        if win == idx - 1:
+            prev, cur = cur, 0
+        elif win != idx:
+            prev, cur = 0, 0
+        used = prev * (self.period - elapsed) / self.period + cur
+        if used + cost <= self.limit:
+            return [idx, cur + cost, prev], Decision(True, self.limit - used - cost, 0.0)
+        if cur + cost <= self.limit:
+            # wait until enough of the previous window has slid out
+            retry = self.period * (1 - (self.limit - cur - cost) / prev) - elapsed
+        else:
+            # this window alone is over the limit: wait for it to become the previous one
+            retry = self.period - elapsed + self.period * (1 - (self.limit - cost) / max(cur, 1))
+        return [idx, cur, prev], Decision(False, self.limit - used, retry)
+
+
+ALGORITHMS = {TokenBucket.name: TokenBucket, SlidingWindow.name: SlidingWindow}
+
+
+class MemoryRateLimitBackend:
+    """Per-worker limiter state: a few numbers per key, LRU-ordered by last hit.
+
+    Keys idle for longer than their algorithm's `idle_seconds` would start from a fresh
+    state anyway, so they are dropped on later hits; `max_keys` caps the worst case.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> (last hit, idle_seconds, state)
+        self._data: "OrderedDict[str, tuple[float, float, list]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def hit(self, key: str, algorithm, cost: int = 1, now: Optional[float] = None) -> Decision:
+        now = time.time() if now is None else now
+        with self._lock:
+            item = self._data.pop(key, None)
+            state, decision = algorithm.apply(item[2] if item else None, now, cost)
+            self._data[key] = (now, algorithm.idle_seconds, state)
+            self._evict(now)
+        return decision
+
+    def _evict(self, now: float) -> None:
+        while self._data:
+            oldest = next(iter(self._data))
+            last_hit, idle, _ = self._data[oldest]
+            if now - last_hit < idle and len(self._data) <= self.max_keys:
+                return
+            del self._data[oldest]
+
+
+class RedisRateLimitBackend:
+    """Limits shared by all workers: each hit is one atomic Lua script call (EVALSHA).
+
+    The scripts read Redis' clock, so worker clock skew does not matter. While Redis is
+    down (see the cache's circuit breaker) hits fall back to per-worker memory limits.
+    """
+
+    def __init__(self, fallback: Optional[MemoryRateLimitBackend] = None, prefix: str = "ratelimit"):
+        self.fallback = fallback or MemoryRateLimitBackend()
+        self.prefix = prefix
+        self._scripts: dict[str, object] = {}
+
+    def _script(self, algorithm):
+        script = self._scripts.get(algorithm.name)
+        if script is None:
+            script = self._scripts[algorithm.name] = cache.redis_client.register_script(algorithm.LUA)
+        return script
+
+    def hit(self, key: str, algorithm, cost: int = 1) -> Decision:
+        if not cache.redis_available:
+            return self.fallback.hit(key, algorithm, cost)
+        try:
+            allowed, remaining, retry = self._script(algorithm)(
+                keys=[f"{self.prefix}:{key}"], args=algorithm.lua_args(cost)
+            )
+        except Exception as e:
+            cache.breaker.record_failure(e)
+            return self.fallback.hit(key, algorithm, cost)
+        cache.breaker.record_success()
+        return Decision(bool(allowed), float(remaining), float(retry))
+
+
+def default_backend():
+    if RATE_LIMIT_BACKEND == "memory" or (RATE_LIMIT_BACKEND == "auto" and not cache.redis_configured):
+        return MemoryRateLimitBackend()
+    return RedisRateLimitBackend()
+
+
+class RateLimiter:
+    """Named limit of `limit` hits per `period` seconds for each key.
+
+    Declare it on a route with `Depends(limiter.dependency(key_func))`; `key_func` is
+    itself a dependency returning the key (e.g. the signed-in user's email). Rejected
+    hits raise 429 with a Retry-After header and count in lablink_rate_limited_total.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        period: float,
+        *,
+        algorithm: str = SlidingWindow.name,
+        backend=None,
+        message: str = "Rate limit exceeded. Try later.",
+    ):
+        self.name = name
+        self.algorithm = ALGORITHMS[algorithm](limit, period)
+        self.backend = backend or default_backend()
+        self.message = message
+
+    def hit(self, key: str, cost: int = 1) -> Decision:
+        return self.backend.hit(f"{self.name}:{key}", self.algorithm, cost)
+
+    def check(self, key: str) -> Decision:
+        """Count one hit for `key`, raising 429 when it is over the limit."""
+        decision = self.hit(key)
+        if not decision.allowed:
+            metrics.inc("lablink_rate_limited_total", help="Requests rejected by a rate limit", limiter=self.name)
+            raise HTTPException(
+                429,
+                self.message,
+                headers={
+                    "Retry-After": str(max(1, math.ceil(decision.retry_after))),
+                    "X-RateLimit-Limit": str(self.algorithm.limit),
+                },
+            )
+        return decision
+
+    def dependency(self, key_func: Callable[..., str]) -> Callable[..., None]:
+        # sync on purpose: FastAPI runs it in the threadpool, so a Redis call never blocks the loop
+        def enforce(key: str = Depends(key_func)) -> None:
+            self.check(key)
+
+        enforce.__name__ = f"rate_limit_{self.name}"
+        return enforce
@@ -0,0 +1,111 @@
+# 📣 Propagates match-index reloads to every worker (Redis pub/sub, or catalog-version polling)
+import json
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+from .cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadBus:
+    """Runs `on_reload(event)` in each worker when the catalog/index changes.
+
+    With Redis, `publish()` fans an event out to every subscribed worker, in this
+    process and others. Without Redis (or while the subscription is down), each worker
+    instead calls `on_reload({"source": "poll"})` every `poll_seconds`, and
+    resubscribes once the cache's Redis breaker reports it healthy again. The handler
+    is expected to compare catalog versions and do nothing when it is current, so
+    polling only costs one indexed MAX(id) query per tick.
+    """
+
+    def __init__(
+        self,
+        on_reload: Callable[[dict], None],
+        *,
+        channel: str = "lablink:index-reload",
+        poll_seconds: float = 5.0,
+        use_redis: bool = True,
+    ):
+        self.on_reload = on_reload
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.use_redis = use_redis
+        self.mode: Optional[str] = None  # "redis" | "poll" once started
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def _redis(self):
+        if self.use_redis and getattr(cache, "redis_available", False):
+            return cache.redis_client
+        return None
+
+    def start(self) -> None:
+        if self._thread is not None or self.poll_seconds <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="index-reload-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def publish(self, event: dict) -> bool:
+        """Broadcast `event` to all workers; False when only polling will pick it up."""
+        client = self._redis
+        if client is None:
+            return False
+        try:
+            client.publish(self.channel, json.dumps({**event, "pid": os.getpid()}))
+            return True
+        except Exception as e:
+            cache.breaker.record_failure(e)
+            logger.warning(f"⚠️ Index reload publish failed: {e}")
+            return False
+
+    def _handle(self, event: dict) -> None:
+        try:
+            self.on_reload(event)
+        except Exception as e:
+            logger.error(f"❌ Index reload failed: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            client = self._redis
+            if client is not None:
+                self.mode = "redis"
+                try:
+                    self._listen(client)
+                except Exception as e:
+                    # counts toward the breaker, so a dead Redis is not retried every tick
+                    cache.breaker.record_failure(e)
+                    logger.warning(f"⚠️ Index reload subscription lost, polling instead: {e}")
+                if self._stop.is_set():
+                    return
+            # Poll one interval, then resubscribe if Redis is (back) up; the poll
+            # also catches anything published while we were not subscribed
+            self.mode = "poll"
+            if self._stop.wait(self.poll_seconds):
+                return
+            self._handle({"source": "poll"})
+
+    def _listen(self, client) -> None:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        try:
+            while not self._stop.is_set():
+                msg = pubsub.get_message(timeout=1.0)
+                if not msg or msg.get("type") != "message":
+                    continue
+                try:
+                    event = json.loads(msg["data"])
+                except (TypeError, ValueError):
+                    event = {}
+                self._handle({**event, "source": "redis"})
+        finally:
+            pubsub.close()
@@ -12,6 +12,14 @@ class ProfessorOut(BaseModel):
     personal_site: Optional[str] = ""
     photo_url: Optional[str] = ""
     skills: List[str] = []
+    updated_at: Optional[int] = None
+
+class ProfessorChangesOut(BaseModel):
+    version: int
+    # When true, `upserted`/`deleted` are empty and the client must refetch /api/professors
+    full_refetch: bool = False
+    upserted: List[ProfessorOut] = []
+    deleted: List[int] = []
 
 class StudentProfileIn(BaseModel):
     name: Optional[str] = "Anonymous"
@@ -62,6 +70,12 @@ class MatchResponse(BaseModel):
     weights: Dict[str, float]
     matches: List[MatchItem]
 
+class MatchBatchRequest(BaseModel):
+    profiles: List[StudentProfileIn] = Field(..., min_length=1, max_length=20)
+
+class MatchBatchResponse(BaseModel):
+    results: List[MatchResponse]
+
 class EmailRequest(BaseModel):
     student_name: str
     student_skills: Optional[str] = ""
@@ -85,3 +99,13 @@ class EmailRequest(BaseModel):
 class EmailDraft(BaseModel):
     subject: str
     body: str
+
+class EmailStatusOut(BaseModel):
+    message_id: str
+    status: str  # queued | sending | sent | failed
+    attempts: int = 0
+    last_error: Optional[str] = None
+    created_at: int
+    sent_at: Optional[int] = None
+    # when the next retry is due, while queued
+    next_attempt_at: Optional[int] = None
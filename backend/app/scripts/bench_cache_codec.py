@@ -0,0 +1,102 @@
+"""Compare cache value formats on realistic /api/match results.
+
+Builds synthetic match responses shaped like MatchResponse (professor records with
+interests, skills and explanation hits). For every installed serializer, with and
+without each installed compressor, it reports the mean encode and decode time and
+the bytes stored per entry. It also times key hashing: the old MD5 over json.dumps
+against cache_codec.hash_key.
+
+Usage:
+  cd backend
+  python -m app.scripts.bench_cache_codec --matches 50 --entries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import time
+
+from ..cache_codec import COMPRESSORS, SERIALIZERS, Codec, hash_key
+
+WORDS = [
+    "machine", "learning", "vision", "robotics", "systems", "security", "networks",
+    "databases", "compilers", "graphics", "nlp", "theory", "quantum", "hci", "biology",
+]
+SKILLS = ["python", "pytorch", "c++", "rust", "sql", "matlab", "cuda", "java"]
+
+
+def match_response(rng: random.Random, matches: int) -> dict:
+    items = []
+    for i in range(matches):
+        interests = ", ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+        score = rng.random()
+        items.append({
+            "score": round(score, 6),
+            "score_percent": round(score * 100, 1),
+            "why": {
+                "interests_hits": rng.sample(WORDS, 4),
+                "skills_hits": rng.sample(SKILLS, 2),
+                "pubs_hits": [],
+            },
+            "professor": {
+                "id": i + 1,
+                "name": f"Professor {i + 1}",
+                "department": "Computer Science",
+                "email": f"prof{i + 1}@ucdavis.edu",
+                "research_interests": interests,
+                "profile_link": f"https://cs.ucdavis.edu/directory/prof-{i + 1}",
+                "personal_site": "",
+                "photo_url": f"https://cs.ucdavis.edu/photos/prof-{i + 1}.jpg",
+                "skills": rng.sample(SKILLS, 3),
+                "updated_at": 1700000000 + i,
+            },
+        })
+    return {
+        "student_query": "machine learning for robotics",
+        "department": "",
+        "weights": {"interests": 0.6, "skills": 0.4, "pubs": 0.0},
+        "matches": items,
+    }
+
+
+def time_per_call(fn, values) -> float:
+    started = time.perf_counter()
+    for v in values:
+        fn(v)
+    return (time.perf_counter() - started) / len(values) * 1e6
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--matches", type=int, default=50, help="matches per cached response")
+    p.add_argument("--entries", type=int, default=200)
+    p.add_argument("--min-bytes", type=int, default=1024, help="compression threshold")
+    args = p.parse_args()
+
+    rng = random.Random(7)
+    values = [match_response(rng, args.matches) for _ in range(args.entries)]
+
+    print(f"entries={args.entries} matches/entry={args.matches}")
+    print(f"{'serializer':<11}{'compression':<13}{'encode µs':>11}{'decode µs':>11}{'bytes/entry':>13}")
+    for ser in SERIALIZERS.values():
+        for comp in [None, *COMPRESSORS.values()]:
+            codec = Codec(ser, comp, compress_min_bytes=args.min_bytes)
+            encoded = [codec.encode(v) for v in values]
+            assert codec.decode(encoded[0]) == values[0]
+            enc = time_per_call(codec.encode, values)
+            dec = time_per_call(codec.decode, encoded)
+            size = sum(len(e) for e in encoded) / len(encoded)
+            print(f"{ser.name:<11}{comp.name if comp else 'none':<13}{enc:>11.1f}{dec:>11.1f}{size:>13.0f}")
+
+    queries = [{"interests": " ".join(rng.sample(WORDS, 5)), "skills": "python", "department": "", "version": i}
+               for i in range(args.entries * 10)]
+    md5 = time_per_call(lambda d: hashlib.md5(json.dumps(d, sort_keys=True).encode()).hexdigest(), queries)
+    fast = time_per_call(hash_key, queries)
+    print(f"\nkey hash µs: md5+json {md5:.2f}  hash_key {fast:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare email sends per second: a new SMTP session per message vs SMTPPool.
+
+Starts a local aiosmtpd server that accepts and discards mail. Real relays spend
+most of a new session on TCP, STARTTLS and AUTH round trips, so the server can
+delay its EHLO reply by --handshake-ms to stand in for that. The same messages
+are then sent from --threads threads, three ways:
+- one session per message (the old send path)
+- SMTPPool.send_message
+- SMTPPool.send_many in batches of --batch
+
+Pass --host/--port to measure against a real server instead; --starttls and
+SMTP_USERNAME/SMTP_PASSWORD apply there.
+
+Usage:
+  cd backend
+  pip install aiosmtpd
+  python -m app.scripts.bench_smtp --messages 500 --threads 4 --handshake-ms 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..email_utils import SMTPPool, build_message
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class SlowHandshake:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def messages(n: int) -> list:
+    body = "Dear Dr. Smith,\n\n" + "I am interested in your research. " * 40
+    return [
+        build_message(to_email=f"prof{i}@ucdavis.edu", subject=f"Research {i}", body=body,
+                      sender="lablink@ucdavis.edu")
+        for i in range(n)
+    ]
+
+
+def per_message(host: str, port: int, starttls: bool, msg) -> None:
+    with smtplib.SMTP(host, port, timeout=10) as smtp:
+        if starttls:
+            smtp.starttls()
+        if os.getenv("SMTP_USERNAME") and os.getenv("SMTP_PASSWORD"):
+            smtp.login(os.getenv("SMTP_USERNAME"), os.getenv("SMTP_PASSWORD"))
+        smtp.send_message(msg)
+
+
+def run(label: str, fn, items: list, threads: int, sent: int) -> None:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(fn, items))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24}{sent / elapsed:>12.1f}{elapsed * 1000 / sent:>14.2f}")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--messages", type=int, default=500)
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--batch", type=int, default=50, help="messages per send_many call")
+    p.add_argument("--handshake-ms", type=float, default=50.0, help="simulated connect+TLS+AUTH cost")
+    p.add_argument("--host", help="use this SMTP server instead of a local stand-in")
+    p.add_argument("--port", type=int, default=587)
+    p.add_argument("--starttls", action="store_true")
+    args = p.parse_args()
+
+    smtpd = None
+    host, port = args.host, args.port
+    if host is None:
+        from aiosmtpd.controller import Controller
+
+        host, port = "127.0.0.1", free_port()
+        smtpd = Controller(SlowHandshake(args.handshake_ms / 1000), hostname=host, port=port)
+        smtpd.start()
+    msgs = messages(args.messages)
+    pool = SMTPPool(host, port, username=os.getenv("SMTP_USERNAME"), password=os.getenv("SMTP_PASSWORD"),
+                    starttls=args.starttls, max_size=args.threads)
+    batches = [msgs[i:i + args.batch] for i in range(0, len(msgs), args.batch)]
+    try:
+        print(f"messages={args.messages} threads={args.threads} "
+              f"handshake={'real' if smtpd is None else f'{args.handshake_ms:.0f}ms'}")
+        print(f"{'mode':<24}{'msgs/s':>12}{'ms/msg':>14}")
+        run("session per message", lambda m: per_message(host, port, args.starttls, m), msgs, args.threads, len(msgs))
+        run("pool.send_message", pool.send_message, msgs, args.threads, len(msgs))
+        run(f"pool.send_many({args.batch})", pool.send_many, batches, args.threads, len(msgs))
+    finally:
+        pool.close()
+        if smtpd is not None:
+            smtpd.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Benchmark concurrent /api/auth/me and /api/match on SQLite, with and without tuning.
+
+Seeds a throwaway SQLite database, starts uvicorn once with SQLITE_TUNING=0
+(SQLite defaults: rollback journal, synchronous=FULL, no busy timeout) and once
+with SQLITE_TUNING=1 (WAL, synchronous=NORMAL, mmap, cache, busy_timeout), and
+hammers both endpoints with cookie sessions. Session caching is disabled and every
+request slides the session expiry, so each request does a DB write.
+
+Usage:
+  cd backend
+  python -m app.scripts.bench_sqlite --concurrency 32 --duration 10 --workers 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import Base
+
+WORDS = [
+    "machine", "learning", "vision", "robotics", "systems", "security", "networks",
+    "databases", "compilers", "graphics", "nlp", "theory", "quantum", "hci", "biology",
+]
+SKILLS = ["python", "pytorch", "c++", "rust", "sql", "matlab", "cuda", "java"]
+
+
+def seed(db_path: str, *, professors: int, users: int) -> list[str]:
+    eng = create_engine(f"sqlite:///{db_path}", future=True)
+    Base.metadata.create_all(bind=eng)
+    rnd = random.Random(7)
+    tokens = []
+    with Session(eng) as db:
+        skills = [models.Skill(name=s) for s in SKILLS]
+        db.add_all(skills)
+        db.flush()
+        for i in range(1, professors + 1):
+            db.add(models.Professor(
+                id=i,
+                name=f"Professor {i}",
+                department="Computer Science",
+                research_interests=" ".join(rnd.sample(WORDS, 6)),
+            ))
+            for sk in rnd.sample(skills, 3):
+                db.add(models.ProfessorSkill(professor_id=i, skill_id=sk.id))
+        expires = int(time.time()) + 3600
+        for i in range(users):
+            u = models.User(sub=f"bench-{i}", email=f"bench{i}@ucdavis.edu")
+            db.add(u)
+            db.flush()
+            token = f"bench-token-{i}"
+            db.add(models.SessionToken(user_id=u.id, token=token, expires_at=expires))
+            tokens.append(token)
+        db.commit()
+    eng.dispose()
+    return tokens
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def hammer(base: str, tokens: list[str], *, concurrency: int, duration: float) -> dict:
+    results: dict[str, list] = {"me": [], "match": []}
+    errors: dict[str, int] = {"me": 0, "match": 0}
+    deadline = time.perf_counter() + duration
+    body = {"interests": "machine learning, robotics", "skills": "python, cuda"}
+
+    async def worker(i: int):
+        cookies = {"lablink_session": tokens[i % len(tokens)]}
+        async with httpx.AsyncClient(base_url=base, cookies=cookies, timeout=30) as client:
+            n = 0
+            while time.perf_counter() < deadline:
+                kind = "me" if n % 2 == 0 else "match"
+                n += 1
+                t0 = time.perf_counter()
+                try:
+                    if kind == "me":
+                        r = await client.get("/api/auth/me")
+                    else:
+                        r = await client.post("/api/match", json=body)
+                    ok = r.status_code == 200
+                except Exception:
+                    ok = False
+                if ok:
+                    results[kind].append(time.perf_counter() - t0)
+                else:
+                    errors[kind] += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    out = {}
+    for kind, lat in results.items():
+        lat.sort()
+        out[kind] = {
+            "rps": len(lat) / duration,
+            "p50_ms": 1000 * statistics.median(lat) if lat else 0.0,
+            "p95_ms": 1000 * lat[int(0.95 * (len(lat) - 1))] if lat else 0.0,
+            "errors": errors[kind],
+        }
+    return out
+
+
+def run_mode(tuning: bool, args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="lablink-bench-")
+    db_path = os.path.join(tmp, "bench.db")
+    tokens = seed(db_path, professors=args.professors, users=args.concurrency)
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "SQLITE_TUNING": "1" if tuning else "0",
+        "SESSION_TOUCH_FRACTION": "0",
+        "SESSION_CACHE_SECONDS": "0",
+        "SESSION_SWEEP_INTERVAL_SECONDS": "0",
+        "COOKIE_SECURE": "0",
+        "HSTS_ENABLED": "0",
+    }
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=backend_dir,
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                if httpx.get(base + "/health", timeout=1).status_code == 200:
+                    break
+            except Exception:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("server did not start")
+        return asyncio.run(hammer(base, tokens, concurrency=args.concurrency, duration=args.duration))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--professors", type=int, default=500)
+    args = p.parse_args()
+
+    print(f"concurrency={args.concurrency} workers={args.workers} duration={args.duration}s")
+    print(f"{'mode':<10}{'endpoint':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for tuning in (False, True):
+        res = run_mode(tuning, args)
+        label = "tuned" if tuning else "default"
+        for kind, r in res.items():
+            print(f"{label:<10}{kind:<10}{r['rps']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Report per-worker memory with private vs shared (mmap'd snapshot) match indexes.
+
+Seeds a throwaway SQLite catalog and starts uvicorn with 1, 4 and 8 workers, once
+with INDEX_SNAPSHOTS=0 (every worker builds its own index) and once with
+INDEX_SNAPSHOTS=1 (workers map one snapshot from INDEX_DIR). Once startup has
+settled it reads /proc/<pid>/smaps_rollup for each worker. RSS counts shared
+pages in full for every process. PSS splits them between the processes that
+map them, so the PSS total is the real footprint. Linux only.
+
+Usage:
+  cd backend
+  python -m app.scripts.bench_worker_memory --professors 50000 --workers 1 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .bench_sqlite import free_port, seed
+
+
+def read_rollup(pid: int) -> dict[str, int]:
+    """Rss/Pss/Shared in KiB from /proc/<pid>/smaps_rollup."""
+    out: dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in {"Rss", "Pss", "Shared_Clean", "Shared_Dirty"}:
+                out[parts[0].rstrip(":")] = int(parts[1])
+    return out
+
+
+def children(pid: int) -> list[int]:
+    out = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == pid:
+            out.append(int(entry))
+    return out
+
+
+def worker_pids(proc: subprocess.Popen, workers: int) -> list[int]:
+    if workers == 1:
+        return [proc.pid]
+    pids = []
+    for pid in children(proc.pid):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmd = f.read()
+        except OSError:
+            continue
+        # skip multiprocessing's resource tracker
+        if b"resource_tracker" not in cmd:
+            pids.append(pid)
+    return pids
+
+
+def settle(proc: subprocess.Popen, workers: int, timeout: float = 300) -> list[int]:
+    """Wait until all workers exist and their combined RSS stops growing."""
+    deadline = time.time() + timeout
+    last = -1
+    stable = 0
+    while time.time() < deadline:
+        pids = worker_pids(proc, workers)
+        if len(pids) == workers:
+            try:
+                total = sum(read_rollup(p).get("Rss", 0) for p in pids)
+            except OSError:
+                total = -1
+            stable = stable + 1 if total == last else 0
+            last = total
+            if stable >= 4:
+                return pids
+        time.sleep(0.5)
+    raise RuntimeError("workers did not settle")
+
+
+def run_mode(db_path: str, index_dir: str, workers: int, shared: bool) -> list[dict[str, int]]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "INDEX_SNAPSHOTS": "1" if shared else "0",
+        "INDEX_DIR": index_dir,
+        "SESSION_SWEEP_INTERVAL_SECONDS": "0",
+        "COOKIE_SECURE": "0",
+        "HSTS_ENABLED": "0",
+    }
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=backend_dir,
+        env=env,
+    )
+    try:
+        for _ in range(600):
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    break
+            except Exception:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("server did not start")
+        return [read_rollup(pid) for pid in settle(proc, workers)]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--professors", type=int, default=50000)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = p.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="lablink-mem-")
+    db_path = os.path.join(tmp, "bench.db")
+    seed(db_path, professors=args.professors, users=1)
+    index_dir = os.path.join(tmp, "index")
+
+    print(f"professors={args.professors}")
+    print(f"{'mode':<9}{'workers':>8}{'RSS/worker MiB':>16}{'PSS/worker MiB':>16}{'PSS total MiB':>15}")
+    for workers in args.workers:
+        for shared in (False, True):
+            stats = run_mode(db_path, index_dir, workers, shared)
+            rss = sum(s.get("Rss", 0) for s in stats) / len(stats) / 1024
+            pss = sum(s.get("Pss", 0) for s in stats) / 1024
+            label = "shared" if shared else "private"
+            print(f"{label:<9}{workers:>8}{rss:>16.1f}{pss / len(stats):>16.1f}{pss:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
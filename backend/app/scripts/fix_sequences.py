@@ -6,21 +6,30 @@ Usage:
 
 from __future__ import annotations
 
-from sqlalchemy import text, create_engine
-from ..database import DATABASE_URL  # type: ignore
-
-
-TABLES = [
-    ("skills", "id"),
-    ("professors", "id"),
-    ("professor_skills", "id"),
-]
-
+from typing import Iterable
 
-def main():
-    engine = create_engine(DATABASE_URL, future=True)
-    with engine.begin() as conn:
-        for table, col in TABLES:
+from sqlalchemy import text, create_engine
+from .. import models  # noqa: F401  (registers the tables on Base.metadata)
+from ..database import DATABASE_URL, Base  # type: ignore
+
+
+def serial_tables() -> list[tuple[str, str]]:
+    """(table, column) for every model table keyed by a single integer id."""
+    out = []
+    for table in Base.metadata.sorted_tables:
+        pk = list(table.primary_key.columns)
+        if len(pk) == 1 and pk[0].name == "id":
+            out.append((table.name, "id"))
+    return out
+
+
+def align_sequences(bind, tables: Iterable[tuple[str, str]] | None = None) -> dict[str, int]:
+    """Set each table's id sequence to max(id); returns {table: max_id}. No-op off Postgres."""
+    if bind.dialect.name != "postgresql":
+        return {}
+    aligned: dict[str, int] = {}
+    with bind.begin() as conn:
+        for table, col in (tables if tables is not None else serial_tables()):
             # Get sequence name for this table/column
             seq_sql = f"SELECT pg_get_serial_sequence('{table}', '{col}')"
             seq_row = conn.execute(text(seq_sql)).scalar()
@@ -30,13 +39,21 @@ def main():
             # Get current max id
             max_sql = f"SELECT COALESCE(MAX({col}), 0) FROM {table}"
             max_id = int(conn.execute(text(max_sql)).scalar() or 0)
-            # Align the sequence to max id
-            set_sql = "SELECT setval(:seqname, :max_id)"
-            conn.execute(text(set_sql), {"seqname": seq_name, "max_id": max_id})
+            # Align the sequence to max id; an empty table restarts at 1
+            set_sql = "SELECT setval(:seqname, :value, :called)"
+            conn.execute(
+                text(set_sql),
+                {"seqname": seq_name, "value": max(max_id, 1), "called": max_id > 0},
+            )
+            aligned[table] = max_id
+    return aligned
+
+
+def main():
+    engine = create_engine(DATABASE_URL, future=True)
+    align_sequences(engine)
     print("✅ Sequences aligned with max IDs")
 
 
 if __name__ == "__main__":
     main()
-
-
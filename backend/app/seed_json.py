@@ -1,54 +1,42 @@
-import json, os
-from sqlalchemy.orm import Session
-from .database import SessionLocal, engine, Base
-from . import models
+import argparse, os
+from .database import SessionLocal, engine, Base, ensure_schema
+from .bulk_ingest import bulk_load, iter_json_array, sync_catalog
 
-def seed_from_json(json_path: str):
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    with SessionLocal.begin() as db:  # auto-commit/rollback
-        # wipe existing
-        db.query(models.ProfessorSkill).delete()
-        # Publication model removed
-        db.query(models.Skill).delete()
-        db.query(models.Professor).delete()
-
-        skill_cache: dict[str, models.Skill] = {}
-
-        for p in data:
-            prof = models.Professor(
-                id=p.get("id"),
-                name=p.get("name",""),
-                department=p.get("department"),
-                email=p.get("email"),
-                research_interests=p.get("research_interests"),
-                profile_link=p.get("profile_link"),
-                personal_site=p.get("personal_site"),
-                photo_url=(p.get("photo_url") or ""),
-            )
-            db.add(prof)
-            db.flush()  # ensure prof.id
+# Professors per multi-row INSERT/COPY batch
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "5000"))
 
-            # publications removed
+def seed_from_json(json_path: str, *, full: bool = False) -> dict:
+    """Reseed the catalog from a JSON array file; returns load stats.
 
-            # skills (dedupe via cache)
-            for s in p.get("skills") or []:
-                key = (s or "").strip().lower()
-                if not key:
-                    continue
-                if key not in skill_cache:
-                    sk = models.Skill(name=key)
-                    db.add(sk)
-                    db.flush()
-                    skill_cache[key] = sk
-                db.add(models.ProfessorSkill(professor_id=prof.id, skill_id=skill_cache[key].id))
+    By default only records whose content hash changed are written and rows missing
+    from the file are deleted (stats carry the `upserted`/`deleted` ids).
+    `full=True` wipes and reloads everything.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        with SessionLocal.begin() as db:  # auto-commit/rollback
+            if full:
+                return bulk_load(db, iter_json_array(f), wipe=True, batch_size=SEED_BATCH_SIZE)
+            return sync_catalog(db, iter_json_array(f), batch_size=SEED_BATCH_SIZE)
 
 if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv()
-    Base.metadata.create_all(bind=engine)
     here = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(here, "data", "professors.json")
-    seed_from_json(json_path)
-    print("✅ Seeded database from JSON.")
+    parser = argparse.ArgumentParser(description="Seed the professor catalog from JSON")
+    parser.add_argument("json_path", nargs="?", default=os.path.join(here, "data", "professors.json"))
+    parser.add_argument("--full", action="store_true", help="wipe and reload instead of applying a diff")
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    ensure_schema(engine)
+    stats = seed_from_json(args.json_path, full=args.full)
+    if args.full:
+        print(
+            f"✅ Seeded database from JSON: {stats['professors']} professors, "
+            f"{stats['links']} skill links in {stats['seconds']}s "
+            f"({stats['professors_per_second']} professors/s)"
+        )
+    else:
+        print(
+            f"✅ Synced database from JSON: {len(stats['upserted'])} upserted, "
+            f"{len(stats['deleted'])} deleted, {stats['unchanged']} unchanged in {stats['seconds']}s"
+        )
@@ -0,0 +1,217 @@
+# 🔑 Session store: resolve session token -> (user, expiry) without a DB round trip per request
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import crud
+from . import crud_async as acrud
+from . import models
+from .cache import cache, record_lookup
+
+
+def _token_key(token: str) -> str:
+    # Never use raw session tokens as cache keys (they would show up in Redis dumps)
+    return "sessions:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+class SessionStore:
+    """Cache of session lookups: in-process per worker, or shared through Redis.
+
+    Entries are plain dicts: user_id, email, name, picture, expires_at.
+    Without `use_redis`, each worker reuses its cached entry for at most
+    `cache_seconds`, so a logout handled by another worker is honored within that
+    window. With `use_redis`, entries are kept only in Redis (no per-worker copy,
+    not even the cache's L1), so a logout on any worker applies to all of them at
+    once; while Redis is unreachable every lookup goes to the DB.
+
+    Sliding expiration only writes to the DB once `touch_fraction` of the TTL has
+    elapsed since the last extension, i.e. when the remaining lifetime drops below
+    (1 - touch_fraction) * ttl.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: int,
+        touch_fraction: float = 0.5,
+        cache_seconds: int = 60,
+        max_entries: int = 10000,
+        use_redis: bool = False,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.touch_fraction = max(0.0, min(1.0, touch_fraction))
+        self.cache_seconds = cache_seconds
+        self.max_entries = max_entries
+        self.use_redis = use_redis
+        self._local: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._claims: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---- local tier ----
+    def _get_local(self, key: str, now: float) -> Optional[dict]:
+        if self.use_redis:
+            return None  # shared entries are read from Redis only (cache.get counts them)
+        entry = self._local_entry(key, now)
+        record_lookup("sessions", "miss" if entry is None else "l1_hit")
+        return entry
+
+    def _local_entry(self, key: str, now: float) -> Optional[dict]:
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            cached_until, entry = item
+            if cached_until <= now:
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _put(self, key: str, entry: dict, now: float) -> None:
+        if self.use_redis:
+            ttl = int(entry["expires_at"] - now)
+            if ttl > 0:
+                cache.set(key, entry, ttl, l1=False)
+            return
+        cached_until = min(now + self.cache_seconds, entry["expires_at"])
+        with self._lock:
+            self._local[key] = (cached_until, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    @staticmethod
+    def _entry(sess: Optional[models.SessionToken], user: Optional[models.User]) -> Optional[dict]:
+        if not (sess and user):
+            return None
+        return {
+            "user_id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "picture": user.picture,
+            "expires_at": int(sess.expires_at),
+        }
+
+    def _load(self, db: Session, token: str) -> Optional[dict]:
+        sess = crud.get_session(db, token)
+        if not sess:
+            return None
+        user = db.query(models.User).filter(models.User.id == sess.user_id).first()
+        return self._entry(sess, user)
+
+    async def _aload(self, db: AsyncSession, token: str) -> Optional[dict]:
+        sess = await acrud.get_session(db, token)
+        if not sess:
+            return None
+        return self._entry(sess, await acrud.get_user(db, sess.user_id))
+
+    async def _off_loop(self, fn, *args):
+        # Redis calls block; keep them off the event loop. Local-only work runs inline.
+        if self.use_redis:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _needs_extend(self, entry: dict, now: float) -> bool:
+        last_extended = entry["expires_at"] - self.ttl_seconds
+        return now - last_extended >= self.touch_fraction * self.ttl_seconds
+
+    # ---- public API ----
+    def resolve(self, db: Session, token: str) -> Optional[dict]:
+        """Return the cached session entry for `token`, or None if invalid/expired."""
+        now = time.time()
+        key = _token_key(token)
+        entry = self._get_local(key, now)
+        if entry is None and self.use_redis:
+            entry = cache.get(key, l1=False)
+        if entry is None:
+            entry = self._load(db, token)
+            if entry is None:
+                return None
+            self._put(key, entry, now)
+        if entry["expires_at"] <= now:
+            self.invalidate(token)
+            return None
+        if self._needs_extend(entry, now):
+            entry = self.extend(db, token, entry=entry)
+        return entry
+
+    async def aresolve(self, db: AsyncSession, token: str) -> Optional[dict]:
+        """Async variant of `resolve` for handlers on the event loop."""
+        now = time.time()
+        key = _token_key(token)
+        entry = self._get_local(key, now)
+        if entry is None and self.use_redis:
+            entry = await asyncio.to_thread(cache.get, key, l1=False)
+        if entry is None:
+            entry = await self._aload(db, token)
+            if entry is None:
+                return None
+            await self._off_loop(self._put, key, entry, now)
+        if entry["expires_at"] <= now:
+            await self._off_loop(self.invalidate, token)
+            return None
+        if self._needs_extend(entry, now):
+            entry = await self.aextend(db, token, entry=entry)
+        return entry
+
+    def extend(self, db: Session, token: str, *, entry: Optional[dict] = None) -> Optional[dict]:
+        """Write a new expiry to the DB and refresh the cached entry."""
+        now = time.time()
+        if entry is None:
+            entry = self._load(db, token)
+            if entry is None:
+                return None
+        try:
+            expires_at = crud.extend_session(db, token, ttl_seconds=self.ttl_seconds)
+        except Exception:
+            # Keep serving the current expiry; the next request retries the write
+            return entry
+        if expires_at is None:
+            self.invalidate(token)
+            return None
+        entry = {**entry, "expires_at": expires_at}
+        self._put(_token_key(token), entry, now)
+        return entry
+
+    async def aextend(self, db: AsyncSession, token: str, *, entry: Optional[dict] = None) -> Optional[dict]:
+        """Async variant of `extend`."""
+        now = time.time()
+        if entry is None:
+            entry = await self._aload(db, token)
+            if entry is None:
+                return None
+        try:
+            expires_at = await acrud.extend_session(db, token, ttl_seconds=self.ttl_seconds)
+        except Exception:
+            return entry
+        if expires_at is None:
+            await self._off_loop(self.invalidate, token)
+            return None
+        entry = {**entry, "expires_at": expires_at}
+        await self._off_loop(self._put, _token_key(token), entry, now)
+        return entry
+
+    def invalidate(self, token: str) -> None:
+        key = _token_key(token)
+        with self._lock:
+            self._local.pop(key, None)
+        if self.use_redis:
+            cache.delete(key)
+
+    def claims_changed(self, sub: str, claims: tuple) -> bool:
+        """True when `claims` differ from the last ones persisted for `sub` in this process."""
+        with self._lock:
+            return self._claims.get(sub) != claims
+
+    def remember_claims(self, sub: str, claims: tuple) -> None:
+        with self._lock:
+            self._claims[sub] = claims
+            self._claims.move_to_end(sub)
+            while len(self._claims) > self.max_entries:
+                self._claims.popitem(last=False)
@@ -0,0 +1,96 @@
+# 🧹 Background sweeper that deletes expired rows from the sessions table
+import logging
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_expired_sessions(
+    session_factory: Callable[[], Session] = SessionLocal,
+    *,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.05,
+    max_batches: int | None = None,
+    backlog_cap: int = 10000,
+) -> int:
+    """Delete expired sessions in batches of `batch_size`, one short transaction each.
+
+    Each batch selects ids through the expires_at index and deletes by primary key,
+    so locks are held only for that batch; `pause_seconds` yields to other writers
+    between batches. Expired rows left behind (e.g. by `max_batches`) are counted
+    through the same index, up to `backlog_cap`. Returns the number of rows deleted.
+    """
+    deleted = 0
+    batches = 0
+    now = int(time.time())
+    while max_batches is None or batches < max_batches:
+        with session_factory() as db:
+            ids = db.scalars(
+                select(models.SessionToken.id)
+                .where(models.SessionToken.expires_at <= now)
+                .limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            db.execute(delete(models.SessionToken).where(models.SessionToken.id.in_(ids)))
+            db.commit()
+        deleted += len(ids)
+        batches += 1
+        metrics.inc("lablink_sessions_swept_total", len(ids), help="Expired sessions deleted by the sweeper")
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause_seconds)
+    with session_factory() as db:
+        backlog = (
+            select(models.SessionToken.id)
+            .where(models.SessionToken.expires_at <= now)
+            .limit(backlog_cap)
+            .subquery()
+        )
+        remaining = db.scalar(select(func.count()).select_from(backlog)) or 0
+    metrics.set("lablink_sessions_expired_remaining", remaining,
+                help="Expired sessions left after the last sweep (capped at the sweeper's backlog_cap)")
+    metrics.set("lablink_sessions_last_sweep_timestamp", time.time(), help="Unix time of the last completed sweep")
+    return deleted
+
+
+class SessionSweeper:
+    """Daemon thread running sweep_expired_sessions every `interval_seconds`."""
+
+    def __init__(self, *, interval_seconds: int = 300, batch_size: int = 1000):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+        self._stop.clear()  # allow restarting after stop()
+        self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                n = sweep_expired_sessions(batch_size=self.batch_size)
+                if n:
+                    logger.info(f"🧹 Swept {n} expired sessions")
+            except Exception as e:
+                metrics.inc("lablink_sessions_sweep_errors_total", help="Failed sweeper runs")
+                logger.error(f"❌ Session sweep failed: {e}")
@@ -0,0 +1,41 @@
+# 🧪 Local stand-in for Google's signing-cert endpoint and ID token issuer
+import time
+import uuid
+
+import rsa
+from google.auth import crypt, jwt
+
+
+class FakeGoogleIssuer:
+    """Issues ID tokens signed by a throwaway RSA key and serves its cert map.
+
+    `fetch_certs` has the same shape as app.google_auth.fetch_certs, so it can be
+    passed straight to CertCache; `fetch_count` tells how often certs were fetched.
+    """
+
+    def __init__(self, *, max_age: int = 3600, audience: str | None = "test-client-id"):
+        pub, priv = rsa.newkeys(1024)
+        self.kid = uuid.uuid4().hex
+        self.audience = audience
+        self.max_age = max_age
+        self.fetch_count = 0
+        self._public_pem = pub.save_pkcs1().decode()
+        self._signer = crypt.RSASigner.from_string(priv.save_pkcs1(), key_id=self.kid)
+
+    def fetch_certs(self) -> tuple[dict, int]:
+        self.fetch_count += 1
+        return {self.kid: self._public_pem}, self.max_age
+
+    def issue(self, *, email: str, sub: str = "fake-sub", ttl: int = 3600, **extra) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": self.audience,
+            "sub": sub,
+            "email": email,
+            "email_verified": True,
+            "iat": now,
+            "exp": now + ttl,
+            **extra,
+        }
+        return jwt.encode(self._signer, payload).decode()
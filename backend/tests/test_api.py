@@ -3,14 +3,18 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
 import sys
 
 # Add the app directory to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+# The reload bus would poll the dev database in the background; tests drive it directly
+os.environ.setdefault("INDEX_RELOAD_POLL_SECONDS", "0")
+
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db, get_read_db, get_async_read_db
 from app import models
 
 # Create test database
@@ -25,7 +29,17 @@ def override_get_db():
     finally:
         db.close()
 
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def override_get_async_db():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_async_read_db] = override_get_async_db
 
 @pytest.fixture(scope="module")
 def client():
@@ -114,6 +128,207 @@ def test_rate_limiting(client):
     # At least some should succeed
     assert 200 in responses
 
+def test_rate_limiter_algorithms_and_retry_after(client):
+    """Both algorithms enforce the limit and compute Retry-After; idle keys are evicted"""
+    from app import main
+    from app.main import app
+    from app.ratelimit import MemoryRateLimitBackend, SlidingWindow, TokenBucket
+
+    mem = MemoryRateLimitBackend()
+    bucket = TokenBucket(3, 60)
+    assert [mem.hit("u", bucket, now=0).allowed for _ in range(4)] == [True, True, True, False]
+    assert mem.hit("u", bucket, now=0).retry_after == pytest.approx(20)
+    assert mem.hit("u", bucket, now=20).allowed
+
+    window = SlidingWindow(3, 60)
+    assert [mem.hit("w", window, now=t).allowed for t in (0, 1, 2, 10)] == [True, True, True, False]
+    # next window: the 3 earlier hits count in proportion to their overlap
+    assert mem.hit("w", window, now=10).retry_after == pytest.approx(70)
+    assert not mem.hit("w", window, now=79).allowed
+    assert mem.hit("w", window, now=80).allowed
+
+    mem.hit("idle", bucket, now=100)
+    mem.hit("busy", bucket, now=200)
+    assert len(mem) == 1  # every other key has been idle long enough to start over
+    capped = MemoryRateLimitBackend(max_keys=2)
+    for k in "abc":
+        capped.hit(k, bucket, now=0)
+    assert len(capped) == 2
+
+    app.dependency_overrides[main.require_ucdavis_user] = lambda: {"email": "limits@ucdavis.edu"}
+    try:
+        codes = [client.get("/api/scrape_photo", params={"url": "ftp://x"}) for _ in range(6)]
+        assert [r.status_code for r in codes] == [200] * 5 + [429]
+        assert int(codes[-1].headers["Retry-After"]) >= 1
+    finally:
+        app.dependency_overrides.pop(main.require_ucdavis_user, None)
+
+def test_email_outbox_delivers_and_retries(client, monkeypatch):
+    """/api/email/send queues (202); the outbox delivers over SMTP and backs off on failure"""
+    pytest.importorskip("aiosmtpd")
+    import base64
+    import socket
+    import time
+    from aiosmtpd.controller import Controller
+    from app import main, email_utils
+    from app.main import app
+    from app.outbox import EmailOutbox
+
+    class Inbox:
+        def __init__(self):
+            self.messages = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope)
+            return "250 OK"
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    inbox = Inbox()
+    smtpd = Controller(inbox, hostname="127.0.0.1", port=port)
+    smtpd.start()
+    running = True
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    monkeypatch.setenv("SMTP_FROM", "lablink@ucdavis.edu")
+    monkeypatch.delenv("SMTP_USERNAME", raising=False)
+    monkeypatch.delenv("SMTP_PASSWORD", raising=False)
+    monkeypatch.setattr(email_utils, "SMTP_STARTTLS", False)
+    outbox = EmailOutbox(TestingSessionLocal, poll_seconds=0, max_attempts=2, backoff_seconds=60)
+    app.dependency_overrides[main.require_ucdavis_user] = lambda: {"email": "outbox@ucdavis.edu"}
+    payload = {
+        "to": "prof@ucdavis.edu", "subject": "Research", "body": "Hello",
+        "filename": "cv.txt", "file_b64": base64.b64encode(b"resume").decode(),
+    }
+    try:
+        # Values longer than their outbox columns are rejected up front
+        app.dependency_overrides[main.require_ucdavis_user] = lambda: {"email": "long@ucdavis.edu"}
+        too_long = [{"to": "p" * 250 + "@ucdavis.edu"}, {"filename": "cv" * 200 + ".txt"}]
+        for override in too_long:
+            assert client.post("/api/email/send", json={**payload, **override}).status_code == 422
+        app.dependency_overrides[main.require_ucdavis_user] = lambda: {"email": "outbox@ucdavis.edu"}
+
+        r = client.post("/api/email/send", json=payload)
+        assert r.status_code == 202
+        mid = r.json()["message_id"]
+        assert client.get(f"/api/email/status/{mid}").json()["status"] == "queued"
+
+        assert outbox.deliver_due() == 1
+        assert inbox.messages[0].rcpt_tos == ["prof@ucdavis.edu"]
+        assert b'filename="cv.txt"' in inbox.messages[0].content
+        status = client.get(f"/api/email/status/{mid}").json()
+        assert (status["status"], status["attempts"]) == ("sent", 1)
+        assert status["sent_at"] is not None
+
+        app.dependency_overrides[main.require_ucdavis_user] = lambda: {"email": "other@ucdavis.edu"}
+        assert client.get(f"/api/email/status/{mid}").status_code == 404
+        app.dependency_overrides[main.require_ucdavis_user] = lambda: {"email": "outbox@ucdavis.edu"}
+
+        smtpd.stop()
+        running = False
+        mid = client.post("/api/email/send", json=payload).json()["message_id"]
+        assert outbox.deliver_due() == 0
+        status = client.get(f"/api/email/status/{mid}").json()
+        assert (status["status"], status["attempts"]) == ("queued", 1)
+        assert status["last_error"] and status["next_attempt_at"] > time.time() + 30
+        assert outbox.deliver_due() == 0  # not due yet: nothing is retried
+        outbox.deliver_due(now=status["next_attempt_at"])
+        status = client.get(f"/api/email/status/{mid}").json()
+        assert (status["status"], status["attempts"]) == ("failed", 2)
+    finally:
+        if running:
+            smtpd.stop()
+        app.dependency_overrides.pop(main.require_ucdavis_user, None)
+
+def test_email_outbox_retries_temporary_recipient_refusals():
+    """A 4xx recipient refusal (greylisting) is retried; only an all-5xx refusal fails the row"""
+    import smtplib
+    from app.outbox import EmailOutbox, enqueue_email, get_outbox_email
+
+    replies = {"grey@ucdavis.edu": (451, b"4.7.1 Greylisted, try again later"),
+               "nobody@ucdavis.edu": (550, b"5.1.1 No such user")}
+
+    def send(*, to_email, **_):
+        raise smtplib.SMTPRecipientsRefused({to_email: replies[to_email]})
+
+    outbox = EmailOutbox(TestingSessionLocal, poll_seconds=0, max_attempts=3, send=send)
+    with TestingSessionLocal() as db:
+        grey = enqueue_email(db, requested_by="r@ucdavis.edu", to_email="grey@ucdavis.edu", subject="s", body="b").message_id
+        gone = enqueue_email(db, requested_by="r@ucdavis.edu", to_email="nobody@ucdavis.edu", subject="s", body="b").message_id
+    assert outbox.deliver_due() == 0
+    with TestingSessionLocal() as db:
+        row = get_outbox_email(db, grey)
+        assert (row.status, row.attempts) == ("queued", 1) and "451" in row.last_error
+        assert get_outbox_email(db, gone).status == "failed"
+
+def test_smtp_pool_reuses_and_reconnects():
+    """One SMTP session serves many messages; a dropped or idle session is replaced"""
+    pytest.importorskip("aiosmtpd")
+    import socket
+    from aiosmtpd.controller import Controller
+    from app.email_utils import SMTPPool, build_message
+    from app.metrics import metrics
+
+    class Inbox:
+        def __init__(self):
+            self.count = 0
+
+        async def handle_DATA(self, server, session, envelope):
+            self.count += 1
+            return "250 OK"
+
+        async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+            if address.startswith("bounce@"):
+                return "550 No such user"
+            if address.startswith("busy@"):
+                return "421 Service not available, closing channel"
+            envelope.rcpt_tos.append(address)
+            return "250 OK"
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    inbox = Inbox()
+    smtpd = Controller(inbox, hostname="127.0.0.1", port=port)
+    smtpd.start()
+    pool = SMTPPool("127.0.0.1", port, starttls=False, max_messages=4)
+
+    def opened():
+        return metrics.value("lablink_smtp_connections_total")
+
+    def msg(to="prof@ucdavis.edu"):
+        return build_message(to_email=to, subject="s", body="b", sender="lablink@ucdavis.edu")
+
+    try:
+        before = opened()
+        for _ in range(3):
+            pool.send_message(msg())
+        errors = pool.send_many([msg(), msg("bounce@ucdavis.edu"), msg(), msg()])
+        assert [type(e).__name__ if e else None for e in errors] == [None, "SMTPRecipientsRefused", None, None]
+        assert inbox.count == 6
+        # 4 messages per session: the 4th message retired the first session
+        assert opened() - before == 2
+
+        pool._idle[-1].smtp.close()  # as if the server had dropped the idle session
+        reconnects = metrics.value("lablink_smtp_reconnects_total")
+        pool.send_message(msg())
+        assert metrics.value("lablink_smtp_reconnects_total") - reconnects == 1
+
+        pool._idle[-1].last_used -= pool.max_idle_seconds
+        pool.send_message(msg())
+        assert inbox.count == 8
+        assert opened() - before == 4
+
+        # 421 closes the session: it is not reused, the next message opens a new one
+        errors = pool.send_many([msg("busy@ucdavis.edu"), msg()])
+        assert type(errors[0]).__name__ == "SMTPRecipientsRefused" and errors[1] is None
+        assert metrics.value("lablink_smtp_reconnects_total") - reconnects == 1
+        assert inbox.count == 9 and opened() - before == 5
+    finally:
+        pool.close()
+        smtpd.stop()
+
 def test_cors_headers(client):
     """Test CORS headers are present"""
     response = client.get("/api/departments")
@@ -161,5 +376,689 @@ def test_cache_functionality():
     cached_data = get_cached_professor_list("nonexistent_key")
     assert cached_data is None
 
+def test_memory_backend_bounds_and_invalidation(monkeypatch):
+    """In-memory fallback evicts LRU entries, expires TTLs and clears by prefix"""
+    from app import cache as cache_mod
+    from app.cache import MemoryBackend
+    from app.cache_codec import SERIALIZERS, Codec
+
+    mem = MemoryBackend(max_entries=3, max_bytes=1000, codec=Codec(SERIALIZERS["json"]))
+    for i in range(3):
+        mem.set(f"professors:{i}", [i])
+    assert mem.get("professors:0") == [0]  # now most recently used
+    mem.set("similarity:a", {"x": 1})
+    assert mem.get("professors:1") is None
+    assert len(mem) == 3 and mem.evictions == 1
+
+    # returned values are copies, like Redis
+    mem.get("similarity:a")["x"] = 2
+    assert mem.get("similarity:a") == {"x": 1}
+
+    assert mem.clear_pattern("professors:*") == 2
+    assert mem.get("similarity:a") == {"x": 1}
+    assert mem.clear_pattern("sim*:?") == 1
+    assert len(mem) == 0 and mem.bytes == 0
+
+    # byte budget
+    mem.set("big", "x" * 600)
+    mem.set("big2", "y" * 600)
+    assert mem.get("big") is None and mem.bytes <= 1000
+    assert mem.set("huge", "z" * 2000) is False
+
+    # TTL
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    mem.set("short", 1, ttl=5)
+    mem.set("forever", 2, ttl=0)
+    now[0] += 6
+    assert mem.get("short") is None
+    assert mem.get("forever") == 2
+
+def test_cache_codec_round_trips_and_reads_legacy_json():
+    """Every installed serializer/compressor pair round-trips; plain JSON text still decodes"""
+    from app.cache_codec import COMPRESSORS, SERIALIZERS, Codec, hash_key
+
+    value = {"matches": [{"id": i, "name": f"Professor {i}", "skills": ["python"]} for i in range(50)], "1": None}
+    for ser in SERIALIZERS.values():
+        for comp in [None, *COMPRESSORS.values()]:
+            codec = Codec(ser, comp, compress_min_bytes=64)
+            raw = codec.encode(value)
+            assert Codec().decode(raw) == value
+            if comp is not None:
+                assert len(raw) < len(ser.dumps(value))
+    assert Codec().decode(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    assert Codec().decode('"text"') == "text"
+    assert hash_key({"b": 1, "a": 2}) == hash_key({"a": 2, "b": 1}) != hash_key({"a": 1})
+
+def test_namespace_invalidation_bumps_generation():
+    """Clearing a namespace retires its keys without touching other namespaces"""
+    from app.cache import CacheManager
+
+    mgr = CacheManager()
+    prof_key = mgr.namespace_key("professors", "all")
+    sim_key = mgr.namespace_key("similarity", "q")
+    mgr.set(prof_key, [1])
+    mgr.set(sim_key, [2])
+
+    assert mgr.invalidate_namespace("professors") == mgr.generation("professors") == 1
+    assert mgr.namespace_key("professors", "all") != prof_key
+    assert mgr.get(mgr.namespace_key("professors", "all")) is None
+    assert mgr.get(prof_key) is None  # stale local copies are dropped too
+    assert mgr.get(mgr.namespace_key("similarity", "q")) == [2]
+
+def test_cache_metrics_by_namespace(monkeypatch):
+    """Reads are counted per namespace and result; L1 size and evictions are exported"""
+    from app.cache import CacheManager, MemoryBackend
+    from app.metrics import metrics
+
+    monkeypatch.setenv("REDIS_URL", "")
+    mgr = CacheManager()
+    mgr.memory_cache = MemoryBackend(max_entries=2, codec=mgr.codec)
+
+    def reads(result):
+        return metrics.value("lablink_cache_requests_total", namespace="similarity", result=result)
+
+    hits, misses = reads("l1_hit"), reads("miss")
+    key = mgr.namespace_key("similarity", "metrics")
+    assert mgr.get(key) is None
+    mgr.set(key, [1])
+    assert mgr.get(key) == [1]
+    assert mgr.get_many([key, key + "-other"]) == {key: [1]}
+    assert (reads("l1_hit") - hits, reads("miss") - misses) == (2, 2)
+
+    assert mgr.get_or_compute(mgr.namespace_key("similarity", "computed"), lambda: 5) == 5
+    assert 'lablink_cache_compute_seconds_count{namespace="similarity"}' in metrics.render()
+    assert 'lablink_cache_op_seconds_count{namespace="similarity",op="get"}' in metrics.render()
+
+    evictions = metrics.value("lablink_cache_l1_evictions_total")
+    mgr.set("other:a", 1)
+    mgr.set("other:b", 2)
+    mgr._collect_metrics()
+    assert metrics.value("lablink_cache_l1_entries") == 2
+    assert metrics.value("lablink_cache_l1_bytes") == mgr.memory_cache.bytes > 0
+    assert metrics.value("lablink_cache_l1_evictions_total") - evictions == 2
+
+def test_redis_breaker_fails_fast_and_recovers(monkeypatch):
+    """A dead Redis trips the breaker (L1 keeps working); the probe restores it"""
+    import socket
+    import time
+    from app.cache import CacheManager
+    from app.metrics import metrics
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # nothing listens here once closed
+    monkeypatch.setenv("REDIS_URL", f"redis://127.0.0.1:{port}/0")
+    mgr = CacheManager()
+    assert mgr.redis_configured and mgr.redis_available  # no connection attempted yet
+
+    trips = metrics.value("lablink_cache_redis_breaker_trips_total")
+    mgr.breaker.probe_seconds = 0.01
+    pinged = []
+
+    def ping():
+        pinged.append(1)
+        if len(pinged) < 4:
+            raise ConnectionError("still down")
+
+    mgr.breaker.ping = ping
+    for i in range(3):
+        mgr.set(f"k{i}", i)  # each Redis write fails, L1 still stores it
+    assert not mgr.redis_available
+    assert metrics.value("lablink_cache_redis_breaker_trips_total") == trips + 1
+    assert [mgr.get(f"k{i}") for i in range(3)] == [0, 1, 2]
+    assert mgr.invalidate_namespace("professors") == 1
+    assert mgr._pending_invalidations == {"professors"}
+
+    replayed = []
+    mgr._replay_invalidations = lambda: replayed.append(True)
+    mgr.breaker.on_recover = mgr._replay_invalidations
+    deadline = time.time() + 5
+    while not mgr.redis_available and time.time() < deadline:
+        time.sleep(0.01)
+    assert mgr.redis_available and len(pinged) == 4 and replayed == [True]
+
+def test_cache_single_flight_and_match_caching(client, test_professor, monkeypatch):
+    """Concurrent misses compute once; identical match queries are served from cache"""
+    import asyncio
+    import threading
+    import time
+    from app import main
+    from app.cache import CacheManager
+
+    mgr = CacheManager()
+    calls = []
+    gate = threading.Event()
+
+    def slow():
+        calls.append(1)
+        gate.wait(5)
+        return {"n": len(calls)}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(mgr.get_or_compute("k", slow, ttl=60))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while not calls:
+        time.sleep(0.01)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and results == [{"n": 1}] * 8
+
+    async def many():
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+        return await asyncio.gather(*(mgr.aget_or_compute("ak", compute, ttl=60) for _ in range(8)))
+
+    calls.clear()
+    assert asyncio.run(many()) == [1] * 8
+
+    mgr.set_many({"m1": 1, "m2": [2]}, ttl=60)
+    assert mgr.get_many(["m1", "m2", "m3", "m1"]) == {"m1": 1, "m2": [2]}
+
+    # XFetch: a large beta refreshes well before expiry
+    assert mgr.get_or_compute("k", slow, ttl=60) == {"n": 1}
+    assert mgr.get_or_compute("k", slow, ttl=60, beta=1e9) == {"n": 2}
+
+    app.dependency_overrides[main.require_ucdavis_user] = lambda: {"email": "s@ucdavis.edu"}
+    ranked = []
+    real_rank = main.rank_matches
+    monkeypatch.setattr(main, "rank_matches", lambda *a: ranked.append(1) or real_rank(*a))
+    try:
+        body = {"interests": "machine learning", "skills": "python"}
+        first = client.post("/api/match", json=body)
+        second = client.post("/api/match", json=body)
+        assert first.status_code == 200 and first.json() == second.json()
+        assert first.json()["matches"][0]["professor"]["id"] == test_professor.id
+        assert len(ranked) == 1
+        client.post("/api/match", json={**body, "skills": "rust"})
+        assert len(ranked) == 2
+
+        # batch: cached profiles come from one multi-get, the rest are ranked once each
+        fresh = {**body, "skills": "cuda"}
+        batch = client.post("/api/match/batch", json={"profiles": [body, fresh, fresh]})
+        assert batch.status_code == 200
+        results = batch.json()["results"]
+        assert results[0] == first.json() and results[1] == results[2]
+        assert len(ranked) == 3
+        assert client.post("/api/match", json=fresh).json() == results[1]
+        assert len(ranked) == 3
+    finally:
+        app.dependency_overrides.pop(main.require_ucdavis_user, None)
+        main.clear_similarity_cache()
+
+def test_professor_changes_feed(client, test_professor):
+    """Delta feed reports upserts and deletes after a given version"""
+    response = client.get("/api/professors/changes", params={"since": 0})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["full_refetch"] is True
+    version = data["version"]
+    assert version >= 1
+
+    response = client.get("/api/professors/changes", params={"since": version})
+    assert response.json() == {"version": version, "full_refetch": False, "upserted": [], "deleted": []}
+
+    db = TestingSessionLocal()
+    extra = models.Professor(id=2, name="Second Professor", department="Computer Science")
+    db.add(extra)
+    db.commit()
+    db.delete(extra)
+    prof = db.get(models.Professor, test_professor.id)
+    prof.research_interests = "machine learning, robotics"
+    db.commit()
+    db.close()
+
+    data = client.get("/api/professors/changes", params={"since": version}).json()
+    assert data["full_refetch"] is False
+    assert [p["id"] for p in data["upserted"]] == [test_professor.id]
+    assert data["upserted"][0]["research_interests"] == "machine learning, robotics"
+    assert data["deleted"] == [2]
+    assert data["version"] > version
+
+    # A version from the future (e.g. after a DB rebuild) forces a full refetch
+    data = client.get("/api/professors/changes", params={"since": data["version"] + 100}).json()
+    assert data["full_refetch"] is True
+
+def test_changes_feed_is_commit_ordered(client, test_professor):
+    """A change whose row id is lower than one already read is still delivered"""
+    from sqlalchemy import func, select
+    from app import crud
+
+    db = TestingSessionLocal()
+    prof = db.get(models.Professor, test_professor.id)
+    prof.research_interests = "quantum computing"
+    db.commit()
+    seen = client.get("/api/professors/changes", params={"since": 1}).json()["version"]
+    read_id = db.scalar(select(func.max(models.CatalogChange.id)))
+
+    # A transaction that drew its sequence id before that row but commits only now
+    late_id = db.scalar(select(func.min(models.CatalogChange.id))) - 1
+    db.add(models.Professor(id=7, name="Late Professor", department="Computer Science"))
+    db.flush()
+    db.query(models.CatalogChange).filter(models.CatalogChange.professor_id == 7).update({"id": late_id})
+    db.commit()
+    assert late_id < read_id
+
+    data = client.get("/api/professors/changes", params={"since": seen}).json()
+    assert data["full_refetch"] is False
+    assert [p["id"] for p in data["upserted"]] == [7]
+    assert crud.list_catalog_changes(db, seen)["upserted"] == [7]
+    db.close()
+
+def test_session_lookup_is_cached(client):
+    """Cookie sessions resolve from the session store without re-reading the DB"""
+    import time
+    from app.main import SESSION_COOKIE_NAME, SESSION_TTL_SECONDS
+
+    db = TestingSessionLocal()
+    user = models.User(sub="google-sub-1", email="student@ucdavis.edu", name="Student")
+    db.add(user)
+    db.commit()
+    sess = models.SessionToken(
+        user_id=user.id, token="cached-token", expires_at=int(time.time()) + SESSION_TTL_SECONDS
+    )
+    db.add(sess)
+    db.commit()
+    expires_at = sess.expires_at
+
+    cookies = {SESSION_COOKIE_NAME: "cached-token"}
+    response = client.get("/api/auth/me", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["email"] == "student@ucdavis.edu"
+
+    # Fresh session: no sliding-expiry write yet
+    db.refresh(sess)
+    assert sess.expires_at == expires_at
+
+    # Served from the cache even though the row is gone
+    db.delete(sess)
+    db.commit()
+    db.close()
+    assert client.get("/api/auth/me", cookies=cookies).status_code == 200
+
+    # Logout invalidates the cached entry
+    client.post("/api/auth/logout", cookies=cookies)
+    assert client.get("/api/auth/me", cookies=cookies).status_code == 401
+
+def test_shared_session_logout_applies_on_every_worker(monkeypatch):
+    """With Redis-shared sessions no worker keeps its own copy, so logout is global"""
+    import time
+    from app import session_store
+    from app.cache import CacheManager
+    from app.session_store import SessionStore
+
+    class FakeRedis:
+        def __init__(self):
+            self.data = {}
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def setex(self, key, ttl, value):
+            self.data[key] = value
+            return True
+
+        def delete(self, key):
+            return 1 if self.data.pop(key, None) is not None else 0
+
+    monkeypatch.setenv("REDIS_URL", "")
+    shared = CacheManager()
+    shared.redis_client = FakeRedis()
+    monkeypatch.setattr(session_store, "cache", shared)
+
+    db = TestingSessionLocal()
+    user = models.User(sub="shared-sub", email="shared@ucdavis.edu")
+    db.add(user)
+    db.commit()
+    db.add(models.SessionToken(user_id=user.id, token="shared-token", expires_at=int(time.time()) + 3600))
+    db.commit()
+
+    worker_a = SessionStore(ttl_seconds=3600, use_redis=True)
+    worker_b = SessionStore(ttl_seconds=3600, use_redis=True)
+    assert worker_a.resolve(db, "shared-token")["email"] == "shared@ucdavis.edu"
+    assert worker_b.resolve(db, "shared-token")["email"] == "shared@ucdavis.edu"
+    assert len(shared.redis_client.data) == 1
+    assert not worker_a._local and not worker_b._local and len(shared.memory_cache) == 0
+
+    # Logout on worker A (cache entry and DB row) is seen by worker B right away
+    worker_a.invalidate("shared-token")
+    db.query(models.SessionToken).filter_by(token="shared-token").delete()
+    db.commit()
+    assert worker_b.resolve(db, "shared-token") is None
+    db.close()
+
+def test_bearer_token_verification_is_cached(client, monkeypatch):
+    """Bearer ID tokens verify against cached certs and are not re-verified until exp"""
+    from app import main
+    from app.google_auth import CertCache, GoogleTokenVerifier
+    from tests.fake_google import FakeGoogleIssuer
+
+    issuer = FakeGoogleIssuer()
+    verifier = GoogleTokenVerifier(issuer.audience, CertCache(issuer.fetch_certs))
+    monkeypatch.setattr(main, "GOOGLE_VERIFIER", verifier)
+
+    token = issuer.issue(email="bearer@ucdavis.edu")
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(3):
+        response = client.get("/api/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["email"] == "bearer@ucdavis.edu"
+    other = issuer.issue(email="other@ucdavis.edu", sub="other-sub")
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {other}"}).status_code == 200
+    assert issuer.fetch_count == 1
+
+    # Wrong audience is rejected
+    bad = FakeGoogleIssuer(audience="someone-else")
+    verifier.certs = CertCache(bad.fetch_certs)
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {bad.issue(email='x@ucdavis.edu')}"})
+    assert response.status_code == 401
+
+    # Wrong issuer is rejected, and not cached as verified
+    verifier.certs = CertCache(issuer.fetch_certs)
+    forged = issuer.issue(email="forged@ucdavis.edu", iss="https://evil.example.com")
+    with pytest.raises(ValueError, match="issuer"):
+        verifier.verify(forged)
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+    assert len(verifier._verified) == 2
+
+def test_session_sweeper_deletes_expired_in_batches(client):
+    """Expired sessions are deleted in bounded batches and counted in /metrics"""
+    import time
+    from app.sweeper import SessionSweeper, sweep_expired_sessions
+
+    db = TestingSessionLocal()
+    user = models.User(sub="sweeper-sub", email="sweep@ucdavis.edu")
+    db.add(user)
+    db.commit()
+    now = int(time.time())
+    for i in range(5):
+        db.add(models.SessionToken(user_id=user.id, token=f"expired-{i}", expires_at=now - 10))
+    db.add(models.SessionToken(user_id=user.id, token="still-valid", expires_at=now + 600))
+    db.commit()
+    db.close()
+
+    assert sweep_expired_sessions(TestingSessionLocal, batch_size=2, pause_seconds=0) == 5
+
+    db = TestingSessionLocal()
+    assert db.query(models.SessionToken).filter_by(token="still-valid").count() == 1
+    assert db.query(models.SessionToken).filter(models.SessionToken.expires_at <= now).count() == 0
+    db.close()
+
+    body = client.get("/metrics").text
+    assert "lablink_sessions_swept_total 5.0" in body
+    assert "lablink_sessions_expired_remaining 0.0" in body
+
+    # A stopped sweeper can be started again
+    sweeper = SessionSweeper(interval_seconds=3600)
+    sweeper.start()
+    sweeper.stop()
+    sweeper.start()
+    assert sweeper._thread.is_alive() and not sweeper._stop.is_set()
+    sweeper.stop()
+
+def test_pool_stats_exported(client):
+    """Connection pool gauges are exported with the app metrics"""
+    from app.database import pool_stats
+
+    stats = pool_stats()
+    assert stats["primary"]["checked_out"] >= 0
+    body = client.get("/metrics").text
+    assert 'lablink_db_pool_size{pool="primary"}' in body
+    assert 'lablink_db_pool_checked_out{pool="primary_async"}' in body
+
+def test_replica_router_falls_back_to_primary(monkeypatch):
+    """Reads fall back to the primary while the replica is unhealthy"""
+    from app import database
+
+    broken = sessionmaker(bind=create_engine("sqlite:////nonexistent-dir/replica.db"))
+    monkeypatch.setattr(database, "ReadSessionLocal", broken)
+    router = database.ReplicaRouter(cooldown_seconds=60)
+    assert router.healthy()
+
+    db = router.read_session()
+    try:
+        assert db.get_bind() is database.engine
+    finally:
+        db.close()
+    assert not router.healthy()
+
+def test_bulk_ingest_streams_json_in_batches():
+    """The JSON seed is parsed incrementally and written in batches with shared skills"""
+    import io
+    import json
+    from app.bulk_ingest import bulk_load, iter_json_array
+
+    records = [
+        {"id": i, "name": f"Prof {i}", "department": "CS", "skills": ["Python", "python", "SQL"]}
+        for i in range(1, 8)
+    ] + [{"name": "No Id", "skills": []}]
+    text = json.dumps(records, indent=2)
+    assert list(iter_json_array(io.StringIO(text), chunk_size=16)) == records
+
+    mem = create_engine("sqlite://")
+    Base.metadata.create_all(bind=mem)
+    with sessionmaker(bind=mem).begin() as db:
+        stats = bulk_load(db, iter_json_array(io.StringIO(text), chunk_size=16), batch_size=3)
+    assert stats["professors"] == 8 and stats["batches"] == 3 and stats["links"] == 14
+    with sessionmaker(bind=mem)() as db:
+        assert db.query(models.Skill).count() == 2
+        assert db.get(models.Professor, 8).name == "No Id"
+        assert db.query(models.CatalogChange).filter_by(op="reset").count() == 1
+
+def test_sync_catalog_applies_only_the_diff():
+    """A diff reseed touches only changed records and logs their ids"""
+    from app.bulk_ingest import sync_catalog
+
+    mem = create_engine("sqlite://")
+    Base.metadata.create_all(bind=mem)
+    Mem = sessionmaker(bind=mem)
+    records = [{"id": i, "name": f"Prof {i}", "skills": ["python"]} for i in (1, 2, 3)]
+    with Mem.begin() as db:
+        first = sync_catalog(db, records)
+    assert first["upserted"] == [1, 2, 3] and first["deleted"] == []
+
+    records[0]["skills"] = ["python", "rust"]
+    records[1]["name"] = "Prof 2"  # same content, different dict
+    with Mem.begin() as db:
+        stats = sync_catalog(db, [records[0], records[1], {"id": 4, "name": "New"}])
+    assert stats["upserted"] == [1, 4]
+    assert stats["deleted"] == [3]
+    assert stats["unchanged"] == 1
+    with Mem() as db:
+        assert {ps.skill.name for ps in db.get(models.Professor, 1).professor_skills} == {"python", "rust"}
+        assert db.get(models.Professor, 3) is None
+        ops = [(c.professor_id, c.op) for c in db.query(models.CatalogChange).order_by(models.CatalogChange.id)]
+    assert ops == [(None, "reset"), (1, "upsert"), (4, "upsert"), (3, "delete")]
+
+def test_reload_docs_applies_catalog_delta(client, test_professor):
+    """reload_docs re-indexes only the professors changed since the last build"""
+    from app import main
+
+    with TestingSessionLocal() as db:
+        main.rebuild_vectorstore(db)
+        prof = db.get(models.Professor, 1)
+        prof.research_interests = "quantum compilers"
+        db.commit()
+
+    res = client.get("/api/reload_docs").json()
+    assert res["full"] is False
+    assert res["upserted"] == 1
+    assert "quantum compilers" in main.PROF_DOCS[1]
+    assert client.get("/api/reload_docs").json()["upserted"] == 0
+
+def test_admin_ingest_streams_batch_results(client, monkeypatch):
+    """NDJSON ingest applies batches, streams one result per batch and updates the index"""
+    import json
+    from app import main
+
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(main, "ADMIN_API_TOKEN", "s3cret")
+    monkeypatch.setattr(main, "INGEST_BATCH_SIZE", 2)
+    lines = [
+        {"id": 501, "name": "Ingested One", "research_interests": "protein folding", "skills": ["python"]},
+        {"id": 502, "name": "Ingested Two"},
+        "not json",
+        {"op": "delete", "id": 502},
+        {"id": 503},
+    ]
+    body = "\n".join(l if isinstance(l, str) else json.dumps(l) for l in lines) + "\n"
+
+    assert client.post("/api/admin/professors:ingest", content=body).status_code == 401
+    r = client.post(
+        "/api/admin/professors:ingest",
+        content=body,
+        headers={"Authorization": "Bearer s3cret", "Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    out = [json.loads(l) for l in r.text.splitlines()]
+    assert [o.get("batch") for o in out[:-1]] == [1, 2, 3]
+    assert out[0]["upserted"] == 2
+    assert out[1]["deleted"] == 1 and out[1]["errors"][0]["line"] == 3
+    assert out[2]["errors"][0]["error"] == "name is required"
+    assert out[-1]["done"] and out[-1]["errors"] == 2
+    with TestingSessionLocal() as db:
+        assert db.get(models.Professor, 501) is not None
+        assert db.get(models.Professor, 502) is None
+    assert "protein folding" in main.PROF_DOCS[501]
+
+def test_ndjson_lines_over_the_limit_are_rejected():
+    """Oversized lines are reported whether they span chunks or fit inside one"""
+    import asyncio
+    from app.bulk_ingest import aiter_ndjson
+
+    async def collect(chunks):
+        async def gen():
+            for c in chunks:
+                yield c
+        return [item async for item in aiter_ndjson(gen(), max_line_bytes=16)]
+
+    big = b'{"name": "' + b"x" * 40 + b'"}'
+    for chunks in ([big + b'\n{"id": 1}\n'], [big[:20], big[20:] + b"\n", b'{"id": 1}\n']):
+        out = asyncio.run(collect(chunks))
+        assert isinstance(out[0][1], ValueError) and "exceeds" in str(out[0][1])
+        assert out[1] == (2, {"id": 1})
+
+def test_migration_streams_chunks_and_resumes(tmp_path):
+    """The migration copies every column in chunks and resumes from its checkpoint"""
+    import json
+    from app.scripts.migrate_sqlite_to_postgres import migrate
+
+    src_url = f"sqlite:///{tmp_path / 'src.db'}"
+    dst_url = f"sqlite:///{tmp_path / 'dst.db'}"
+    ckpt = str(tmp_path / "ckpt.json")
+    src = create_engine(src_url)
+    Base.metadata.create_all(bind=src)
+    with sessionmaker(bind=src).begin() as db:
+        db.add(models.Skill(id=1, name="python"))
+        for i in range(1, 8):
+            db.add(models.Professor(id=i, name=f"P{i}", personal_site=f"https://p{i}.example"))
+            db.add(models.ProfessorSkill(professor_id=i, skill_id=1))
+    src.dispose()
+
+    quiet = lambda *_: None
+    migrate(src_url, dst_url, chunk_size=3, workers=2, checkpoint=ckpt, log=quiet)
+    # Pretend the run died after committing professors 4..6 but before checkpointing them
+    state = json.load(open(ckpt))
+    state["professors"].update(last_id=3, rows=3, done=False)
+    state["professor_skills"].update(last_id=0, rows=0, done=False)
+    json.dump(state, open(ckpt, "w"))
+    copied = migrate(src_url, dst_url, chunk_size=3, workers=2, checkpoint=ckpt, log=quiet)
+    assert copied["professors"] == 4 and copied["skills"] == 0
+
+    dst = create_engine(dst_url)
+    with sessionmaker(bind=dst)() as db:
+        assert db.query(models.Professor).count() == 7
+        assert db.query(models.ProfessorSkill).count() == 7
+        assert db.get(models.Professor, 5).personal_site == "https://p5.example"
+    dst.dispose()
+    with pytest.raises(RuntimeError):
+        migrate(src_url, dst_url, checkpoint=None, log=quiet)
+
+def test_index_snapshot_round_trip(client, test_professor, tmp_path, monkeypatch):
+    """A snapshot matching the DB is loaded at startup instead of rebuilding"""
+    from app import main
+    import json
+    import numpy as np
+    from app.build_index import build_snapshot, catalog_fingerprint, find_snapshot, load_snapshot
+
+    monkeypatch.setattr(main, "INDEX_DIR", str(tmp_path))
+    with TestingSessionLocal() as db:
+        main.rebuild_vectorstore(db)
+        expected = main.VECSTORE.sims("machine learning")
+        path = build_snapshot(db, str(tmp_path))
+        assert find_snapshot(str(tmp_path), catalog_fingerprint(db)) == path
+
+        main.VECSTORE = None
+        assert main.warm_start_vectorstore(db)
+        assert main.VECSTORE.sims("machine learning") == pytest.approx(expected)
+        assert main.PROF_IDS == sorted(main.PROF_DOCS)
+
+        prof = db.get(models.Professor, 1)
+        prof.research_interests = (prof.research_interests or "") + " robotics"
+        db.commit()
+        # stale snapshot is ignored
+        assert not main.warm_start_vectorstore(db)
+
+        # embeddings are tied to the model that produced them
+        monkeypatch.setenv("SEMANTIC_MODEL", "another/model")
+        fingerprint = catalog_fingerprint(db)
+        monkeypatch.delenv("SEMANTIC_MODEL")
+        assert fingerprint != catalog_fingerprint(db)
+    manifest_path = os.path.join(path, "manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    np.save(os.path.join(path, "embeddings.npy"), np.zeros((len(manifest["arrays"]), 4), dtype=np.float32))
+    manifest.update(arrays=manifest["arrays"] + ["embeddings"], semantic_model="another/model")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match="another/model"):
+        load_snapshot(path)
+
+def test_shared_index_is_built_once_and_mapped(client, test_professor, tmp_path, monkeypatch):
+    """Without a matching snapshot the first worker builds one and maps it"""
+    import numpy as np
+    from app import main
+
+    monkeypatch.setattr(main, "INDEX_DIR", str(tmp_path))
+    with TestingSessionLocal() as db:
+        assert main.load_shared_vectorstore(db)
+    snaps = [d for d in os.listdir(tmp_path) if not d.startswith(".")]
+    assert len(snaps) == 1
+    assert isinstance(main.VECSTORE._bm25.tf_data, np.memmap)
+
+def test_index_reload_reaches_other_workers(client, test_professor, monkeypatch):
+    """A worker that missed the reload catches up on the next bus event"""
+    import threading
+    from app import main
+    from app.reload_bus import ReloadBus
+
+    monkeypatch.setattr(main, "INDEX_SNAPSHOTS_ENABLED", False)
+    with TestingSessionLocal() as db:
+        main.rebuild_vectorstore(db)
+        assert not main.sync_vectorstore(db)
+        # another worker changes the catalog
+        prof = db.get(models.Professor, 1)
+        prof.research_interests = "marine ecology"
+        db.commit()
+        assert main.sync_vectorstore(db)
+        assert "marine ecology" in main.PROF_DOCS[1]
+
+    r = client.get("/health")
+    assert r.headers["X-Index-Version"] == str(main.INDEX_VERSION)
+
+    seen = threading.Event()
+    bus = ReloadBus(lambda event: seen.set(), poll_seconds=0.05, use_redis=False)
+    bus.start()
+    try:
+        assert seen.wait(2)
+        assert bus.mode == "poll"
+        assert not bus.publish({"version": 1})
+    finally:
+        bus.stop()
+
 if __name__ == "__main__":
     pytest.main([__file__])
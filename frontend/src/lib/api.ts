@@ -90,7 +90,7 @@ export async function sendEmail(payload: {
   body: string;
   filename?: string;
   file_b64?: string;
-}): Promise<{ ok: true }> {
+}): Promise<{ ok: true; message_id: string; status: string }> {
   const res = await authorizedFetch(`${API_BASE}/api/email/send`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
@@ -102,3 +102,30 @@ export async function sendEmail(payload: {
   }
   return res.json()
 }
+
+export type EmailStatus = {
+  message_id: string;
+  status: 'queued' | 'sending' | 'sent' | 'failed';
+  attempts: number;
+  last_error?: string | null;
+  created_at: number;
+  sent_at?: number | null;
+  next_attempt_at?: number | null;
+}
+
+export async function getEmailStatus(messageId: string): Promise<EmailStatus> {
+  const res = await authorizedFetch(`${API_BASE}/api/email/status/${encodeURIComponent(messageId)}`)
+  if (!res.ok) throw new Error(`Failed to fetch email status: ${res.status} ${res.statusText}`)
+  return res.json()
+}
+
+// Poll a queued email until it is sent or failed, or until `timeoutMs` passes
+// (the server keeps retrying after that; the last known status is returned)
+export async function waitForEmail(messageId: string, timeoutMs = 15000, intervalMs = 1500): Promise<EmailStatus> {
+  const deadline = Date.now() + timeoutMs
+  for (;;) {
+    const status = await getEmailStatus(messageId)
+    if (status.status === 'sent' || status.status === 'failed' || Date.now() + intervalMs > deadline) return status
+    await new Promise(resolve => setTimeout(resolve, intervalMs))
+  }
+}
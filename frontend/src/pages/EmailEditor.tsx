@@ -4,10 +4,20 @@ import { FiMail, FiPaperclip, FiExternalLink, FiArrowLeft } from 'react-icons/fi
 import Button from '../components/Button'
 import { useState as useReactState } from 'react'
 import { useApp } from '../context/AppContext'
-import { generateEmail, sendEmail } from '../lib/api'
+import { generateEmail, sendEmail, waitForEmail } from '../lib/api'
 import { useAuth } from '../auth/AuthContext'
 import LoadingSpinner from '../components/LoadingSpinner'
 
+function showToast(text: string, tone: 'success' | 'info' = 'success') {
+  try {
+    const el = document.createElement('div')
+    el.className = `fixed top-4 right-4 z-50 rounded-md ${tone === 'success' ? 'bg-emerald-600' : 'bg-slate-700'} text-white px-4 py-2 shadow-lg smooth`
+    el.textContent = text
+    document.body.appendChild(el)
+    setTimeout(() => { el.style.opacity = '0'; setTimeout(() => el.remove(), 300) }, 2500)
+  } catch {}
+}
+
 export default function EmailEditor() {
   const { selectedProfessor, emailDraft, setEmailDraft, profile, emailSubject, setEmailSubject } = useApp() as any
   const { user } = useAuth()
@@ -137,14 +147,17 @@ export default function EmailEditor() {
                   file_b64 = btoa(String.fromCharCode(...new Uint8Array(arr)))
                   filename = file.name
                 }
-                await sendEmail({ to, subject: subjectText, body, filename, file_b64 })
-                try {
-                  const el = document.createElement('div')
-                  el.className = 'fixed top-4 right-4 z-50 rounded-md bg-emerald-600 text-white px-4 py-2 shadow-lg smooth'
-                  el.textContent = 'Email sent!'
-                  document.body.appendChild(el)
-                  setTimeout(() => { el.style.opacity = '0'; setTimeout(() => el.remove(), 300) }, 1500)
-                } catch {}
+                const { message_id } = await sendEmail({ to, subject: subjectText, body, filename, file_b64 })
+                showToast('Email queued for delivery…', 'info')
+                // The server delivers in the background; report what actually happened
+                const result = await waitForEmail(message_id).catch(() => null)
+                if (result?.status === 'sent') {
+                  showToast('Email sent!')
+                } else if (result?.status === 'failed') {
+                  alert(`Email could not be delivered${result.last_error ? `: ${result.last_error}` : '.'}`)
+                } else {
+                  showToast('Email is queued and will be retried shortly.', 'info')
+                }
               } catch (e: any) {
                 console.error('Failed to send email:', e)
                 const errorMsg = e?.message || 'Failed to send email. Please check your connection and try again.'
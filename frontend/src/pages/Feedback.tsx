@@ -1,11 +1,11 @@
 import { useState } from 'react'
 import Button from '../components/Button'
-import { sendEmail } from '../lib/api'
+import { sendEmail, waitForEmail } from '../lib/api'
 
 export default function Feedback() {
   const [text, setText] = useState('')
   const [email, setEmail] = useState('')
-  const [sent, setSent] = useState(false)
+  const [sent, setSent] = useState<'queued' | 'sent' | null>(null)
   const [error, setError] = useState<string | null>(null)
 
   async function submit(e: React.FormEvent) {
@@ -13,12 +13,18 @@ export default function Feedback() {
     try {
       setError(null)
       if (!text.trim()) throw new Error('Please enter feedback before sending.')
-      await sendEmail({
+      const { message_id } = await sendEmail({
         to: 'lablinkdavis@gmail.com',
         subject: 'LabLink feedback',
         body: `From: ${email || 'anonymous'}\n\n${text}`
       })
-      setSent(true)
+      setSent('queued')
+      const result = await waitForEmail(message_id).catch(() => null)
+      if (result?.status === 'failed') {
+        setSent(null)
+        throw new Error(`Your feedback could not be delivered${result.last_error ? `: ${result.last_error}` : '.'}`)
+      }
+      if (result?.status === 'sent') setSent('sent')
     } catch (err: any) {
       setError(err?.message || 'Failed to send. Is email configured on the server?')
     }
@@ -28,7 +34,9 @@ export default function Feedback() {
     <div className="mx-auto max-w-2xl px-4 md:px-8 py-12 text-slate-700 dark:text-slate-200 text-center">
       <h1 className="text-3xl font-extrabold text-slate-900 dark:text-white mb-4">Feedback</h1>
       {sent ? (
-        <p className="text-slate-700 dark:text-slate-300">Thanks! Your feedback was sent.</p>
+        <p className="text-slate-700 dark:text-slate-300">
+          {sent === 'sent' ? 'Thanks! Your feedback was sent.' : 'Thanks! Your feedback is queued for delivery.'}
+        </p>
       ) : (
         <div className="mx-auto rounded-2xl p-[1px] bg-gradient-to-br from-indigo-500/20 to-sky-400/10 shadow-sm overflow-hidden">
         <form onSubmit={submit} className="rounded-2xl bg-white/85 dark:bg-slate-900/60 backdrop-blur border border-slate-200/60 dark:border-white/10 p-6 space-y-4 text-left h-full">